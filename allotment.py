@@ -0,0 +1,164 @@
+"""Teacher Retention Allotment rules and cost estimates for every campus at once.
+
+    python allotment.py
+    python allotment.py --cutoff 5000 7500 10000 --long-large 5500 6000 7000
+
+A campus in a district/charter with at most ``cutoff`` students gets the
+"small" amounts, any other campus the "large" ones; 3-4 year teachers earn
+the short amount and 5+ year teachers the long one.  TAPR reports teacher
+FTEs in experience bands, so the eligible FTEs are estimated from them:
+SHORT_BAND_SHARE of the 1-5 year band for 3-4 years, and the 5+ year count
+(6 years and up) plus LONG_BAND_SHARE of the 1-5 year band for 5+ years.
+Masked campuses carry no counts and cost nothing.
+
+``scenario_grid`` builds every combination of alternative rule values and
+``scenario_costs`` totals all of them per district in one pass: the campus
+FTEs below each distinct cutoff are summed per district once, and every
+scenario's totals follow from those sums and its amounts by broadcasting.
+"""
+import argparse
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+# === CONFIGURATION ===
+# CSHB 2, Sec. 48.158
+ALLOTMENT_RULES = {
+    "cutoff": 5000,
+    "short_small": 5000,
+    "short_large": 2500,
+    "long_small": 10000,
+    "long_large": 5500,
+}
+SMALL_DISTRICT_ENROLLMENT = ALLOTMENT_RULES["cutoff"]
+# 3-4 and 5 years of the 1-5 year band, assuming experience is spread evenly
+SHORT_BAND_SHARE = 2 / 5
+LONG_BAND_SHARE = 1 / 5
+
+ENROLLMENT_COLUMN = "District Enrollment as of Oct 2023"
+BAND_COLUMN = "Teacher 1-5 Years Full Time Equiv Count"
+LONG_COLUMN = "Teacher 5+ Years Full Time Equiv Count"
+ALLOTMENT_REPORT = "Allotment Cost Estimates.xlsx"
+
+
+def allotment_amounts(enrollment, rules=ALLOTMENT_RULES):
+    """(3-4 year amount, 5+ year amount) per campus for its district ``enrollment``."""
+    small = (pd.Series(enrollment) <= rules["cutoff"]).to_numpy()
+    return (
+        np.where(small, rules["short_small"], rules["short_large"]),
+        np.where(small, rules["long_small"], rules["long_large"]),
+    )
+
+
+def eligible_fte(campuses):
+    """(3-4 year FTEs, 5+ year FTEs) per campus; masked/missing counts are 0."""
+    band = campuses[BAND_COLUMN].astype(float).fillna(0).to_numpy()
+    long_count = campuses[LONG_COLUMN].astype(float).fillna(0).to_numpy()
+    return SHORT_BAND_SHARE * band, long_count + LONG_BAND_SHARE * band
+
+
+def campus_costs(campuses, rules=ALLOTMENT_RULES):
+    """Per-campus eligible FTEs, amounts and estimated annual cost."""
+    short_fte, long_fte = eligible_fte(campuses)
+    short_amount, long_amount = allotment_amounts(campuses[ENROLLMENT_COLUMN], rules)
+    costs = pd.DataFrame({
+        "Eligible 3-4 Years FTE": short_fte,
+        "Eligible 5+ Years FTE": long_fte,
+        "3-4 Years Allotment": short_amount,
+        "5+ Years Allotment": long_amount,
+    }, index=campuses.index)
+    costs["Estimated Cost"] = short_fte * short_amount + long_fte * long_amount
+    return costs
+
+
+def rollup(campuses, costs, by):
+    """Campus costs summed per value of the ``by`` column(s) of ``campuses``."""
+    columns = ["Eligible 3-4 Years FTE", "Eligible 5+ Years FTE", "Estimated Cost"]
+    keys = [by] if isinstance(by, str) else list(by)
+    # observed: only the categories of categorical keys that occur
+    grouped = pd.concat([campuses[keys], costs[columns]], axis=1).groupby(keys, dropna=False, observed=True)
+    totals = grouped[columns].sum()
+    totals.insert(0, "Campuses", grouped.size())
+    return totals.reset_index()
+
+
+def scenario_grid(**values):
+    """One row per combination of rule values; unnamed rules keep their current value.
+
+    ``scenario_grid(cutoff=[5000, 7500], long_large=[5500, 6000])`` -> 4 scenarios.
+    """
+    unknown = sorted(set(values) - set(ALLOTMENT_RULES))
+    if unknown:
+        raise ValueError(f"unknown allotment rule(s) {unknown}; choose from {list(ALLOTMENT_RULES)}")
+    axes = {name: np.atleast_1d(values.get(name, default)) for name, default in ALLOTMENT_RULES.items()}
+    return pd.DataFrame(list(itertools.product(*axes.values())), columns=list(axes))
+
+
+def scenario_costs(campuses, scenarios, by):
+    """Estimated cost of every scenario (rows) in every ``by`` group (columns)."""
+    short_fte, long_fte = eligible_fte(campuses)
+    enrollment = campuses[ENROLLMENT_COLUMN].to_numpy(dtype=float, na_value=np.nan)
+    group, groups = pd.factorize(campuses[by], use_na_sentinel=False)
+    n_groups = len(groups)
+
+    # FTEs of the small-district campuses per (distinct cutoff, group)
+    cutoffs, cutoff_index = np.unique(scenarios["cutoff"].to_numpy(dtype=float), return_inverse=True)
+    small_short = np.empty((len(cutoffs), n_groups))
+    small_long = np.empty((len(cutoffs), n_groups))
+    for i, cutoff in enumerate(cutoffs):
+        small = enrollment <= cutoff
+        small_short[i] = np.bincount(group, weights=short_fte * small, minlength=n_groups)
+        small_long[i] = np.bincount(group, weights=long_fte * small, minlength=n_groups)
+    total_short = np.bincount(group, weights=short_fte, minlength=n_groups)
+    total_long = np.bincount(group, weights=long_fte, minlength=n_groups)
+
+    # (scenario, group) by broadcasting each scenario's amounts over the group sums
+    s_short, s_long = small_short[cutoff_index], small_long[cutoff_index]
+    amount = {name: scenarios[name].to_numpy(dtype=float)[:, None] for name in ALLOTMENT_RULES}
+    cost = (
+        amount["short_small"] * s_short + amount["short_large"] * (total_short - s_short)
+        + amount["long_small"] * s_long + amount["long_large"] * (total_long - s_long)
+    )
+    return pd.DataFrame(cost, index=scenarios.index, columns=pd.Index(groups, name=by))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate Teacher Retention Allotment costs.")
+    for name, default in ALLOTMENT_RULES.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=float, nargs="+", default=[default])
+    parser.add_argument("--output", default=ALLOTMENT_REPORT)
+    args = parser.parse_args()
+
+    import gen_tra_map_senate as gen
+
+    campuses = gen.assign_plan_districts(
+        gen.load_campuses(), gen.load_plan(os.path.join(gen.SHP_DIR, gen.SHP_NAME)), gen.SHP_NAME
+    )
+    costs = campus_costs(campuses)
+    scenarios = scenario_grid(**{name: getattr(args, name) for name in ALLOTMENT_RULES})
+    by_district = scenario_costs(campuses, scenarios, "district_name")
+    # plan districts in numeric order, campuses outside every district last
+    by_district = by_district.sort_index(axis=1, key=pd.to_numeric, na_position="last")
+    summary = scenarios.assign(**{"Estimated Cost": by_district.sum(axis=1)})
+
+    with pd.ExcelWriter(args.output) as writer:
+        pd.concat(
+            [campuses[["School Number", "School Name", "District Number", "DISTNAME", "district_name"]], costs],
+            axis=1,
+        ).to_excel(writer, sheet_name="Campuses", index=False)
+        rollup(campuses, costs, ["District Number", "DISTNAME"]).to_excel(writer, sheet_name="Districts", index=False)
+        rollup(campuses, costs, "district_name").sort_values(
+            "district_name", key=pd.to_numeric, na_position="last"
+        ).to_excel(writer, sheet_name="Senate Districts", index=False)
+        summary.to_excel(writer, sheet_name="Scenarios", index=False)
+        pd.concat([scenarios, by_district], axis=1).to_excel(writer, sheet_name="Scenarios by Senate District", index=False)
+
+    current = costs["Estimated Cost"].sum()
+    print(f"Estimated cost under current rules: ${current:,.0f} ({len(campuses):,} campuses)")
+    print(f"{len(scenarios):,} scenarios written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
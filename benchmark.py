@@ -0,0 +1,201 @@
+"""Time every pipeline stage on synthetic data and compare against a baseline.
+
+    python benchmark.py --campuses 1000 10000 100000
+    python benchmark.py --campuses 10000 --save-baseline benchmark_baseline.json
+    python benchmark.py --campuses 10000 --baseline benchmark_baseline.json
+
+For each size a synthetic dataset (see synthetic_data.py) is generated once
+under ``--work-dir`` and reused.  The stages of pipeline.py run in order, each
+in a fresh process so its peak RSS is its own, with an empty input cache (a
+cold build).  With ``--repeat N`` the stages run N-1 more times on the warm
+cache and the fastest of those is reported too.
+
+Results are written as JSON (``--output``).  A baseline is a results file;
+comparing against one flags every stage whose time or peak memory grew by
+more than ``--tolerance`` and exits with status 1 if any did.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic_data import write_dataset
+
+# === CONFIGURATION ===
+WORK_DIR = ".benchmark"
+RESULTS_PATH = "benchmark_results.json"
+TOLERANCE = 0.2
+# differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_MB_DELTA = 5.0
+METRICS = {"seconds": MIN_SECONDS_DELTA, "peak_rss_mb": MIN_RSS_MB_DELTA}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (nan on Windows)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _path_bytes(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _run_stage(data_dir, cache_dir, name, results):
+    # runs in a child process: the stage modules are imported fresh, after the
+    # cache location is set and from inside the dataset directory
+    os.environ["TRA_CACHE_DIR"] = cache_dir
+    os.chdir(data_dir)
+    sys.stdout = open(os.devnull, "w")
+    import pipeline
+
+    stage = next(s for s in pipeline.build_stages() if s.name == name)
+    start = time.perf_counter()
+    stage.func()
+    seconds = time.perf_counter() - start
+    results.put({
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "output_bytes": sum(_path_bytes(p) for p in stage.outputs),
+    })
+
+
+def stage_names():
+    import pipeline
+    return [s.name for s in pipeline.build_stages()]
+
+
+def run_stages(data_dir, cache_dir):
+    """{stage: {seconds, peak_rss_mb, output_bytes}} for one pass over every stage."""
+    ctx = multiprocessing.get_context("spawn")
+    timings = {}
+    for name in stage_names():
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run_stage, args=(os.path.abspath(data_dir), cache_dir, name, results))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            raise RuntimeError(f"stage {name} failed (exit code {proc.exitcode}) in {data_dir}")
+        timings[name] = results.get()
+    return timings
+
+
+def benchmark_size(campuses, districts=31, seed=0, repeat=1, work_dir=WORK_DIR):
+    data_dir = os.path.join(work_dir, f"campuses{campuses}_districts{districts}_seed{seed}")
+    if not os.path.exists(os.path.join(data_dir, "CSTAF.xlsx")):
+        print(f"Generating {campuses:,} campuses in {data_dir} ...")
+        write_dataset(data_dir, campuses, districts, seed)
+
+    cache_dir = tempfile.mkdtemp(prefix="tra_bench_cache_")
+    try:
+        stages = run_stages(data_dir, cache_dir)
+        for _ in range(repeat - 1):
+            for name, warm in run_stages(data_dir, cache_dir).items():
+                best = stages[name].get("warm_seconds")
+                stages[name]["warm_seconds"] = warm["seconds"] if best is None else min(best, warm["seconds"])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        "campuses": campuses,
+        "districts": districts,
+        "seed": seed,
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4),
+    }
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Lines describing every stage metric that regressed beyond ``tolerance``."""
+    base_runs = {(r["campuses"], r["districts"], r["seed"]): r for r in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        base = base_runs.get((run["campuses"], run["districts"], run["seed"]))
+        if base is None:
+            continue
+        for name, stage in run["stages"].items():
+            old = base["stages"].get(name)
+            if old is None:
+                continue
+            for metric, min_delta in METRICS.items():
+                before, after = old[metric], stage[metric]
+                if after - before > max(before * tolerance, min_delta):
+                    change = f" (+{(after - before) / before:.0%})" if before else ""
+                    regressions.append(f"{run['campuses']:,} campuses / {name}: {metric} {before} -> {after}{change}")
+    return regressions
+
+
+def format_results(results):
+    lines = []
+    for run in results["runs"]:
+        lines.append(f"{run['campuses']:,} campuses, {run['districts']} districts: {run['total_seconds']:.1f}s")
+        for name, stage in run["stages"].items():
+            warm = f"  warm {stage['warm_seconds']:.2f}s" if "warm_seconds" in stage else ""
+            lines.append(
+                f"  {name:<18} {stage['seconds']:>8.2f}s{warm}  {stage['peak_rss_mb']:>8.1f} MB peak"
+                f"  {stage['output_bytes'] / 1e6:>8.2f} MB out"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--campuses", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--districts", type=int, default=31)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results here")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "runs": [
+            benchmark_size(n, args.districts, args.seed, args.repeat, args.work_dir)
+            for n in args.campuses
+        ],
+    }
+    print(format_results(results))
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != results["machine"]:
+            print("Note: baseline was recorded on a different machine")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
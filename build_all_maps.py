@@ -0,0 +1,67 @@
+"""Build the allotment map for several redistricting plans in one run.
+
+    python build_all_maps.py \\
+        --plan PLANS2168/PLANS2168.shp Senate index.html \\
+        --plan PLANH2316/PLANH2316.shp House house.html
+
+The campus dataset (AskTED coordinates merged with the teacher profile) is
+loaded once in the parent process and handed to a pool of workers, one per
+plan; each worker only reads its shapefile, assigns districts and renders.
+Total wall time is close to the slowest single map.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gen_tra_map_senate as gen
+
+DEFAULT_PLANS = [(os.path.join(gen.SHP_DIR, gen.SHP_NAME), "Senate", gen.OUTPUT_MAP)]
+
+# campus GeoDataFrame shared by every plan build in a worker
+_campuses = None
+
+
+def _init_worker(campuses):
+    global _campuses
+    _campuses = campuses
+
+
+def _build_plan(shp_path, label, output):
+    start = time.perf_counter()
+    plan = gen.load_plan(shp_path)
+    gen.build_map(_campuses, plan, label, output, cache_name=os.path.basename(shp_path))
+    return output, time.perf_counter() - start
+
+
+def build_all(plans, workers=None):
+    """Build every (shapefile, label, output) plan; returns {output: seconds}."""
+    campuses = gen.load_campuses()
+    workers = workers or min(len(plans), os.cpu_count() or 1)
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(campuses,)) as pool:
+        futures = [pool.submit(_build_plan, *plan) for plan in plans]
+        for future in as_completed(futures):
+            output, seconds = future.result()
+            timings[output] = seconds
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--plan", nargs=3, action="append", metavar=("SHAPEFILE", "LABEL", "OUTPUT"),
+        help="plan shapefile, chamber label (Senate, House, SBOE, Congressional) and output HTML",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    timings = build_all([tuple(p) for p in args.plan or DEFAULT_PLANS], args.workers)
+    for output, seconds in sorted(timings.items()):
+        print(f"{output}: {seconds:.1f}s")
+    print(f"Built {len(timings)} maps in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
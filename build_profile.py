@@ -0,0 +1,177 @@
+"""Opt-in build profiler: per-stage timings and memory, plus an HTML byte breakdown.
+
+Off unless ``TRA_PROFILE`` names a report directory:
+
+    TRA_PROFILE=profile python tapr_processing.py
+    TRA_PROFILE=profile python gen_tra_map_senate.py
+    TRA_PROFILE=profile python pipeline.py --force
+
+Each script then writes ``profile/<script>.json`` and prints a summary table.
+Stages nest ("campus_profile/excel_load"); for each one the report holds wall
+time, CPU time, the process's peak RSS when the stage ended and how much the
+stage raised that peak.  For every HTML file passed to ``write_report`` the
+bytes are split into boundary GeoJSON, marker JS, popup HTML, tooltip HTML,
+the search index and the remaining static chrome.
+
+When profiling is off ``stage``/``start``/``stop`` cost one dict lookup.
+Use ``with stage(...)`` (or the decorator) so an exception still closes the
+stage; ``write_report`` starts the next report from no stages.
+"""
+import contextlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from benchmark import peak_rss_mb
+
+# === CONFIGURATION ===
+PROFILE_DIR = os.environ.get("TRA_PROFILE") or None
+
+_records = []
+_open = []
+
+# folium/generator output, in claim order; a byte belongs to the first component that matches it
+HTML_COMPONENTS = [
+    ("popup_html", [
+        r"var html_\w+ = \$\(`.*?`\)\[0\];",
+        r"var popup_\w+ = L\.popup\(\{.*?\}\);",
+        r"popup_\w+\.setContent\(html_\w+\);",
+        r"\w+\.bindPopup\(popup_\w+\)\s*;",
+        r"var campusPopupHtml = \(function\(\) \{.*?\}\)\(\);",
+    ]),
+    ("tooltip_html", [
+        r"\w+\.bindTooltip\(\s*`.*?`,\s*\{.*?\}\s*\);",
+    ]),
+    ("boundary_geojson", [
+        r"function geo_json_\w+_styler\(.*?geo_json_\w+\.addTo\(\w+\);",
+        r"var summary = L\.geoJSON\(\{.*?\}, \{(?=\s*smoothFactor)",
+    ]),
+    ("search_index", [
+        r"var index = \{.*?\};",
+    ]),
+    ("marker_js", [
+        r"var (?:circle_marker|regular_polygon_marker)_\w+ = L\.\w+\(.*?\)\.addTo\(\w+\);",
+        r"var data = \{\"lat\":.*?\};",
+        r"var CampusSquare = .*?return L\.circleMarker\(\[lat, lon\], options\);\s*\}",
+    ]),
+]
+
+
+def enabled():
+    return PROFILE_DIR is not None
+
+
+def start(name):
+    """Open stage ``name`` (nested under any stage still open)."""
+    if PROFILE_DIR is None:
+        return
+    record = {
+        "stage": f"{_open[-1]['stage']}/{name}" if _open else name,
+        "started": time.perf_counter(),
+        "_cpu": time.process_time(),
+        "_peak": peak_rss_mb(),
+    }
+    _open.append(record)
+    _records.append(record)
+
+
+def stop(name):
+    """Close stage ``name``, which must be the innermost open one."""
+    if PROFILE_DIR is None:
+        return
+    record = _open.pop()
+    if record["stage"].rsplit("/", 1)[-1] != name:
+        raise RuntimeError(f"profile stage {name!r} stopped while {record['stage']!r} is open")
+    peak = peak_rss_mb()
+    record["wall_seconds"] = round(time.perf_counter() - record["started"], 4)
+    record["cpu_seconds"] = round(time.process_time() - record.pop("_cpu"), 4)
+    record["peak_rss_mb"] = round(peak, 1)
+    record["rss_growth_mb"] = round(peak - record.pop("_peak"), 1)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """``with stage("merge"): ...`` or ``@stage("sjoin")`` around a function."""
+    start(name)
+    try:
+        yield
+    finally:
+        stop(name)
+
+
+def reset():
+    """Forget every stage recorded so far, open ones included."""
+    _records.clear()
+    _open.clear()
+
+
+def html_breakdown(path):
+    """{component: bytes} of an HTML file, the components summing to its size."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    claimed = np.zeros(len(text), dtype=bool)
+    sizes = {}
+    for component, patterns in HTML_COMPONENTS:
+        size = 0
+        for pattern in patterns:
+            for match in re.finditer(pattern, text, re.S):
+                a, b = match.span()
+                if claimed[a:b].any():
+                    continue
+                claimed[a:b] = True
+                size += len(match.group().encode("utf-8"))
+        sizes[component] = size
+    sizes["static_chrome"] = os.path.getsize(path) - sum(sizes.values())
+    return sizes
+
+
+def report(script, html_paths=()):
+    started = _records[0]["started"] if _records else 0.0
+    stages = [
+        {"stage": r["stage"], "offset_seconds": round(r["started"] - started, 4),
+         **{k: v for k, v in r.items() if k not in ("stage", "started") and not k.startswith("_")}}
+        for r in _records
+    ]
+    return {
+        "script": script,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": stages,
+        "html": {p: html_breakdown(p) for p in html_paths if os.path.exists(p)},
+    }
+
+
+def format_report(data):
+    width = max([len(s["stage"]) for s in data["stages"]] + [5])
+    lines = [f"{'stage':<{width}} {'wall s':>8} {'cpu s':>8} {'peak MB':>9} {'+MB':>7}"]
+    for s in data["stages"]:
+        if "wall_seconds" not in s:
+            continue
+        lines.append(
+            f"{s['stage']:<{width}} {s['wall_seconds']:>8.2f} {s['cpu_seconds']:>8.2f} "
+            f"{s['peak_rss_mb']:>9.1f} {s['rss_growth_mb']:>7.1f}"
+        )
+    for path, sizes in data["html"].items():
+        total = sum(sizes.values()) or 1
+        lines.append("")
+        lines.append(f"{path}: {total:,} bytes")
+        for component, size in sorted(sizes.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {component:<18} {size:>12,} {size / total:>7.1%}")
+    return "\n".join(lines)
+
+
+def write_report(script, html_paths=()):
+    """Write ``<TRA_PROFILE>/<script>.json`` and print the summary (no-op when off)."""
+    if PROFILE_DIR is None:
+        return None
+    data = report(script, html_paths)
+    reset()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{script}.json")
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    print(format_report(data))
+    print("Profile written →", path)
+    return path
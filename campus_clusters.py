@@ -0,0 +1,229 @@
+"""Precomputed campus clusters for the zoom levels below the marker zoom.
+
+At the statewide view thousands of campus markers overlap.  The generator
+bins the campuses of each district into square cells of ``radius`` screen
+pixels at every zoom from ``min_zoom`` up to ``max_zoom - 1``; because a cell
+is half as wide in degrees one zoom further in, each cell is exactly the union
+of four cells of the next level, so the levels form a hierarchy.  Every cell
+with campuses becomes one cluster carrying its centre, campus count and
+teacher FTEs per kind code (charter bit | large-district bit, see
+campus_layer), and the zoom at which its campuses first fall into more than
+one cluster, which a click on it zooms to.
+
+The browser shows the clusters of the current zoom in place of the markers
+and the single markers from ``max_zoom`` on.  Clusters belong to their
+district's group, so the district dropdown shows and hides them with the
+markers, and the isolate toggle recounts them over the kinds left visible.
+The district layers hand over through ``map.campusClusters``: ``active()``
+says whether clusters stand in for the markers at the current zoom and
+``update(kinds)`` redraws them for the visible kind codes (null: all).
+"""
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+from allotment import SMALL_DISTRICT_ENROLLMENT
+from campus_layer import CHARTER, KIND_COUNT, LARGE, LARGE_COLOR, SMALL_COLOR, campus_kinds
+
+# === CONFIGURATION ===
+MIN_ZOOM = 5
+# cell size in screen pixels
+RADIUS = 48
+TILE_SIZE = 256
+FTE_COLUMNS = [
+    "Teacher Beginning Full Time Equiv Count",
+    "Teacher 1-5 Years Full Time Equiv Count",
+    "Teacher 5+ Years Full Time Equiv Count",
+]
+
+
+def _world_pixels(lat, lon, zoom):
+    # Web Mercator pixel coordinates at ``zoom``, as Leaflet projects them
+    size = TILE_SIZE * 2.0 ** zoom
+    x = (lon + 180.0) / 360.0 * size
+    y = (1 - np.log(np.tan(np.radians(lat)) + 1 / np.cos(np.radians(lat))) / np.pi) / 2 * size
+    return x, y
+
+
+def campus_ftes(gdf):
+    """Teacher FTEs per campus across experience bands; withheld counts are 0."""
+    columns = [c for c in FTE_COLUMNS if c in gdf.columns]
+    if not columns:
+        return np.zeros(len(gdf))
+    return gdf[columns].astype(float).fillna(0).to_numpy().sum(axis=1)
+
+
+def _compact(values):
+    # whole numbers without the trailing ".0" in the page's JSON
+    return [[int(v) if v.is_integer() else v for v in row] for row in values.tolist()]
+
+
+def cluster_levels(lat, lon, group, kind, fte, max_zoom, min_zoom=MIN_ZOOM, radius=RADIUS, precision=4):
+    """One cluster table per zoom in [min_zoom, max_zoom), columnar for the page.
+
+    Campuses are binned per ``group`` (district position, -1 left out); each
+    table lists centre ``lat``/``lon`` (mean of the members), the ``group``,
+    ``count``/``fte`` per kind code and the ``split`` zoom.
+    """
+    keep = group >= 0
+    lat, lon, group, kind, fte = lat[keep], lon[keep], group[keep], kind[keep], fte[keep]
+    # cells of the finest level; coarser cells follow by halving the indices
+    x, y = _world_pixels(lat, lon, max_zoom - 1)
+    cell_x = np.floor(x / radius).astype(np.int64)
+    cell_y = np.floor(y / radius).astype(np.int64)
+
+    # finest level first, so each cluster finds its split zoom among its children
+    levels = []
+    children = None
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        shift = max_zoom - 1 - zoom
+        keys = np.column_stack([group, cell_x >> shift, cell_y >> shift])
+        cells, member = np.unique(keys, axis=0, return_inverse=True)
+        member = member.ravel()
+        n = len(cells)
+        size = np.bincount(member, minlength=n)
+        count = np.zeros((n, KIND_COUNT), dtype=np.int64)
+        np.add.at(count, (member, kind), 1)
+        ftes = np.zeros((n, KIND_COUNT))
+        np.add.at(ftes, (member, kind), fte)
+        if children is None:
+            split = np.full(n, max_zoom)
+        else:
+            # a cluster with a single child splits where that child does
+            child_member, child_split = children
+            parent = np.empty(len(child_split), dtype=np.int64)
+            parent[child_member] = member
+            only_child = (np.bincount(parent, minlength=n) == 1)[parent]
+            split = np.full(n, zoom + 1)
+            split[parent[only_child]] = child_split[only_child]
+        children = (member, split)
+        levels.append({
+            "zoom": zoom,
+            "lat": np.round(np.bincount(member, lat, n) / size, precision).tolist(),
+            "lon": np.round(np.bincount(member, lon, n) / size, precision).tolist(),
+            "group": cells[:, 0].tolist(),
+            "count": count.tolist(),
+            "fte": _compact(np.round(ftes, 1)),
+            "split": split.tolist(),
+        })
+    return levels[::-1]
+
+
+class CampusClusterLayer(MacroElement):
+    """Per-district campus clusters shown below ``max_zoom``, see the module docstring.
+
+    ``district_groups`` maps district name -> the ``folium.FeatureGroup`` its
+    markers live in; a cluster is added to the group of its district.
+    """
+
+    _template = Template(
+        """
+        {% macro header(this, kwargs) %}
+        <style>
+        .campus-cluster { display: flex; align-items: center; justify-content: center; border-radius: 50%;
+            border: 1px solid black; color: black; font: bold 11px sans-serif; box-sizing: border-box; }
+        .campus-cluster-small { background: {{ this.small_color }}99; }
+        .campus-cluster-large { background: {{ this.large_color }}99; }
+        </style>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var groups = [{% for g in this.groups %}{{ g.get_name() }}{{ "," if not loop.last }}{% endfor %}];
+            var levels = {{ this.levels|tojson }};
+            var maxZoom = {{ this.max_zoom }};
+            var minZoom = levels.length ? levels[0].zoom : maxZoom;
+            var shown = groups.map(function() { return null; });
+            var built = {};
+
+            function summary(level, i, kinds) {
+                var n = 0, charter = 0, large = 0, fte = 0;
+                kinds.forEach(function(k) {
+                    var c = level.count[i][k];
+                    n += c;
+                    if (k & {{ this.CHARTER }}) { charter += c; }
+                    if (k & {{ this.LARGE }}) { large += c; }
+                    fte += level.fte[i][k];
+                });
+                return { n: n, charter: charter, large: large, fte: fte };
+            }
+
+            function clusterMarker(level, i, s) {
+                var size = Math.round(22 + 6 * Math.log(s.n) / Math.LN10);
+                var marker = L.marker([level.lat[i], level.lon[i]], {
+                    icon: L.divIcon({
+                        html: String(s.n),
+                        className: 'campus-cluster campus-cluster-' + (2 * s.large > s.n ? 'large' : 'small'),
+                        iconSize: [size, size]
+                    })
+                });
+                marker.bindTooltip(
+                    s.n + ' campus' + (s.n === 1 ? '' : 'es')
+                    + '<br>' + s.charter + ' charter, ' + (s.n - s.charter) + ' public'
+                    + '<br>' + (s.n - s.large) + ' in districts of {{ this.small_enrollment }} or fewer students, '
+                    + s.large + ' in larger ones'
+                    + '<br>' + s.fte.toLocaleString(undefined, { maximumFractionDigits: 1 }) + ' teacher FTEs'
+                );
+                marker.on('click', function() {
+                    map.setView([level.lat[i], level.lon[i]], level.split[i]);
+                });
+                return marker;
+            }
+
+            // cluster group per district for one level and set of visible kinds, built once
+            function clustersFor(l, kinds) {
+                var key = l + ':' + kinds.join(',');
+                if (!built[key]) {
+                    var level = levels[l];
+                    built[key] = groups.map(function() { return L.layerGroup(); });
+                    for (var i = 0; i < level.group.length; i++) {
+                        var s = summary(level, i, kinds);
+                        if (s.n) { built[key][level.group[i]].addLayer(clusterMarker(level, i, s)); }
+                    }
+                }
+                return built[key];
+            }
+
+            map.campusClusters = {
+                maxZoom: maxZoom,
+                active: function() { return map.getZoom() < maxZoom; },
+                update: function(kinds) {
+                    kinds = kinds || [{% for k in range(this.KIND_COUNT) %}{{ k }}{{ "," if not loop.last }}{% endfor %}];
+                    var zoom = Math.floor(map.getZoom());
+                    var next = zoom < maxZoom && levels.length
+                        ? clustersFor(Math.min(Math.max(zoom, minZoom), maxZoom - 1) - minZoom, kinds) : null;
+                    groups.forEach(function(group, g) {
+                        var layer = next && next[g];
+                        if (shown[g] === layer) { return; }
+                        if (shown[g]) { group.removeLayer(shown[g]); }
+                        if (layer) { group.addLayer(layer); }
+                        shown[g] = layer;
+                    });
+                }
+            };
+        })();
+        {% endmacro %}
+        """
+    )
+
+    CHARTER = CHARTER
+    LARGE = LARGE
+    KIND_COUNT = KIND_COUNT
+
+    def __init__(self, gdf, district_groups, max_zoom, min_zoom=MIN_ZOOM, radius=RADIUS,
+                 small_enrollment=SMALL_DISTRICT_ENROLLMENT, precision=5):
+        super().__init__()
+        self._name = "CampusClusterLayer"
+        names = list(district_groups)
+        self.groups = [district_groups[d] for d in names]
+        position = {d: k for k, d in enumerate(names)}
+        group = gdf["district_name"].map(position).fillna(-1).astype(int).to_numpy()
+        self.levels = cluster_levels(
+            gdf.geometry.y.to_numpy(), gdf.geometry.x.to_numpy(), group,
+            campus_kinds(gdf, small_enrollment), campus_ftes(gdf), max_zoom, min_zoom, radius, precision,
+        )
+        self.max_zoom = max_zoom
+        self.small_enrollment = f"{small_enrollment:,}"
+        self.small_color = SMALL_COLOR
+        self.large_color = LARGE_COLOR
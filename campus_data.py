@@ -0,0 +1,92 @@
+"""Campus point data shared by the map builds."""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+# a coordinate outside these ranges is treated as invalid
+LAT_RANGE = (-90.0, 90.0)
+LON_RANGE = (-180.0, 180.0)
+# AskTED coordinate columns; nothing reads them once the geometry is built
+COORD_COLUMNS = ["Latitude", "Longitude", "Census_Latitude", "Census_Longitude"]
+
+
+def _coord(df, preferred, fallback):
+    # numeric view of preferred, falling back per row where preferred is null
+    first = pd.to_numeric(df[preferred], errors="coerce")
+    second = pd.to_numeric(df[fallback], errors="coerce")
+    use_first = df[preferred].notnull().to_numpy()
+    return np.where(use_first, first.to_numpy(dtype=float), second.to_numpy(dtype=float)), use_first
+
+
+def resolve_coords(df):
+    """Point geometry per AskTED row plus one summary of the rows without one.
+
+    Census_Latitude/Census_Longitude win over Latitude/Longitude wherever
+    present.  Rows with a missing or out-of-range coordinate get a null
+    geometry; the summary holds the counts and, under ``"rows"``, those rows
+    with a ``Coordinate Issue`` of "missing" or "invalid".
+    """
+    lat, census_lat = _coord(df, "Census_Latitude", "Latitude")
+    lon, census_lon = _coord(df, "Census_Longitude", "Longitude")
+    # a non-numeric value left in either source column becomes NaN above
+    present = df["Census_Latitude"].notnull() | df["Latitude"].notnull()
+    present &= df["Census_Longitude"].notnull() | df["Longitude"].notnull()
+    present = present.to_numpy()
+    finite = np.isfinite(lat) & np.isfinite(lon)
+    in_range = (
+        (lat >= LAT_RANGE[0]) & (lat <= LAT_RANGE[1])
+        & (lon >= LON_RANGE[0]) & (lon <= LON_RANGE[1])
+    )
+    valid = finite & in_range
+
+    geometry = gpd.GeoSeries(gpd.points_from_xy(lon, lat), index=df.index, crs="EPSG:4326")
+    geometry[~valid] = None
+
+    rows = df.loc[~valid, ["School Number", "School Name", "District Name"]].copy()
+    rows["Latitude Used"] = lat[~valid]
+    rows["Longitude Used"] = lon[~valid]
+    rows["Coordinate Issue"] = np.where(present, "invalid", "missing")[~valid]
+    summary = {
+        "resolved": int(valid.sum()),
+        "census": int((valid & census_lat & census_lon).sum()),
+        "missing": int((~present).sum()),
+        "invalid": int((present & ~valid).sum()),
+        "rows": rows,
+    }
+    return geometry, summary
+
+
+def describe_coord_summary(summary):
+    return (
+        f"Coordinates: {summary['resolved']:,} resolved ({summary['census']:,} census), "
+        f"{summary['missing']:,} missing, {summary['invalid']:,} invalid"
+    )
+
+
+def _downcast(values):
+    # smallest dtype holding every value exactly; anything else is left alone
+    if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+        return values
+    if pd.api.types.is_integer_dtype(values) and not isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        return pd.to_numeric(values, downcast="integer")
+    if pd.api.types.is_float_dtype(values):
+        narrow = values.astype("Float32" if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) else "float32")
+        if narrow.astype(values.dtype).equals(values):
+            return narrow
+    return values
+
+
+def compact_frame(df, categories=()):
+    """``df`` with the ``categories`` columns categorical and numbers downcast losslessly.
+
+    Integers take the smallest integer dtype holding them and floats become
+    32-bit only where every value survives the round trip, so no value the
+    map formats changes.
+    """
+    out = df.copy(deep=False)
+    for col in out.columns:
+        if col in categories:
+            out[col] = out[col].astype("category")
+        elif col != getattr(out, "_geometry_column_name", None):
+            out[col] = _downcast(out[col])
+    return out
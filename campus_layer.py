@@ -0,0 +1,126 @@
+"""Single data-driven campus layer drawn on a shared canvas renderer.
+
+Instead of one ``folium.CircleMarker``/``RegularPolygonMarker`` (and its own
+JS statements) per campus, the generator embeds the campus coordinates and a
+small per-point kind code once and a short loop creates the markers on one
+``L.canvas`` renderer.  Shape (charter square vs. public circle) and fill
+colour (district enrollment <= 5,000) come from the kind code, which also
+picks the per-district kind group the isolate toggle shows or hides.
+"""
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+from allotment import SMALL_DISTRICT_ENROLLMENT
+
+SMALL_COLOR = "#0D92F4"
+LARGE_COLOR = "#F95454"
+# marker style shared with the offline images (district_images.py)
+MARKER_RADIUS = 4
+MARKER_WEIGHT = 1
+MARKER_FILL_OPACITY = 0.6
+
+# kind code bits
+CHARTER = 1
+LARGE = 2
+KIND_COUNT = 4
+# kinds left visible by the "Isolate Small Charters/Large Public Schools" toggle
+ISOLATED_KINDS = (CHARTER, LARGE)
+
+# JS helpers shared by every campus layer: ``campusMarker(lat, lon, kind, options)``
+# styles a marker from its kind code (a CampusSquare for charters, a circle otherwise)
+CAMPUS_MARKER_JS = """
+// square marker drawn on the canvas renderer; vertices sit on the circle of `radius`
+var CampusSquare = L.CircleMarker.extend({
+    _updatePath: function() {
+        var r = this._renderer;
+        if (!r._drawing || this._empty()) { return; }
+        var p = this._point, s = Math.max(Math.round(this._radius * Math.SQRT1_2), 1);
+        r._ctx.beginPath();
+        r._ctx.rect(p.x - s, p.y - s, 2 * s, 2 * s);
+        r._fillStroke(r._ctx, this);
+    }
+});
+
+function campusMarker(lat, lon, kind, options) {
+    options.radius = %(radius)d;
+    options.color = 'black';
+    options.weight = %(weight)d;
+    options.fill = true;
+    options.fillOpacity = %(fill_opacity)s;
+    options.fillColor = (kind & %(large)d) ? '%(large_color)s' : '%(small_color)s';
+    if (kind & %(charter)d) {
+        options.numberOfSides = 4;
+        return new CampusSquare([lat, lon], options);
+    }
+    return L.circleMarker([lat, lon], options);
+}
+""" % {"large": LARGE, "charter": CHARTER, "large_color": LARGE_COLOR, "small_color": SMALL_COLOR,
+       "radius": MARKER_RADIUS, "weight": MARKER_WEIGHT, "fill_opacity": MARKER_FILL_OPACITY}
+
+
+def campus_kinds(gdf, small_enrollment=SMALL_DISTRICT_ENROLLMENT):
+    charter = (gdf["District Type"] == "CHARTER").to_numpy()
+    large = ~(gdf["District Enrollment as of Oct 2023"] <= small_enrollment).to_numpy()
+    return np.where(charter, CHARTER, 0) | np.where(large, LARGE, 0)
+
+
+class CampusCanvasLayer(MacroElement):
+    """All campuses as one canvas-rendered layer, split across district groups.
+
+    ``kind_groups`` maps district name -> one ``folium.FeatureGroup`` per kind
+    code; each campus marker is added to the group of its ``district_name``
+    and kind, and campuses without a district are skipped, as in the
+    per-marker build.
+    ``popup_js`` names a JS function ``f(i)`` returning row i's popup HTML.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var groups = [{% for kinds in this.groups %}[{% for g in kinds %}{{ g.get_name() }}{{ "," if not loop.last }}{% endfor %}]{{ "," if not loop.last }}{% endfor %}];
+            var data = {{ this.data|tojson }};
+            var renderer = L.canvas({ pane: 'markerPane', padding: 0.5 });
+
+            {{ this.marker_js }}
+
+            {%- if this.popup_js %}
+            function popupFor(layer) {
+                return {{ this.popup_js }}(layer.options.campus);
+            }
+            {%- endif %}
+
+            for (var i = 0; i < data.lat.length; i++) {
+                var g = data.group[i];
+                if (g < 0) { continue; }
+                var kind = data.kind[i];
+                var marker = campusMarker(data.lat[i], data.lon[i], kind, { renderer: renderer, campus: i });
+                {%- if this.popup_js %}
+                marker.bindPopup(popupFor, { maxWidth: 300 });
+                marker.bindTooltip(popupFor, { sticky: false });
+                {%- endif %}
+                groups[g][kind].addLayer(marker);
+            }
+        })();
+        {% endmacro %}
+        """
+    )
+
+    marker_js = CAMPUS_MARKER_JS
+
+    def __init__(self, gdf, kind_groups, popup_js=None, precision=6):
+        super().__init__()
+        self._name = "CampusCanvasLayer"
+        names = list(kind_groups)
+        self.groups = [kind_groups[d] for d in names]
+        position = {d: k for k, d in enumerate(names)}
+        group = gdf["district_name"].map(position).fillna(-1).astype(int)
+        self.popup_js = popup_js
+        self.data = {
+            "lat": np.round(gdf.geometry.y.to_numpy(), precision).tolist(),
+            "lon": np.round(gdf.geometry.x.to_numpy(), precision).tolist(),
+            "kind": campus_kinds(gdf).tolist(),
+            "group": group.tolist(),
+        }
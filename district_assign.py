@@ -0,0 +1,149 @@
+"""School -> district assignment on a prepared spatial index, with a result cache.
+
+``assign_districts`` replaces the ``gpd.sjoin(..., predicate='within')`` step.
+Points are tested against an STRtree of the district polygons (the tree
+prepares its geometries for the predicate).  Results are persisted in the
+input cache under a hash of the district geometry and the nearest-district
+limit; on the next build only
+rows whose key is new or whose coordinates moved are tested again.
+
+Points that fall just outside every polygon (coastal campuses, geocodes on
+the far side of a boundary road) are given the nearest district within
+``max_nearest`` degrees instead of silently getting no district.
+"""
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from input_cache import CACHE_DIR, enforce_size_cap, remove_entry
+
+# ~2 km at Texas latitudes
+NEAREST_MAX_DEGREES = 0.02
+
+
+def geometry_digest(districts, name_col="district_name"):
+    h = hashlib.sha256()
+    for name, wkb in zip(districts[name_col].astype(str), shapely.to_wkb(districts.geometry.to_numpy())):
+        h.update(name.encode("utf-8"))
+        h.update(wkb)
+    return h.hexdigest()
+
+
+def _cache_digest(districts, name_col, max_nearest):
+    # "nearest" and "none" rows depend on the limit as much as on the polygons
+    h = hashlib.sha256(geometry_digest(districts, name_col).encode("ascii"))
+    h.update(repr(float(max_nearest or 0)).encode("ascii"))
+    return h.hexdigest()
+
+
+def _cache_prefix(cache_name):
+    safe = "".join(c if c.isalnum() else "_" for c in str(cache_name))
+    return os.path.join(CACHE_DIR, f"assign_{safe}-")
+
+
+def _load_cache(prefix, digest):
+    path = f"{prefix}{digest[:16]}.parquet"
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    cached = pd.read_parquet(path)
+    return cached.drop_duplicates("key", keep="last").set_index("key")
+
+
+def _save_cache(prefix, digest, frame):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = f"{prefix}{digest[:16]}.parquet"
+    tmp = f"{path}.tmp{os.getpid()}"
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    for stale in glob.glob(glob.escape(prefix) + "*"):
+        if stale != path and ".tmp" not in stale:
+            remove_entry(stale)
+    enforce_size_cap()
+
+
+def _test_points(x, y, geoms, names, max_nearest):
+    tree = shapely.STRtree(geoms)
+    points = shapely.points(x, y)
+    district = np.full(len(points), None, dtype=object)
+    method = np.full(len(points), "none", dtype=object)
+
+    inside, polygon = tree.query(points, predicate="within")
+    # overlapping plans are not expected; the first containing polygon wins
+    first_inside, first = np.unique(inside, return_index=True)
+    district[first_inside] = names[polygon[first]]
+    method[first_inside] = "within"
+
+    outside = np.flatnonzero(method == "none")
+    if len(outside) and max_nearest:
+        near_in, near_poly = tree.query_nearest(points[outside], max_distance=max_nearest)
+        near_first, first = np.unique(near_in, return_index=True)
+        district[outside[near_first]] = names[near_poly[first]]
+        method[outside[near_first]] = "nearest"
+    return district, method
+
+
+def assign_districts(points, districts, keys=None, name_col="district_name",
+                     cache_name=None, max_nearest=NEAREST_MAX_DEGREES):
+    """District name per point (aligned with ``points.index``) and a summary dict.
+
+    ``keys`` (e.g. the School Number column) identifies rows across builds
+    for the cache; ``cache_name`` (e.g. the plan's shapefile name) enables it.
+    """
+    geoms = districts.geometry.to_numpy()
+    names = districts[name_col].to_numpy(dtype=object)
+    x = points.x.to_numpy(dtype=float)
+    y = points.y.to_numpy(dtype=float)
+    keys = np.asarray(points.index if keys is None else keys)
+
+    district = np.full(len(points), None, dtype=object)
+    method = np.full(len(points), "none", dtype=object)
+    todo = np.isfinite(x) & np.isfinite(y)
+    reused = 0
+
+    digest = _cache_digest(districts, name_col, max_nearest) if cache_name else None
+    prefix = _cache_prefix(cache_name) if cache_name else None
+    cached = _load_cache(prefix, digest) if cache_name else None
+    if cached is not None:
+        pos = cached.index.get_indexer(keys)
+        hit = todo & (pos >= 0)
+        same = np.zeros(len(points), dtype=bool)
+        same[hit] = (cached["x"].to_numpy()[pos[hit]] == x[hit]) & (cached["y"].to_numpy()[pos[hit]] == y[hit])
+        district[same] = cached["district"].to_numpy(dtype=object)[pos[same]]
+        method[same] = cached["method"].to_numpy(dtype=object)[pos[same]]
+        todo &= ~same
+        reused = int(same.sum())
+
+    if todo.any():
+        district[todo], method[todo] = _test_points(x[todo], y[todo], geoms, names, max_nearest)
+
+    if cache_name and (todo.any() or cached is None):
+        located = np.isfinite(x) & np.isfinite(y)
+        _save_cache(prefix, digest, pd.DataFrame({
+            "key": keys[located],
+            "x": x[located],
+            "y": y[located],
+            "district": district[located],
+            "method": method[located],
+        }))
+
+    summary = {
+        "within": int((method == "within").sum()),
+        "nearest": int((method == "nearest").sum()),
+        "unassigned": int((method == "none").sum()),
+        "retested": int(todo.sum()),
+        "reused": reused,
+    }
+    return pd.Series(district, index=points.index, dtype=object), summary
+
+
+def describe_assign_summary(summary):
+    return (
+        f"Districts: {summary['within']:,} within, {summary['nearest']:,} nearest, "
+        f"{summary['unassigned']:,} unassigned "
+        f"({summary['retested']:,} tested, {summary['reused']:,} from cache)"
+    )
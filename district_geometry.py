@@ -0,0 +1,188 @@
+"""Display geometry for the district boundaries.
+
+The plan shapefile is drawn once per district with every vertex at full
+precision.  ``DistrictTopology`` breaks the district boundaries into shared
+arcs (each border between two districts is stored once), so simplifying an
+arc moves both neighbours' edges together and no gaps or overlaps appear.
+From the simplified arcs it rebuilds per-district polygons with rounded
+coordinates, or emits TopoJSON.
+
+Only the drawn layer is simplified; the spatial join keeps using the
+full-resolution polygons.
+"""
+import json
+import math
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.ops import linemerge, polygonize, unary_union
+
+# degrees per pixel at zoom 0 with 256px tiles
+DEGREES_PER_PIXEL_Z0 = 360.0 / 256
+
+
+def zoom_tolerance(zoom, pixels=0.5):
+    """Simplification tolerance (degrees) that stays under ``pixels`` at ``zoom``."""
+    return pixels * DEGREES_PER_PIXEL_Z0 / 2 ** zoom
+
+
+def zoom_precision(zoom, pixels=0.5):
+    """Decimal places that keep rounding error well under the zoom's tolerance."""
+    return max(0, math.ceil(-math.log10(zoom_tolerance(zoom, pixels))) + 1)
+
+
+def _polygons(geom):
+    if geom is None or geom.is_empty:
+        return []
+    if isinstance(geom, Polygon):
+        return [geom]
+    if isinstance(geom, MultiPolygon):
+        return list(geom.geoms)
+    return [p for g in getattr(geom, "geoms", []) for p in _polygons(g)]
+
+
+class DistrictTopology:
+    """District polygons as faces bounded by shared, independently simplifiable arcs."""
+
+    def __init__(self, districts, name_col="district_name"):
+        self.crs = districts.crs
+        self.name_col = name_col
+        self.names = list(districts[name_col])
+        geoms = [shapely.make_valid(g) for g in districts.geometry]
+
+        merged = linemerge(unary_union([g.boundary for g in geoms]))
+        arc_lines = np.array(getattr(merged, "geoms", [merged]), dtype=object)
+        self.arcs = [np.asarray(a.coords) for a in arc_lines]
+        arc_tree = shapely.STRtree(arc_lines)
+        owner_tree = shapely.STRtree(geoms)
+
+        # faces: (district index, exterior ring refs, [hole ring refs]);
+        # a ring ref is a list of (arc index, reversed) in ring order
+        self.faces = []
+        for face in polygonize(arc_lines):
+            owners = owner_tree.query(face.representative_point(), predicate="within")
+            if len(owners) == 0:
+                continue  # a gap between districts or a hole in the plan
+            rings = [face.exterior, *face.interiors]
+            refs = [self._ring_refs(ring, arc_tree) for ring in rings]
+            self.faces.append((int(owners[0]), refs[0], refs[1:]))
+
+    def _ring_refs(self, ring, arc_tree):
+        # polygonize reuses the arcs' vertices exactly, so an arc lies on the
+        # ring iff its first segment is a ring segment (in either direction)
+        coords = [tuple(c) for c in ring.coords]
+        position = {seg: k for k, seg in enumerate(zip(coords, coords[1:]))}
+        found = []
+        for i in arc_tree.query(ring):
+            a = self.arcs[int(i)]
+            head, tail = (tuple(a[0]), tuple(a[1])), (tuple(a[-1]), tuple(a[-2]))
+            if head in position:
+                found.append((position[head], int(i), False))
+            elif tail in position:
+                found.append((position[tail], int(i), True))
+        return [(i, rev) for _, i, rev in sorted(found)]
+
+    def arc_coords(self, tolerance=0.0, precision=None):
+        """Every arc simplified by ``tolerance`` and rounded to ``precision`` decimals."""
+        out = []
+        for coords in self.arcs:
+            if tolerance > 0:
+                simple = np.asarray(shapely.simplify(shapely.linestrings(coords), tolerance, preserve_topology=True).coords)
+                closed = np.array_equal(coords[0], coords[-1])
+                if len(simple) >= (4 if closed else 2):
+                    coords = simple
+            if precision is not None:
+                coords = np.round(coords, precision)
+                keep = np.r_[True, np.any(np.diff(coords, axis=0) != 0, axis=1)]
+                coords = coords[keep] if keep.sum() >= 2 else coords[[0, -1]]
+            out.append(coords)
+        return out
+
+    @staticmethod
+    def _ring(refs, arcs):
+        parts = []
+        for i, rev in refs:
+            c = arcs[i][::-1] if rev else arcs[i]
+            parts.append(c if not parts else c[1:])
+        return np.concatenate(parts) if parts else np.empty((0, 2))
+
+    def geometries(self, tolerance=0.0, precision=None):
+        """One (Multi)Polygon per district, rebuilt from the simplified arcs."""
+        arcs = self.arc_coords(tolerance, precision)
+        parts = [[] for _ in self.names]
+        for owner, exterior, holes in self.faces:
+            shell = self._ring(exterior, arcs)
+            if len(shell) < 4:
+                continue  # collapsed at this tolerance
+            rings = [self._ring(h, arcs) for h in holes]
+            poly = Polygon(shell, [r for r in rings if len(r) >= 4])
+            if not poly.is_valid:
+                poly = shapely.make_valid(poly)
+            parts[owner].extend(_polygons(poly))
+        return [
+            p[0] if len(p) == 1 else MultiPolygon(p) if p else None
+            for p in parts
+        ]
+
+    def to_geodataframe(self, tolerance=0.0, precision=None):
+        return gpd.GeoDataFrame(
+            {self.name_col: self.names},
+            geometry=self.geometries(tolerance, precision),
+            crs=self.crs,
+        )
+
+    def to_topojson(self, tolerance=0.0, quantization=100000, object_name="districts"):
+        """TopoJSON topology (quantized, delta-encoded arcs) of the simplified districts."""
+        arcs = self.arc_coords(tolerance)
+        allc = np.concatenate(arcs)
+        x0, y0 = allc.min(axis=0)
+        x1, y1 = allc.max(axis=0)
+        kx = (x1 - x0) / (quantization - 1) or 1.0
+        ky = (y1 - y0) / (quantization - 1) or 1.0
+
+        topo_arcs = []
+        for coords in arcs:
+            q = np.round((coords - [x0, y0]) / [kx, ky]).astype(np.int64)
+            keep = np.r_[True, np.any(np.diff(q, axis=0) != 0, axis=1)]
+            q = q[keep] if keep.sum() >= 2 else q[[0, -1]]
+            topo_arcs.append(np.vstack([q[:1], np.diff(q, axis=0)]).tolist())
+
+        def ring(refs):
+            return [~i if rev else i for i, rev in refs]
+
+        polygons = [[] for _ in self.names]
+        for owner, exterior, holes in self.faces:
+            polygons[owner].append([ring(exterior)] + [ring(h) for h in holes])
+        geometries = [
+            {"type": "MultiPolygon", "arcs": polys, "properties": {self.name_col: name}}
+            for name, polys in zip(self.names, polygons)
+        ]
+        return {
+            "type": "Topology",
+            "transform": {"scale": [kx, ky], "translate": [x0, y0]},
+            "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+            "arcs": topo_arcs,
+        }
+
+    def write_topojson(self, path, **kwargs):
+        with open(path, "w") as f:
+            json.dump(self.to_topojson(**kwargs), f, separators=(",", ":"))
+
+
+def simplify_districts(districts, zoom, pixels=0.5, precision=None, name_col="district_name"):
+    """Simplified, coordinate-rounded copy of ``districts`` for drawing at ``zoom``."""
+    if precision is None:
+        precision = zoom_precision(zoom, pixels)
+    topology = DistrictTopology(districts[[name_col, "geometry"]], name_col=name_col)
+    return topology.to_geodataframe(zoom_tolerance(zoom, pixels), precision)
+
+
+def district_levels(districts, zooms, pixels=0.5, name_col="district_name"):
+    """{zoom: simplified districts} sharing one topology, for per-zoom-level tolerances."""
+    topology = DistrictTopology(districts[[name_col, "geometry"]], name_col=name_col)
+    return {
+        z: topology.to_geodataframe(zoom_tolerance(z, pixels), zoom_precision(z, pixels))
+        for z in zooms
+    }
@@ -0,0 +1,325 @@
+"""Static PNG images of every plan district, drawn without a browser or map tiles.
+
+    python district_images.py                   # statewide card plus one image per Senate district
+    python district_images.py --plan PLANH2316/PLANH2316.shp House --workers 4
+    python district_images.py --force
+
+Images follow the live map's drawing rules: district outlines in black with a
+10% fill, campuses as circles (charters as squares) filled blue where their
+district enrolls at most 5,000 students and red otherwise (see campus_layer).
+A district image shows that district and its campuses, with the neighbouring
+districts outlined in grey; the statewide image is the social card the page's
+og:image points to, which the page only links once the image exists (the
+pipeline's render stage reruns when it appears).  Files are named after the URL hash of the district:
+``SD.png`` statewide, ``SD12.png`` for district 12.
+
+Images render in a process pool.  The fingerprint of each image (plan
+geometry, the campuses drawn, this module's code and the marker style) is kept
+in ``manifest.json`` next to the images, and an image whose fingerprint is
+unchanged is not redrawn.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import shapely
+
+import campus_layer
+import gen_tra_map_senate as gen
+from campus_layer import CHARTER, LARGE, campus_kinds
+
+# === CONFIGURATION ===
+# social card size (og:image / twitter:card summary_large_image)
+IMAGE_SIZE = (1200, 630)
+MARGIN = 24
+# drawn at this multiple of IMAGE_SIZE and averaged down, for smooth edges
+SUPERSAMPLE = 2
+LAND_COLOR = "#ffffff"
+OUTSIDE_COLOR = "#f2f2f0"
+OUTLINE_COLOR = "#000000"
+NEIGHBOR_COLOR = "#a0a0a0"
+# boundary line width in image pixels, as on the live map
+OUTLINE_WEIGHT = 1
+DISTRICT_FILL_OPACITY = 0.1
+MANIFEST_NAME = "manifest.json"
+STYLE_SETTINGS = ("SMALL_COLOR", "LARGE_COLOR", "MARKER_RADIUS", "MARKER_WEIGHT", "MARKER_FILL_OPACITY")
+
+# plan and campus arrays shared by every image a worker draws
+_plan = None
+_campuses = None
+
+
+# === DRAWING ===
+def _rgb(color):
+    return np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)], dtype=np.float32)
+
+
+def _mercator(lat):
+    return np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def _projection(bounds, width, height, margin):
+    """Function of an (n, 2) lon/lat array to pixel x/y, fitting ``bounds`` in the image."""
+    minx, miny, maxx, maxy = bounds
+    left, right = np.radians(minx), np.radians(maxx)
+    bottom, top = _mercator(miny), _mercator(maxy)
+    scale = min((width - 2 * margin) / max(right - left, 1e-9), (height - 2 * margin) / max(top - bottom, 1e-9))
+    off_x = (width - (right - left) * scale) / 2
+    off_y = (height - (top - bottom) * scale) / 2
+
+    def project(coords):
+        x = (np.radians(coords[:, 0]) - left) * scale + off_x
+        y = (top - _mercator(coords[:, 1])) * scale + off_y
+        return np.column_stack([x, y])
+
+    return project
+
+
+def _labels(geoms, width, height):
+    """Index of the geometry covering each pixel centre, -1 where none does."""
+    labels = np.full((height, width), -1, dtype=np.int16)
+    for i, geom in enumerate(geoms):
+        minx, miny, maxx, maxy = geom.bounds
+        x0, x1 = max(int(minx), 0), min(int(np.ceil(maxx)), width)
+        y0, y1 = max(int(miny), 0), min(int(np.ceil(maxy)), height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        xs, ys = np.meshgrid(np.arange(x0, x1) + 0.5, np.arange(y0, y1) + 0.5)
+        shapely.prepare(geom)
+        inside = shapely.contains_xy(geom, xs, ys)
+        labels[y0:y1, x0:x1][inside] = i
+    return labels
+
+
+def _edges(mask, width):
+    """Pixels of ``mask`` within ``width`` pixels of a pixel with a different value."""
+    edge = np.zeros(mask.shape, dtype=bool)
+    for step in range(1, width + 1):
+        edge[:-step] |= mask[:-step] != mask[step:]
+        edge[step:] |= mask[step:] != mask[:-step]
+        edge[:, :-step] |= mask[:, :-step] != mask[:, step:]
+        edge[:, step:] |= mask[:, step:] != mask[:, :-step]
+    return edge
+
+
+def _stamps(scale):
+    """(fill, stroke) pixel masks of the circle and square campus markers, centred."""
+    radius = campus_layer.MARKER_RADIUS * scale
+    half_weight = campus_layer.MARKER_WEIGHT * scale / 2
+    reach = int(np.ceil(radius + half_weight))
+    dy, dx = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    circle = np.hypot(dx, dy)
+    # the canvas square has its vertices on the marker circle
+    half_side = max(round(campus_layer.MARKER_RADIUS * np.sqrt(0.5)), 1) * scale
+    square = np.maximum(abs(dx), abs(dy))
+    return {
+        "circle": (circle <= radius, abs(circle - radius) <= half_weight),
+        "square": (square <= half_side, abs(square - half_side) <= half_weight),
+    }
+
+
+def _draw_markers(pixels, x, y, kinds, scale):
+    stamps = _stamps(scale)
+    reach = stamps["circle"][0].shape[0] // 2
+    height, width = pixels.shape[:2]
+    alpha = campus_layer.MARKER_FILL_OPACITY
+    small, large, outline = _rgb(campus_layer.SMALL_COLOR), _rgb(campus_layer.LARGE_COLOR), _rgb(OUTLINE_COLOR)
+    # in data order, so later campuses paint over earlier ones as on the canvas
+    for cx, cy, kind in zip(np.round(x).astype(int), np.round(y).astype(int), kinds):
+        y0, y1, x0, x1 = cy - reach, cy + reach + 1, cx - reach, cx + reach + 1
+        if y1 <= 0 or x1 <= 0 or y0 >= height or x0 >= width:
+            continue
+        fill, stroke = stamps["square" if kind & CHARTER else "circle"]
+        cut = np.s_[max(-y0, 0):fill.shape[0] - max(y1 - height, 0), max(-x0, 0):fill.shape[1] - max(x1 - width, 0)]
+        area = pixels[max(y0, 0):min(y1, height), max(x0, 0):min(x1, width)]
+        color = large if kind & LARGE else small
+        area[fill[cut]] = area[fill[cut]] * (1 - alpha) + color * alpha
+        area[stroke[cut]] = outline
+
+
+def render_image(district=None, scale=SUPERSAMPLE):
+    """RGB uint8 array of ``district`` (a district name) or, for None, the whole plan."""
+    names, geoms = _plan
+    width, height = IMAGE_SIZE[0] * scale, IMAGE_SIZE[1] * scale
+    if district is None:
+        bounds = shapely.total_bounds(geoms)
+    else:
+        bounds = geoms[names.index(district)].bounds
+    project = _projection(bounds, width, height, MARGIN * scale)
+    labels = _labels(shapely.transform(geoms, project), width, height)
+
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[:] = _rgb(LAND_COLOR)
+    pixels[labels < 0] = _rgb(OUTSIDE_COLOR)
+    line = max(OUTLINE_WEIGHT * scale // 2, 1)
+    if district is None:
+        drawn = labels >= 0
+        outline = _edges(labels, line)
+    else:
+        selected = names.index(district)
+        drawn = labels == selected
+        pixels[_edges(labels, line) & (labels >= 0)] = _rgb(NEIGHBOR_COLOR)
+        outline = _edges(drawn, line)
+    pixels[drawn] *= 1 - DISTRICT_FILL_OPACITY
+    pixels[outline] = _rgb(OUTLINE_COLOR)
+
+    lon, lat, kinds, districts = _campuses
+    keep = districts == district if district is not None else np.ones(len(lon), dtype=bool)
+    xy = project(np.column_stack([lon[keep], lat[keep]]))
+    _draw_markers(pixels, xy[:, 0], xy[:, 1], kinds[keep], scale)
+
+    # average each scale x scale block down to one image pixel
+    total = sum(pixels[i::scale, j::scale] for i in range(scale) for j in range(scale))
+    return np.round(total / scale ** 2).astype(np.uint8)
+
+
+def write_png(path, pixels):
+    """Write an RGB uint8 array as an 8-bit truecolor PNG."""
+    height, width = pixels.shape[:2]
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    # filter byte 0 (none) ahead of every row
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)])
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 9)))
+        f.write(chunk(b"IEND", b""))
+    os.replace(tmp, path)
+
+
+# === FINGERPRINTS ===
+def image_name(abbrev, district=None):
+    return f"{abbrev}{district or ''}.png"
+
+
+def _plan_arrays(plan):
+    names = [str(d) for d in plan["district_name"]]
+    return names, np.asarray(plan.geometry.values)
+
+
+def _campus_arrays(gdf):
+    # the live map skips campuses without a point or a district
+    located = (~gdf.geometry.isna()).to_numpy()
+    gdf = gdf[located & gdf["district_name"].notna().to_numpy()]
+    districts = gdf["district_name"].astype(str).to_numpy(dtype=object)
+    return gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(), campus_kinds(gdf), districts
+
+
+def fingerprints(campuses, plan, abbrev):
+    """{image name: fingerprint} of the statewide image and every district image."""
+    names, geoms = plan
+    lon, lat, kinds, districts = campuses
+    common = hashlib.sha256(inspect.getsource(sys.modules[__name__]).encode("utf-8"))
+    for name in STYLE_SETTINGS:
+        common.update(repr(getattr(campus_layer, name)).encode("utf-8"))
+    # every image shows the outlines of its neighbours, so all depend on the whole plan
+    for name, wkb in zip(names, shapely.to_wkb(geoms)):
+        common.update(name.encode("utf-8") + wkb)
+
+    def digest(district, keep):
+        h = common.copy()
+        h.update(repr(district).encode("utf-8"))
+        for values in (lon[keep], lat[keep], kinds[keep]):
+            h.update(np.ascontiguousarray(values).tobytes())
+        return h.hexdigest()
+
+    out = {image_name(abbrev): digest(None, np.ones(len(lon), dtype=bool))}
+    for name in names:
+        out[image_name(abbrev, name)] = digest(name, districts == name)
+    return out
+
+
+def _load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+# === PROCESS POOL ===
+def _init_worker(plan, campuses):
+    global _plan, _campuses
+    _plan, _campuses = plan, campuses
+
+
+def _render_to(path, district):
+    start = time.perf_counter()
+    write_png(path, render_image(district))
+    return path, time.perf_counter() - start
+
+
+def render_all(gdf, plan, label="Senate", out_dir=gen.SOCIAL_IMAGE_DIR, workers=None, force=False):
+    """Draw every out-of-date image of ``plan``; returns (drawn names, unchanged names)."""
+    if not out_dir:
+        raise ValueError("no image directory: SOCIAL_IMAGE_DIR is None, pass out_dir")
+    abbrev = gen.CHAMBERS.get(label, {}).get("abbrev") or label
+    plan_arrays, campus_arrays = _plan_arrays(plan), _campus_arrays(gdf)
+    current = fingerprints(campus_arrays, plan_arrays, abbrev)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+
+    jobs = {}
+    for district in [None, *plan_arrays[0]]:
+        name = image_name(abbrev, district)
+        if force or manifest.get(name) != current[name] or not os.path.exists(os.path.join(out_dir, name)):
+            jobs[name] = district
+    unchanged = [name for name in current if name not in jobs]
+    if not jobs:
+        return [], unchanged
+
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    drawn = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(plan_arrays, campus_arrays)) as pool:
+        futures = {pool.submit(_render_to, os.path.join(out_dir, name), district): name
+                   for name, district in jobs.items()}
+        for future in as_completed(futures):
+            future.result()
+            name = futures[future]
+            # recorded as each image lands, so an interrupted run keeps what it drew
+            manifest[name] = current[name]
+            _save_manifest(out_dir, manifest)
+            drawn.append(name)
+    return sorted(drawn), unchanged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plan", nargs=2, metavar=("SHAPEFILE", "LABEL"),
+                        default=(os.path.join(gen.SHP_DIR, gen.SHP_NAME), "Senate"))
+    parser.add_argument("--out", default=gen.SOCIAL_IMAGE_DIR, required=not gen.SOCIAL_IMAGE_DIR,
+                        help="image directory (required when SOCIAL_IMAGE_DIR is None)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="redraw every image")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    shp_path, label = args.plan
+    plan = gen.load_plan(shp_path)
+    gdf = gen.assign_plan_districts(gen.load_campuses(), plan, cache_name=os.path.basename(shp_path))
+    drawn, unchanged = render_all(gdf, plan, label, args.out, args.workers, args.force)
+    print(f"Drew {len(drawn)} images, {len(unchanged)} unchanged, in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
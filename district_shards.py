@@ -0,0 +1,247 @@
+"""Sharded map output: a light statewide page plus one data file per district.
+
+Most visitors arrive on a deep link (``?district=12`` or ``#SD12``) and only
+look at one district, yet the single-page build embeds every polygon and
+every campus.  In the sharded build the page carries only the statewide
+outlines (simplified for the initial zoom, with campus counts in the
+tooltip), the district bounds and the popup template.  Each district's
+boundary, campus points and dictionary-encoded popup table are written to
+``<shard_dir>/district_<name>.json`` and fetched the first time the dropdown,
+a click on the outline or the URL selects that district.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+import shapely
+from branca.element import MacroElement
+from jinja2 import Template
+
+from campus_layer import CAMPUS_MARKER_JS, ISOLATED_KINDS, KIND_COUNT, campus_kinds
+from popups import format_popup_fields, popup_table, popup_template
+
+
+def _geometry_json(geom):
+    return json.loads(shapely.to_geojson(geom))
+
+
+def write_district_shards(gdf, districts, shard_dir, template=popup_template, precision=6):
+    """Write one JSON file per district; returns {district name: file name}.
+
+    ``districts`` holds the boundary drawn for each ``district_name``;
+    campuses without a district are left out, as in the single-page build.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    fields = format_popup_fields(gdf)
+    kinds = campus_kinds(gdf)
+    lat = np.round(gdf.geometry.y.to_numpy(), precision)
+    lon = np.round(gdf.geometry.x.to_numpy(), precision)
+    names = gdf["district_name"].to_numpy(dtype=object)
+
+    files = {}
+    for d, geom in zip(districts["district_name"], districts.geometry):
+        rows = np.flatnonzero(names == d)
+        shard = {
+            "district": d,
+            "boundary": _geometry_json(geom),
+            "lat": lat[rows].tolist(),
+            "lon": lon[rows].tolist(),
+            "kind": kinds[rows].tolist(),
+            "popup": popup_table(fields.iloc[rows], template),
+        }
+        files[d] = f"district_{d}.json"
+        with open(os.path.join(shard_dir, files[d]), "w", encoding="utf-8") as f:
+            json.dump(shard, f, ensure_ascii=False, separators=(",", ":"))
+
+    # districts of an earlier plan that no longer exist
+    for stale in glob.glob(os.path.join(glob.escape(shard_dir), "district_*.json")):
+        if os.path.basename(stale) not in files.values():
+            os.remove(stale)
+    return files
+
+
+class DistrictShardLayer(MacroElement):
+    """Statewide outline layer and the district selector that loads shards on demand.
+
+    ``summary`` are the outlines drawn statewide, ``districts`` the boundaries
+    written into the shards and ``bounds`` maps district -> [[s, w], [n, e]].
+    ``control_html`` is the dropdown/isolate markup of the top-right control.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var label = {{ this.label|tojson }};
+            var boundsMap = {{ this.bounds|tojson }};
+            var shardUrls = {{ this.urls|tojson }};
+            var literals = {{ this.template.literals|tojson }};
+            var fields = {{ this.template.fields|tojson }};
+            var districtStyle = { color: 'black', weight: 1, fillOpacity: 0.1 };
+            var renderer = L.canvas({ pane: 'markerPane', padding: 0.5 });
+
+            {{ this.marker_js }}
+
+            var container = L.DomUtil.create('div', 'district-selector');
+            container.innerHTML = `{{ this.control_html }}`;
+            L.DomEvent.disableClickPropagation(container);
+            var DistrictControl = L.Control.extend({
+                options: { position: 'topright' },
+                onAdd: function(map) {
+                    return container;
+                }
+            });
+            map.addControl(new DistrictControl());
+            var dropdown = container.querySelector('#districtDropdown');
+            var isolate = container.querySelector('#isolateToggle');
+
+            var summary = L.geoJSON({{ this.summary|tojson }}, {
+                smoothFactor: 0,
+                style: districtStyle,
+                onEachFeature: function(feature, layer) {
+                    var p = feature.properties;
+                    layer.bindTooltip(label + ' District ' + p.district_name + '<br>' + p.campuses + ' campuses');
+                    layer.on('click', function() { select(p.district_name); });
+                }
+            }).addTo(map);
+
+            function popupHtml(table, i) {
+                var html = literals[0];
+                for (var k = 0; k < fields.length; k++) {
+                    var col = table[fields[k]];
+                    html += col.values[col.codes[i]] + literals[k + 1];
+                }
+                return html;
+            }
+
+            function build(shard) {
+                var group = L.featureGroup();
+                L.geoJSON(shard.boundary, { smoothFactor: 0, style: districtStyle })
+                    .bindTooltip(label + ' District ' + shard.district)
+                    .addTo(group);
+                function popupFor(layer) {
+                    return popupHtml(shard.popup, layer.options.campus);
+                }
+                // one sub-group per kind code, swapped as a whole by the isolate toggle
+                group.kinds = [];
+                for (var k = 0; k < {{ this.KIND_COUNT }}; k++) {
+                    group.kinds.push(L.featureGroup());
+                }
+                group.markers = [];
+                for (var i = 0; i < shard.lat.length; i++) {
+                    var marker = campusMarker(shard.lat[i], shard.lon[i], shard.kind[i], { renderer: renderer, campus: i });
+                    marker.bindPopup(popupFor, { maxWidth: 300 });
+                    marker.bindTooltip(popupFor, { sticky: false });
+                    group.kinds[shard.kind[i]].addLayer(marker);
+                    group.markers.push(marker);
+                }
+                return group;
+            }
+
+            var shards = {};
+            function load(d) {
+                if (!shards[d]) {
+                    shards[d] = fetch(shardUrls[d]).then(function(response) {
+                        if (!response.ok) { throw new Error(shardUrls[d] + ': HTTP ' + response.status); }
+                        return response.json();
+                    }).then(build);
+                }
+                return shards[d];
+            }
+
+            var current = null;
+            function applyFilter() {
+                if (!current) { return; }
+                var checked = isolate.checked;
+                var isolatedKinds = {{ this.ISOLATED_KINDS|tojson }};
+                current.kinds.forEach(function(group, kind) {
+                    if (!checked || isolatedKinds.indexOf(kind) !== -1) {
+                        current.addLayer(group);
+                    } else {
+                        current.removeLayer(group);
+                    }
+                });
+            }
+
+            function select(d) {
+                dropdown.value = d;
+                if (current) {
+                    map.removeLayer(current);
+                    current = null;
+                }
+                if (!d) {
+                    summary.addTo(map);
+                    map.setView([31.0, -99.0], 6);
+                    return Promise.resolve(null);
+                }
+                map.removeLayer(summary);
+                map.fitBounds(boundsMap[d]);
+                // resolves to the district's group once shown (null if replaced meanwhile)
+                return load(d).then(function(group) {
+                    // another district may have been picked while this one loaded
+                    if (dropdown.value !== d) { return null; }
+                    current = group;
+                    applyFilter();
+                    group.addTo(map);
+                    return group;
+                }).catch(function(err) {
+                    delete shards[d];
+                    console.error(err);
+                    return null;
+                });
+            }
+
+            dropdown.addEventListener('change', function(e) { select(e.target.value); });
+            {%- if this.search %}
+
+            // search box hooks (see search_index.py); rows index the district's shard
+            map.showDistrict = select;
+            map.showCampus = function(d, row) {
+                var shown = current && dropdown.value === d ? Promise.resolve(current) : select(d);
+                return shown.then(function(group) {
+                    var marker = group && group.markers[row];
+                    if (marker && !map.hasLayer(marker) && isolate.checked) {
+                        isolate.checked = false;
+                        applyFilter();
+                    }
+                    return marker;
+                });
+            };
+            {%- endif %}
+            isolate.addEventListener('change', applyFilter);
+
+            // check URL for district param or hash
+            var params = new URLSearchParams(window.location.search);
+            var param = params.get('district') || window.location.hash.substring(1);
+            if (param) {
+                var d = param.replace(/^{{ this.abbrev }}/i, '');
+                if (shardUrls.hasOwnProperty(d)) { select(d); }
+            }
+        })();
+        {% endmacro %}
+        """
+    )
+
+    marker_js = CAMPUS_MARKER_JS
+    KIND_COUNT = KIND_COUNT
+    ISOLATED_KINDS = list(ISOLATED_KINDS)
+
+    def __init__(self, gdf, summary, districts, bounds, shard_dir, label="Senate", abbrev="SD",
+                 control_html="", template=popup_template, precision=6, search=False):
+        super().__init__()
+        self._name = "DistrictShardLayer"
+        files = write_district_shards(gdf, districts, shard_dir, template, precision)
+        base = os.path.basename(os.path.normpath(shard_dir))
+        self.urls = {d: f"{base}/{name}" for d, name in files.items()}
+        counts = gdf["district_name"].value_counts()
+        outlines = summary[["district_name", "geometry"]].copy()
+        outlines["campuses"] = outlines["district_name"].map(counts).fillna(0).astype(int)
+        self.summary = json.loads(outlines.to_json())
+        self.bounds = bounds
+        self.label = label
+        self.abbrev = abbrev
+        self.control_html = control_html
+        self.template = template
+        self.search = search
@@ -1,12 +1,25 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
 import folium
 from folium import Element
 from branca.element import JavascriptLink, CssLink
 
+import build_profile as profile
+from allotment import SMALL_DISTRICT_ENROLLMENT
+from campus_data import COORD_COLUMNS, compact_frame, describe_coord_summary, resolve_coords
+from campus_clusters import CampusClusterLayer
+from campus_layer import ISOLATED_KINDS, KIND_COUNT, CampusCanvasLayer, campus_kinds
+from district_assign import assign_districts, describe_assign_summary
+from district_geometry import DistrictTopology, zoom_precision, zoom_tolerance
+from district_shards import DistrictShardLayer
+from search_index import CampusSearch
+from popups import format_popup_fields, popup_html_script, popup_table_script, popup_template_for
+from tapr_processing import MASKED_COLUMN, read_campus_profile
+from tea_reader import CAMPUS_ID_WIDTH, read_table
+
 # === LOAD EASYPRINT PLUGIN ===
 # (Add JS plugin after map creation)
 
@@ -14,531 +27,695 @@ from branca.element import JavascriptLink, CssLink
 SHP_DIR = "PLANS2168"
 SHP_NAME = "PLANS2168.shp"
 EXCEL_PATH = "AskTED Geocoded_Spring 2024.xlsx"
+# the AskTED columns the map uses; only these are read
+ASKTED_COLUMNS = [
+    "School Number", "School Name", "District Name", "District Type", "Full_Site_Address",
+    "Latitude", "Longitude", "Census_Latitude", "Census_Longitude",
+    "School Enrollment as of Oct 2023", "District Enrollment as of Oct 2023",
+]
+TEACHER_PROFILE_PATH = "Campus Teacher Profile.parquet"
+# the campus profile columns the popups and cost estimates use; only these are read
+PROFILE_COLUMNS = [
+    "School Number", "District Number", "DISTNAME", MASKED_COLUMN,
+    "Teacher Beginning Full Time Equiv Count", "Teacher Beginning Full Time Equiv Percent",
+    "Teacher Beginning Base Salary Average",
+    "Teacher 1-5 Years Full Time Equiv Count", "Teacher 1-5 Years Full Time Equiv Percent",
+    "Teacher 1-5 Years Base Salary Average",
+    "Teacher 5+ Years Full Time Equiv Count", "Teacher 5+ Years Full Time Equiv Percent",
+    "Teacher 5+ Years Base Salary Average",
+]
+# names repeated across a district's campuses, held as categoricals
+CATEGORY_COLUMNS = ["District Name", "District Type", "DISTNAME"]
 OUTPUT_MAP = "index.html"
-
-# === LOAD SCHOOL DATA ===
-df = pd.read_excel(EXCEL_PATH, sheet_name="School Data")
-def resolve_coords(r):
-    lat = r['Census_Latitude'] if pd.notnull(r['Census_Latitude']) else r['Latitude']
-    lon = r['Census_Longitude'] if pd.notnull(r['Census_Longitude']) else r['Longitude']
-    if pd.isnull(lat) or pd.isnull(lon):
-        print(f"Missing coords for {r['School Name']} – {r['District Name']}")
-        return None
-    return Point(lon, lat)
-df['geometry'] = df.apply(resolve_coords, axis=1)
-df = df[df.geometry.notnull()]
-
-df_teacher_data = pd.read_excel("Campus Teacher Profile.xlsx")
-
-df = pd.merge(df, df_teacher_data, how="right", on="School Number")
-
-# keep only rows where Full_Site_Address is NOT exactly "TX,  "
-df = df[df['Full_Site_Address'] != 'TX,  ']
-
-gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-
-# === LOAD SENATE DISTRICTS ===
-senate = gpd.read_file(os.path.join(SHP_DIR, SHP_NAME)).to_crs("EPSG:4326")
-senate['district_name'] = senate['District'].astype(str)
-
-# === SPATIAL JOIN ===
-gdf = gpd.sjoin(
-    gdf,
-    senate[['district_name', 'geometry']],
-    how='left',
-    predicate='within'
-).drop(columns=['index_right'])
-
-# === BUILD BASE MAP ===
-m = folium.Map(
-    location=[31.0, -99.0],
-    zoom_start=6,
-    tiles="CartoDB positron",
-    control_scale=True,
-    zoom_snap=0.25,
-    zoom_delta=0.25,
-    # prefer_canvas=True
-)
-# Fit map to cover all of Texas on initial load
-minx, miny, maxx, maxy = senate.total_bounds
-m.fit_bounds([[miny, minx], [maxy, maxx]])
-m_name = m.get_name()
-
-m.get_root().header.add_child(JavascriptLink(
-    "https://unpkg.com/leaflet-image@0.4.0/leaflet-image.js"
-))
-m.get_root().header.add_child(Element('<title>CSHB 2: TRA Map - TX Senate</title>'))
-og_meta = Element("""
-    <!-- Open Graph / Twitter meta tags for link previews -->
-    <meta property="og:title" content="CSHB 2: Teacher Retention Allotment Map - TX Senate" />
-    <meta property="og:description" content="An interactive statewide map of Texas senate districts showing per-teacher retention allotments by experience." />
-    <meta property="og:url" content="https://txedinfo.github.io/CSHB2TeacherRetentionAllotmentMap/" />
-    <meta name="twitter:card" content="summary_large_image" />
-    <meta name="twitter:title" content="CSHB 2: Teacher Retention Allotment Map - TX Senate" />
-    <meta name="twitter:description" content="An interactive statewide map of Texas senate districts showing per-teacher retention allotments by experience." />
-""")
-m.get_root().header.add_child(og_meta)
-
-# === CREATE CUSTOM MARKER PANE ===
-pane_script = Element(f"""
-<script>
-window.addEventListener('load', function() {{
-    var map = {m_name};
-    map.createPane('markerPane');
-    map.getPane('markerPane').style.zIndex = 650;
-}});
-</script>
-""")
-m.get_root().html.add_child(pane_script)
-
-
-# === ADD MAP TITLE ===
-title_html = '''
-<style>
-    html, body {
-        display: flex;
-        flex-direction: column;
-        height: 100%;
-        margin: 0;
-    }
-    .map-title {
-        flex: none;
-        font-family: Helvetica, sans-serif;
-        font-weight: bold;
-        text-align: center;
-        background-color: white;
-        padding: 15px;
-        z-index: 9998;
-        font-size: 16px;
-    }
-    .folium-map {
-        flex: 1;
-    }
-    .map-footer {
-        flex: none;
-        text-align: center;
+MISSING_COORDS_REPORT = "Missing School Coordinates.xlsx"
+# "inline": every marker carries its popup/tooltip HTML
+# "lazy": campus fields are embedded once and popups are built on hover/click
+POPUP_MODE = "inline"
+# "folium": one folium marker per campus
+# "canvas": all campuses as one data-driven layer on a shared canvas renderer
+MARKER_MODE = "folium"
+# district boundaries are drawn simplified to half a pixel at this zoom level
+# (None keeps full resolution); the spatial join always uses the full shapefile
+BOUNDARY_ZOOM = 12
+# also write the simplified boundaries as TopoJSON, e.g. "senate_districts.topojson"
+BOUNDARY_TOPOJSON = None
+# "single": one self-contained page
+# "sharded": a light page plus one data file per district in <output>_districts/,
+# fetched when the district is selected (needs to be served over http, not file://)
+OUTPUT_MODE = "single"
+# the statewide view of the sharded page draws district outlines simplified for this zoom
+SUMMARY_ZOOM = 7
+# search box over a prebuilt index of campus, district/charter and plan district names
+SEARCH_INDEX = True
+# below this zoom the single-page map draws each district's campuses as
+# precomputed clusters (see campus_clusters.py); None draws every marker
+CLUSTER_ZOOM = 10
+
+# campuses outside every district polygon snap to the nearest one within this
+# distance (degrees, ~2 km); 0 disables the fallback
+NEAREST_DISTRICT_MAX_DEGREES = 0.02
+
+SITE_URL = "https://txedinfo.github.io/CSHB2TeacherRetentionAllotmentMap/"
+# directory (next to the page) of the images drawn by district_images.py; the
+# statewide one is the page's link-preview image once it has been drawn.
+# None leaves it out
+SOCIAL_IMAGE_DIR = "district_images"
+# per-chamber wording: district prefix accepted in the URL hash (#SD12) and
+# the noun used in link-preview descriptions
+CHAMBERS = {
+    "Senate": {"abbrev": "SD", "noun": "senate"},
+    "House": {"abbrev": "HD", "noun": "house"},
+    "SBOE": {"abbrev": "SBOE", "noun": "State Board of Education"},
+    "Congressional": {"abbrev": "CD", "noun": "congressional"},
+}
+
+
+ISOLATE_TOGGLE_HTML = """
+    <label style="font-size:12px;">
+      <input type="checkbox" id="isolateToggle" checked style="font-size: 12px"/>
+        Isolate Small Charters/<br>
+      <span style="display:block; text-align:right; width:100%;">Large Public Schools</span>
+    </label>
+    """
+# search box hooks (see search_index.py) inside the dropdown script: campus row ->
+# marker is collected once, a lookup only switches district and isolate filter
+SEARCH_HOOKS_JS = """
+
+        var campusMarkers = {};
+        for (var d in kindGroups) {
+          kindGroups[d].forEach(function(group) {
+            group.eachLayer(function(layer) {
+              campusMarkers[layer.options.campus] = layer;
+            });
+          });
+        }
+        var districtDropdown = document.getElementById('districtDropdown');
+        map.showDistrict = function(d) {
+            districtDropdown.value = d;
+            districtDropdown.dispatchEvent(new Event('change'));
+        };
+        map.showCampus = function(d, i) {
+            var marker = campusMarkers[i];
+            if (districtDropdown.value !== d) {
+                map.showDistrict(d);
+            }
+            if (marker && clusters && clusters.active()) {
+                // clusters stand in for the markers out here
+                map.setView(marker.getLatLng(), clusters.maxZoom, { animate: false });
+            }
+            var isolate = document.getElementById('isolateToggle');
+            if (marker && !map.hasLayer(marker) && isolate.checked) {
+                isolate.checked = false;
+                applyFilter();
+            }
+            return Promise.resolve(marker);
+        };"""
+DISTRICT_SELECTOR_STYLE = """
+    <style>
+    .district-selector {
+        background: white;
         padding: 10px;
+        border: 1px solid gray;
         font-size: 12px;
-        background-color: #f8f9fa;
-    }
-    .leaflet-control-layers {
-        display: none !important;
     }
-</style>
-<div class="map-title">
-    CSHB 2: Teacher Retention Allotment Map - TX Senate
-</div>
-'''
-m.get_root().html.add_child(Element(title_html))
-
-# === CREATE FEATURE GROUPS ===
-district_groups = {}
-for d in sorted(senate['district_name'].unique(), key=lambda x: int(x)):
-    fg = folium.FeatureGroup(name=f"Senate District {d}", show=True)
-    fg.add_to(m)
-    # add the polygon for this district
-    sel = senate[senate['district_name'] == d]
-    folium.GeoJson(
-        sel,
-        name=f"District {d}",
-        smooth_factor=0,
-        style_function=lambda f: {'color': 'black', 'weight': 1, 'fillOpacity': 0.1},
-        highlight_function=lambda f: {'weight': 3, 'fillOpacity': 0.3},
-        tooltip=folium.GeoJsonTooltip(fields=['district_name'], aliases=['Senate District'])
-    ).add_to(fg)
-    district_groups[d] = fg
-
-# === COMPUTE DISTRICT BOUNDS FOR ZOOM ===
-bounds_dict = {}
-for d, fg in district_groups.items():
-    sel = senate[senate['district_name'] == d]
-    minx, miny, maxx, maxy = sel.total_bounds
-    bounds_dict[d] = [[float(miny), float(minx)], [float(maxy), float(maxx)]]
-
-# === DROPDOWN SCRIPT ===
-options_html = "".join(
-    f'<option value="{d}">Senate District {d}</option>'
-    for d in sorted(senate['district_name'].unique(), key=lambda x: int(x))
-)
-distmap_js = "{" + ",".join(
-    f'"{d}": {district_groups[d].get_name()}'
-    for d in district_groups
-) + "}"
-bounds_js = json.dumps(bounds_dict)
-m_dropdown_checkbox = """
-<label style="font-size:12px;">
-  <input type="checkbox" id="isolateToggle" checked style="font-size: 12px"/>
-    Isolate Small Charters/<br>
-  <span style="display:block; text-align:right; width:100%;">Large Public Schools</span>
-</label>
+    </style>
 """
-new_dropdown_block = f"""
-<style>
-.district-selector {{
-    background: white;
-    padding: 10px;
-    border: 1px solid gray;
-    font-size: 12px;
-}}
-</style>
-<script>
-window.addEventListener('load', function() {{
-    var map = {m_name};
-    var container = L.DomUtil.create('div', 'district-selector');
-    container.innerHTML = `
-      <select id="districtDropdown" style="display:block; margin-bottom:4px; font-size:12px;">
-        <option value="">All Senate Districts</option>
-        {options_html}
-      </select>
-      {m_dropdown_checkbox}
-    `;
-    L.DomEvent.disableClickPropagation(container);
-
-    var DistrictControl = L.Control.extend({{
-        options: {{ position: 'topright' }},
-        onAdd: function(map) {{
-            return container;
-        }}
+
+
+@profile.stage("load_campuses")
+def load_campuses(excel_path=EXCEL_PATH, teacher_profile_path=TEACHER_PROFILE_PATH):
+    """AskTED campuses with coordinates merged with the campus teacher profile."""
+    # === LOAD SCHOOL DATA ===
+    with profile.stage("excel_load"):
+        # the same zero-padded text key as the TAPR campus profile
+        df = read_table(excel_path, columns=ASKTED_COLUMNS, sheet_name="School Data",
+                        ids={"School Number": CAMPUS_ID_WIDTH})
+    with profile.stage("coordinates"):
+        df['geometry'], coord_summary = resolve_coords(df)
+    print(describe_coord_summary(coord_summary))
+    # written even when empty, so it never holds rows of an earlier build
+    coord_summary["rows"].to_excel(MISSING_COORDS_REPORT, index=False)
+    df = compact_frame(df[df.geometry.notnull()].drop(columns=COORD_COLUMNS), CATEGORY_COLUMNS)
+
+    with profile.stage("profile_load"):
+        df_teacher_data = compact_frame(read_campus_profile(teacher_profile_path, PROFILE_COLUMNS), CATEGORY_COLUMNS)
+
+    with profile.stage("merge"):
+        df = pd.merge(df, df_teacher_data, how="right", on="School Number")
+
+        # keep only rows where Full_Site_Address is NOT exactly "TX,  "
+        df = df[df['Full_Site_Address'] != 'TX,  '].drop(columns="Full_Site_Address")
+
+        # the right merge turns integer columns of unmatched campuses into floats
+        gdf = gpd.GeoDataFrame(compact_frame(df, CATEGORY_COLUMNS), geometry='geometry', crs="EPSG:4326")
+    return gdf
+
+
+def load_plan(shp_path):
+    """District polygons of a redistricting plan shapefile, in EPSG:4326."""
+    plan = gpd.read_file(shp_path).to_crs("EPSG:4326")
+    plan['district_name'] = plan['District'].astype(str)
+    return plan
+
+
+@profile.stage("sjoin")
+def assign_plan_districts(campuses, plan, cache_name=SHP_NAME):
+    """Copy of ``campuses`` with the ``district_name`` of ``plan`` each falls in."""
+    # === SPATIAL JOIN ===
+    # prepared-index point-in-polygon test, cached per plan geometry; campuses just
+    # outside every polygon fall back to the nearest district
+    # shallow: the new column is the only data not shared with ``campuses``
+    gdf = campuses.copy(deep=False)
+    gdf['district_name'], assign_summary = assign_districts(
+        gdf.geometry, plan, keys=gdf['School Number'], cache_name=cache_name,
+        max_nearest=NEAREST_DISTRICT_MAX_DEGREES,
+    )
+    print(describe_assign_summary(assign_summary))
+    return gdf
+
+
+def build_map(campuses, plan, label="Senate", output=OUTPUT_MAP, cache_name=SHP_NAME):
+    """Render the allotment map of ``campuses`` over the districts of ``plan``."""
+    render_map(assign_plan_districts(campuses, plan, cache_name), plan, label, output)
+
+
+def _district_control_html(plan, label):
+    """District dropdown and isolate toggle shown in the top-right control."""
+    options_html = "".join(
+        f'<option value="{d}">{label} District {d}</option>'
+        for d in sorted(plan['district_name'].unique(), key=lambda x: int(x))
+    )
+    return f"""
+          <select id="districtDropdown" style="display:block; margin-bottom:4px; font-size:12px;">
+            <option value="">All {label} Districts</option>
+            {options_html}
+          </select>
+          {ISOLATE_TOGGLE_HTML}
+        """
+
+
+def social_image(output, label):
+    """Path of the statewide image district_images.py draws for a page, None when off."""
+    if not SOCIAL_IMAGE_DIR:
+        return None
+    abbrev = CHAMBERS.get(label, {}).get("abbrev") or label
+    return os.path.join(os.path.dirname(output), SOCIAL_IMAGE_DIR, f"{abbrev}.png")
+
+
+@profile.stage("render")
+def render_map(gdf, plan, label="Senate", output=OUTPUT_MAP, layer_cache=None):
+    """Write the map for campuses that already carry their ``district_name``.
+
+    ``layer_cache`` (see watch.py) may stand in for ``_add_map_layers`` and
+    replay the layers of an earlier render.
+    """
+    chamber = CHAMBERS.get(label, {"abbrev": "", "noun": label.lower()})
+    page_name = os.path.basename(output)
+    page_url = SITE_URL if page_name == "index.html" else SITE_URL + page_name
+
+    # === BUILD BASE MAP ===
+    m = folium.Map(
+        location=[31.0, -99.0],
+        zoom_start=6,
+        tiles="CartoDB positron",
+        control_scale=True,
+        zoom_snap=0.25,
+        zoom_delta=0.25,
+        prefer_canvas=MARKER_MODE == "canvas",
+    )
+    # Fit map to cover all of Texas on initial load
+    minx, miny, maxx, maxy = plan.total_bounds
+    m.fit_bounds([[miny, minx], [maxy, maxx]])
+    if layer_cache is not None:
+        layer_cache.pin(m)
+    m_name = m.get_name()
+
+    m.get_root().header.add_child(JavascriptLink(
+        "https://unpkg.com/leaflet-image@0.4.0/leaflet-image.js"
+    ))
+    m.get_root().header.add_child(Element(f'<title>CSHB 2: TRA Map - TX {label}</title>'))
+    og_image = ""
+    image = social_image(output, label)
+    # a link preview pointing at an image that was never drawn would 404
+    if image and os.path.exists(image):
+        image_url = f"{SITE_URL}{SOCIAL_IMAGE_DIR}/{os.path.basename(image)}"
+        og_image = f"""
+        <meta property="og:image" content="{image_url}" />
+        <meta name="twitter:image" content="{image_url}" />"""
+    og_meta = Element(f"""
+        <!-- Open Graph / Twitter meta tags for link previews -->
+        <meta property="og:title" content="CSHB 2: Teacher Retention Allotment Map - TX {label}" />
+        <meta property="og:description" content="An interactive statewide map of Texas {chamber['noun']} districts showing per-teacher retention allotments by experience." />
+        <meta property="og:url" content="{page_url}" />{og_image}
+        <meta name="twitter:card" content="summary_large_image" />
+        <meta name="twitter:title" content="CSHB 2: Teacher Retention Allotment Map - TX {label}" />
+        <meta name="twitter:description" content="An interactive statewide map of Texas {chamber['noun']} districts showing per-teacher retention allotments by experience." />
+    """)
+    m.get_root().header.add_child(og_meta)
+
+    # === CREATE CUSTOM MARKER PANE ===
+    pane_script = Element(f"""
+    <script>
+    window.addEventListener('load', function() {{
+        var map = {m_name};
+        map.createPane('markerPane');
+        map.getPane('markerPane').style.zIndex = 650;
     }});
-    map.addControl(new DistrictControl());
-
-    var distMap = {distmap_js};
-    var boundsMap = {bounds_js};
-
-    // build an object mapping each district to its markers
-    var markerLayersByDistrict = {{}};
-    for (var k in distMap) {{
-        markerLayersByDistrict[k] = [];
-    }}
-    map.eachLayer(function(layer) {{
-        if (layer instanceof L.CircleMarker || (layer.options && layer.options.numberOfSides === 4)) {{
-            for (var d in distMap) {{
-                if (distMap[d].hasLayer(layer)) {{
-                    markerLayersByDistrict[d].push(layer);
-                }}
-            }}
-        }}
+    </script>
+    """)
+    m.get_root().html.add_child(pane_script)
+
+
+    # === ADD MAP TITLE ===
+    title_style = '''
+    <style>
+        html, body {
+            display: flex;
+            flex-direction: column;
+            height: 100%;
+            margin: 0;
+        }
+        .map-title {
+            flex: none;
+            font-family: Helvetica, sans-serif;
+            font-weight: bold;
+            text-align: center;
+            background-color: white;
+            padding: 15px;
+            z-index: 9998;
+            font-size: 16px;
+        }
+        .folium-map {
+            flex: 1;
+        }
+        .map-footer {
+            flex: none;
+            text-align: center;
+            padding: 10px;
+            font-size: 12px;
+            background-color: #f8f9fa;
+        }
+        .leaflet-control-layers {
+            display: none !important;
+        }
+    </style>
+    '''
+    title_html = title_style + f'''
+    <div class="map-title">
+        CSHB 2: Teacher Retention Allotment Map - TX {label}
+    </div>
+    '''
+    m.get_root().html.add_child(Element(title_html))
+
+    # === SCREENSHOT BUTTON VIA leaflet-image ===
+    screenshot_html = f'''
+    <div style="
+        position: fixed; top: 10px; left: 10px;
+        z-index: 9999; background: none; padding: 0;
+    ">
+      <button id="downloadMapBtn" style="
+          background: white;
+          border: 1px solid gray;
+          padding: 5px;
+          font-size: 14px;
+          cursor: pointer;
+          display: none;
+      ">Download PNG</button>
+    </div>
+    <script>
+    window.addEventListener('load', function() {{
+        document.getElementById('downloadMapBtn').addEventListener('click', function() {{
+            leafletImage({m_name}, function(err, canvas) {{
+                if (err) console.error(err);
+                var imgData = canvas.toDataURL("image/png");
+                var link = document.createElement("a");
+                link.href = imgData;
+                link.download = "CSHB2 Teacher Retention Allotment Map - TX {label}.png";
+                link.click();
+            }});
+        }});
     }});
+    </script>
+    '''
+    m.get_root().html.add_child(Element(screenshot_html))
+
+    # === COMPUTE DISTRICT BOUNDS FOR ZOOM ===
+    bounds_dict = {}
+    for d in sorted(plan['district_name'].unique(), key=lambda x: int(x)):
+        sel = plan[plan['district_name'] == d]
+        minx, miny, maxx, maxy = sel.total_bounds
+        bounds_dict[d] = [[float(miny), float(minx)], [float(maxy), float(maxx)]]
+
+    # === DISTRICTS AND CAMPUSES ===
+    m.get_root().html.add_child(Element(DISTRICT_SELECTOR_STYLE))
+    if layer_cache is None:
+        _add_map_layers(m, gdf, plan, label, chamber, bounds_dict, output)
+    else:
+        layer_cache.add(m, lambda: _add_map_layers(m, gdf, plan, label, chamber, bounds_dict, output))
 
-    function applyFilter() {{
-      var checked = document.getElementById('isolateToggle').checked;
-      var sel = document.getElementById('districtDropdown').value;
-      // hide everything first
-      Object.values(markerLayersByDistrict).flat().forEach(layer => {{
-        if (map.hasLayer(layer)) map.removeLayer(layer);
-      }});
-      if (!checked) {{
-        // show all markers in selected district or all
-        if (sel) {{
-          markerLayersByDistrict[sel].forEach(layer => map.addLayer(layer));
-        }} else {{
-          Object.values(markerLayersByDistrict).flat().forEach(layer => map.addLayer(layer));
-        }}
-      }} else {{
-        // isolate small charters / large public
-        var targets = sel ? [sel] : Object.keys(markerLayersByDistrict);
-        targets.forEach(d => {{
-          markerLayersByDistrict[d].forEach(layer => {{
-            var isCharterSmall = layer.options.numberOfSides === 4 && layer.options.fillColor === "#0D92F4";
-            var isPublicLarge = layer.options.numberOfSides !== 4 && layer.options.fillColor === "#F95454";
-            if (isCharterSmall || isPublicLarge) {{
-              map.addLayer(layer);
+
+    # === LAYER CONTROL ===
+    folium.LayerControl().add_to(m)
+
+
+
+    # === ADD LEGEND ===
+    legend_html = """
+    <div style="
+        position: fixed;
+        bottom: 10px;
+        right: 10px;
+        background: white;
+        padding: 10px;
+        border: 1px solid gray;
+        z-index: 9999;
+        font-size: 12px;
+    ">
+        <div>
+            <svg width="12" height="12">
+                <circle cx="6" cy="6" r="5" fill="#0D92F4" stroke="black" stroke-width="1"></circle>
+            </svg>
+            Enrollment ≤ 5,000 (Public School)
+        </div>
+        <div>
+            <svg width="12" height="12">
+                <circle cx="6" cy="6" r="5" fill="#F95454" stroke="black" stroke-width="1"></circle>
+            </svg>
+            Enrollment > 5,000 (Public School)
+        </div>
+        <div>
+            <svg width="12" height="12">
+                <rect x="1" y="1" width="10" height="10" fill="#0D92F4" stroke="black" stroke-width="1"></rect>
+            </svg>
+            Enrollment ≤ 5,000 (Charter)
+        </div>
+        <div>
+            <svg width="12" height="12">
+                <rect x="1" y="1" width="10" height="10" fill="#F95454" stroke="black" stroke-width="1"></rect>
+            </svg>
+            Enrollment > 5,000 (Charter)
+        </div>
+    </div>
+    """
+    m.get_root().html.add_child(Element(legend_html))
+
+    # === ADD FOOTER ===
+    footer_html = '''
+    <div class="map-footer">
+        <div style="max-width: 85%; margin: auto;">
+            A visualization of data relevant to the Teacher Retention Allotment (Sec. 48.158) provision in CSHB 2. Click on a campus to see the pay raises that teachers at the campus would receive based on their years of experience and the district's/charter's student enrollment. This analysis was completed on May 15, 2025 using the <a href='https://tealprod.tea.state.tx.us/Tea.AskTed.Web/Forms/ArchivedSchoolAndDistrictDataFiles.aspx' target="blank">Spring 2024 AskTED school data</a> and <a href='https://rptsvr1.tea.texas.gov/perfreport/tapr/2024/index.html' target="blank">2023-2024 TAPR staff profile.</a>
+        </div>
+    </div>
+    '''
+    m.get_root().html.add_child(Element(footer_html))
+
+
+    # === SAVE MAP ===
+    with profile.stage("save"):
+        m.save(output)
+    print("Map saved →", output)
+
+
+def _add_map_layers(m, gdf, plan, label, chamber, bounds_dict, output):
+    """District boundaries, campus markers and search box: every part of the page drawn from the data."""
+    # === DISPLAY GEOMETRY ===
+    # simplified over a shared-border topology, so neighbours never gap or overlap
+    with profile.stage("display_geometry"):
+        plan_display = plan
+        if BOUNDARY_ZOOM is not None or BOUNDARY_TOPOJSON or OUTPUT_MODE == "sharded":
+            plan_topology = DistrictTopology(plan[['district_name', 'geometry']])
+            if BOUNDARY_ZOOM is not None:
+                plan_display = plan_topology.to_geodataframe(
+                    zoom_tolerance(BOUNDARY_ZOOM), zoom_precision(BOUNDARY_ZOOM)
+                )
+            if BOUNDARY_TOPOJSON:
+                plan_topology.write_topojson(
+                    BOUNDARY_TOPOJSON, tolerance=zoom_tolerance(BOUNDARY_ZOOM or 18)
+                )
+            if OUTPUT_MODE == "sharded":
+                plan_summary = plan_topology.to_geodataframe(
+                    zoom_tolerance(SUMMARY_ZOOM), zoom_precision(SUMMARY_ZOOM)
+                )
+
+    # === DISTRICTS AND CAMPUSES ===
+    if OUTPUT_MODE == "sharded":
+        # light page: statewide outlines only, each district's polygon and
+        # campuses are fetched from <output>_districts/ when it is selected
+        with profile.stage("shards"):
+            DistrictShardLayer(
+                gdf, plan_summary, plan_display, bounds_dict,
+                shard_dir=os.path.splitext(output)[0] + "_districts",
+                label=label, abbrev=chamber['abbrev'],
+                control_html=_district_control_html(plan, label),
+                template=popup_template_for(label), search=SEARCH_INDEX,
+            ).add_to(m)
+    else:
+        _add_district_layers(m, gdf, plan, plan_display, label, chamber, bounds_dict)
+
+    # === SEARCH BOX ===
+    if SEARCH_INDEX:
+        with profile.stage("search_index"):
+            CampusSearch(gdf, plan, label, chamber['abbrev'], per_district=OUTPUT_MODE == "sharded").add_to(m)
+
+
+def _add_district_layers(m, gdf, plan, plan_display, label, chamber, bounds_dict):
+    """Every district polygon and campus marker embedded in the page, one group per district."""
+    m_name = m.get_name()
+
+    # === CREATE FEATURE GROUPS ===
+    district_groups = {}
+    kind_groups = {}
+    for d in sorted(plan['district_name'].unique(), key=lambda x: int(x)):
+        fg = folium.FeatureGroup(name=f"{label} District {d}", show=True)
+        fg.add_to(m)
+        # add the polygon for this district
+        sel = plan_display[plan_display['district_name'] == d]
+        folium.GeoJson(
+            sel,
+            name=f"District {d}",
+            smooth_factor=0,
+            style_function=lambda f: {'color': 'black', 'weight': 1, 'fillOpacity': 0.1},
+            highlight_function=lambda f: {'weight': 3, 'fillOpacity': 0.3},
+            tooltip=folium.GeoJsonTooltip(fields=['district_name'], aliases=[f'{label} District'])
+        ).add_to(fg)
+        district_groups[d] = fg
+        # campus markers sit in one sub-group per kind code (charter bit | large-district
+        # bit), so the isolate toggle swaps whole groups instead of single markers
+        kind_groups[d] = [
+            folium.FeatureGroup(name=f"{label} District {d} campuses ({k})", control=False).add_to(fg)
+            for k in range(KIND_COUNT)
+        ]
+
+
+    # === DROPDOWN SCRIPT ===
+    distmap_js = "{" + ",".join(
+        f'"{d}": {district_groups[d].get_name()}'
+        for d in district_groups
+    ) + "}"
+    kindmap_js = "{" + ",".join(
+        f'"{d}": [' + ",".join(g.get_name() for g in kind_groups[d]) + "]"
+        for d in kind_groups
+    ) + "}"
+    bounds_js = json.dumps(bounds_dict)
+    new_dropdown_block = f"""
+    <script>
+    window.addEventListener('load', function() {{
+        var map = {m_name};
+        var container = L.DomUtil.create('div', 'district-selector');
+        container.innerHTML = `{_district_control_html(plan, label)}`;
+        L.DomEvent.disableClickPropagation(container);
+
+        var DistrictControl = L.Control.extend({{
+            options: {{ position: 'topright' }},
+            onAdd: function(map) {{
+                return container;
             }}
-          }});
         }});
-      }}
-    }}
+        map.addControl(new DistrictControl());
+
+        var distMap = {distmap_js};
+        var boundsMap = {bounds_js};
+
+        // campus marker groups per district, indexed by kind code
+        var kindGroups = {kindmap_js};
+        var isolatedKinds = {json.dumps(list(ISOLATED_KINDS))};
+        // campus clusters below the cluster zoom (see campus_clusters.py)
+        var clusters = map.campusClusters;
+
+        function applyFilter() {{
+          var checked = document.getElementById('isolateToggle').checked;
+          var clustered = clusters && clusters.active();
+          // unselected districts are off the map as a whole, so only the kind
+          // groups inside each district are swapped
+          for (var d in kindGroups) {{
+            kindGroups[d].forEach(function(group, kind) {{
+              if (!clustered && (!checked || isolatedKinds.indexOf(kind) !== -1)) {{
+                distMap[d].addLayer(group);
+              }} else {{
+                distMap[d].removeLayer(group);
+              }}
+            }});
+          }}
+          if (clusters) {{
+            clusters.update(checked ? isolatedKinds : null);
+          }}
+        }}
 
-    document.getElementById('isolateToggle').addEventListener('change', applyFilter);
+        document.getElementById('isolateToggle').addEventListener('change', applyFilter);
+        if (clusters) {{
+            map.on('zoomend', applyFilter);
+        }}
 
-    document.getElementById('districtDropdown').addEventListener('change', function(e) {{
-        var sel = e.target.value;
-        // remove every district layer first
-        for (var k in distMap) {{
-            if (map.hasLayer(distMap[k])) {{
-                map.removeLayer(distMap[k]);
+        document.getElementById('districtDropdown').addEventListener('change', function(e) {{
+            var sel = e.target.value;
+            // remove every district layer first
+            for (var k in distMap) {{
+                if (map.hasLayer(distMap[k])) {{
+                    map.removeLayer(distMap[k]);
+                }}
             }}
-        }}
-        if (sel) {{
-            // show only selected district
-            map.addLayer(distMap[sel]);
-            map.fitBounds(boundsMap[sel]);
-            // bring all markers to front so popups work
-            distMap[sel].eachLayer(function(layer) {{
-                if (layer instanceof L.Marker || layer instanceof L.CircleMarker) {{
-                    layer.bringToFront();
-                    layer.on('click', function() {{ this.openPopup(); }});
+            if (sel) {{
+                // show only selected district
+                map.addLayer(distMap[sel]);
+                map.fitBounds(boundsMap[sel]);
+                // bring all markers to front so popups work
+                kindGroups[sel].forEach(function(group) {{
+                    if (distMap[sel].hasLayer(group)) {{
+                        group.bringToFront();
+                    }}
+                }});
+            }} else {{
+                // show all districts
+                for (var k in distMap) {{
+                    map.addLayer(distMap[k]);
                 }}
-            }});
-        }} else {{
-            // show all districts
-            for (var k in distMap) {{
-                map.addLayer(distMap[k]);
+                map.setView([31.0, -99.0], 6);
             }}
-            map.setView([31.0, -99.0], 6);
-        }}
+            applyFilter();
+        }});
+
         applyFilter();
-    }});
 
-    applyFilter();
-
-    // check URL for district param or hash
-    var hash = window.location.hash.substring(1);
-    var params = new URLSearchParams(window.location.search);
-    var param = params.get('district') || hash;
-    if (param) {{
-        var d = param.replace(/^SD/i, '');
-        if (distMap.hasOwnProperty(d)) {{
-            var dropdown = document.getElementById('districtDropdown');
-            dropdown.value = d;
-            dropdown.dispatchEvent(new Event('change'));
+        // check URL for district param or hash
+        var hash = window.location.hash.substring(1);
+        var params = new URLSearchParams(window.location.search);
+        var param = params.get('district') || hash;
+        if (param) {{
+            var d = param.replace(/^{chamber['abbrev']}/i, '');
+            if (distMap.hasOwnProperty(d)) {{
+                var dropdown = document.getElementById('districtDropdown');
+                dropdown.value = d;
+                dropdown.dispatchEvent(new Event('change'));
+            }}
         }}
-    }}
 
-    // bind marker click to open their popups
-    map.eachLayer(function(layer) {{
-      if (layer instanceof L.Marker || layer instanceof L.CircleMarker) {{
-        layer.on('click', function() {{
-          this.openPopup();
-        }});
-      }}
+        // bind marker click to open their popups
+        for (var d in kindGroups) {{
+          kindGroups[d].forEach(function(group) {{
+            group.on('click', function(e) {{
+              e.layer.openPopup();
+            }});
+          }});
+        }}{SEARCH_HOOKS_JS if SEARCH_INDEX else ""}
     }});
-}});
-</script>
-"""
-m.get_root().html.add_child(Element(new_dropdown_block))
-
-
-# === SCREENSHOT BUTTON VIA leaflet-image ===
-screenshot_html = f'''
-<div style="
-    position: fixed; top: 10px; left: 10px;
-    z-index: 9999; background: none; padding: 0;
-">
-  <button id="downloadMapBtn" style="
-      background: white;
-      border: 1px solid gray;
-      padding: 5px;
-      font-size: 14px;
-      cursor: pointer;
-      display: none;
-  ">Download PNG</button>
-</div>
-<script>
-window.addEventListener('load', function() {{
-    document.getElementById('downloadMapBtn').addEventListener('click', function() {{
-        leafletImage({m_name}, function(err, canvas) {{
-            if (err) console.error(err);
-            var imgData = canvas.toDataURL("image/png");
-            var link = document.createElement("a");
-            link.href = imgData;
-            link.download = "CSHB2 Teacher Retention Allotment Map - TX Senate.png";
-            link.click();
-        }});
+    </script>
+    """
+    m.get_root().html.add_child(Element(new_dropdown_block))
+
+
+
+    # === ADD SCHOOLS MARKERS ===
+    # popup fields for every campus are formatted in one batch (see popups.py)
+    with profile.stage("popups"):
+        popup_fields = format_popup_fields(gdf)
+        popup_template = popup_template_for(label)
+        if POPUP_MODE == "lazy":
+            popup_htmls = [None] * len(gdf)
+        else:
+            popup_htmls = popup_template.render(popup_fields)
+
+    with profile.stage("markers"):
+        if MARKER_MODE == "canvas":
+            # one popup source for the whole layer: the lazy table or each HTML once
+            if POPUP_MODE == "lazy":
+                m.get_root().html.add_child(Element(popup_table_script(popup_fields, template=popup_template)))
+            else:
+                m.get_root().html.add_child(Element(popup_html_script(popup_htmls)))
+            CampusCanvasLayer(gdf, kind_groups, popup_js="campusPopupHtml").add_to(m)
+        else:
+            lats, lons = gdf.geometry.y.to_numpy(), gdf.geometry.x.to_numpy()
+            colors = np.where(gdf["District Enrollment as of Oct 2023"] <= SMALL_DISTRICT_ENROLLMENT, "#0D92F4", "#F95454")
+            is_charter = (gdf["District Type"] == "CHARTER").to_numpy()
+            kinds = campus_kinds(gdf)
+            for i, (lat, lon, color, charter, kind, popup_html, dname) in enumerate(zip(
+                lats, lons, colors, is_charter, kinds, popup_htmls, gdf["district_name"]
+            )):
+                # smaller, semi-transparent markers with black border
+                if charter:
+                    marker_district = folium.RegularPolygonMarker(
+                        location=(lat, lon),
+                        number_of_sides=4,
+                        radius=4,
+                        pane='markerPane',
+                        color='black', weight=1,
+                        fill=True, fill_color=color, fill_opacity=0.6
+                    )
+                else:
+                    marker_district = folium.CircleMarker(
+                        location=(lat, lon),
+                        radius=4,
+                        pane='markerPane',
+                        color='black', weight=1,
+                        fill=True, fill_color=color, fill_opacity=0.6
+                    )
+                if POPUP_MODE == "lazy" or SEARCH_INDEX:
+                    # row index into the embedded popup table and the search index
+                    marker_district.options["campus"] = i
+                if POPUP_MODE != "lazy":
+                    popup_district = folium.Popup(popup_html, max_width=300, sticky=True)
+                    marker_district.add_child(popup_district)
+                    # add hover tooltip so popup shows temporarily on hover
+                    tooltip = folium.Tooltip(popup_html, sticky=False)
+                    marker_district.add_child(tooltip)
+                # add to the district's group for this kind of campus
+                if pd.notnull(dname) and dname in kind_groups:
+                    kind_groups[dname][kind].add_child(marker_district)
+
+    # === CAMPUS CLUSTERS ===
+    if CLUSTER_ZOOM is not None:
+        with profile.stage("clusters"):
+            CampusClusterLayer(gdf, district_groups, CLUSTER_ZOOM).add_to(m)
+
+    # === LAZY POPUPS ===
+    if MARKER_MODE != "canvas" and POPUP_MODE == "lazy":
+        m.get_root().html.add_child(Element(popup_table_script(popup_fields, template=popup_template)))
+        lazy_popup_script = f"""
+    <script>
+    window.addEventListener('load', function() {{
+        var kindGroups = {kindmap_js};
+        function popupFor(layer) {{
+            return campusPopupHtml(layer.options.campus);
+        }}
+        for (var d in kindGroups) {{
+            kindGroups[d].forEach(function(group) {{
+                group.eachLayer(function(layer) {{
+                    layer.bindPopup(popupFor, {{ maxWidth: 300 }});
+                    layer.bindTooltip(popupFor, {{ sticky: false }});
+                }});
+            }});
+        }}
     }});
-}});
-</script>
-'''
-m.get_root().html.add_child(Element(screenshot_html))
-
-
-# === ADD SCHOOLS MARKERS ===
-for _, r in gdf.iterrows():
-    lat, lon = r.geometry.y, r.geometry.x
-    enroll = r["District Enrollment as of Oct 2023"]
-    color = "#0D92F4" if enroll <= 5000 else "#F95454"
-    # smaller, semi-transparent markers with black border
-    if r["District Type"] == "CHARTER":
-        marker_district = folium.RegularPolygonMarker(
-            location=(lat, lon),
-            number_of_sides=4,
-            radius=4,
-            pane='markerPane',
-            color='black', weight=1,
-            fill=True, fill_color=color, fill_opacity=0.6
-        )
-    else:
-        marker_district = folium.CircleMarker(
-            location=(lat, lon),
-            radius=4,
-            pane='markerPane',
-            color='black', weight=1,
-            fill=True, fill_color=color, fill_opacity=0.6
-        )
-    # format base salary averages
-    beg_base = r['Teacher Beginning Base Salary Average']
-    if beg_base == 'MASKED' or beg_base is None or pd.isnull(beg_base):
-        beg_base_fmt = beg_base
-    else:
-        beg_base_fmt = f"{int(beg_base):,}"
-
-    mid_base = r['Teacher 1-5 Years Base Salary Average']
-    if mid_base == 'MASKED' or mid_base is None or pd.isnull(mid_base):
-        mid_base_fmt = mid_base
-    else:
-        mid_base_fmt = f"{int(mid_base):,}"
-
-    sen_base = r['Teacher 5+ Years Base Salary Average']
-    if sen_base == 'MASKED' or sen_base is None or pd.isnull(sen_base):
-        sen_base_fmt = sen_base
-    else:
-        sen_base_fmt = f"{int(round(sen_base)):,}"
-
-    # build popup
-    allot_short = 5000 if enroll <= 5000 else 2500
-    allot_long = 10000 if enroll <= 5000 else 5500
-    # format 5+ years percent to one decimal unless masked or null
-    perc = r['Teacher 5+ Years Full Time Equiv Percent']
-    if perc == 'MASKED' or perc is None or pd.isnull(perc):
-        perc_fmt = perc
-    else:
-        perc_fmt = f"{perc:.1f}"
-        if ".0" in perc_fmt:
-            perc_fmt = perc_fmt.replace(".0", "")
-
-    # format 5+ years count to one decimal place unless masked or null
-    cnt = r['Teacher 5+ Years Full Time Equiv Count']
-    if cnt == 'MASKED' or cnt is None or pd.isnull(cnt):
-        cnt_fmt = cnt
-    else:
-        cnt_fmt = f"{cnt:.1f}"
-        if ".0" in cnt_fmt:
-            cnt_fmt = cnt_fmt.replace(".0", "")
-
-    # format beginning count display (mask entire cell if any part is MASKED)
-    beg_cnt = r['Teacher Beginning Full Time Equiv Count']
-    beg_perc_val = r['Teacher Beginning Full Time Equiv Percent']
-    if beg_cnt == 'MASKED' or beg_perc_val == 'MASKED':
-        beg_count_display = 'MASKED'
-    else:
-        beg_count_display = f"{beg_cnt} ({beg_perc_val}%)"
-
-    # format mid count display (mask entire cell if any part is MASKED)
-    mid_cnt = r['Teacher 1-5 Years Full Time Equiv Count']
-    mid_perc_val = r['Teacher 1-5 Years Full Time Equiv Percent']
-    if mid_cnt == 'MASKED' or mid_perc_val == 'MASKED':
-        mid_count_display = 'MASKED'
-    else:
-        mid_count_display = f"{mid_cnt} ({mid_perc_val}%)"
-
-    # format senior count display (mask entire cell if any part is MASKED)
-    if cnt_fmt == 'MASKED' or perc_fmt == 'MASKED':
-        sen_count_display = 'MASKED'
-    else:
-        sen_count_display = f"{cnt_fmt} ({perc_fmt}%)"
-
-    popup_html = f"""
-    Senate District {r['district_name']}<br>
-    <b>{r['School Name']} – {r['District Name']}</b><br>
-    <i>{r['District Type']}</i><br>
-    School Enrollment (Oct 2023): {r['School Enrollment as of Oct 2023']:,}<br>
-    District Enrollment (Oct 2023): {enroll:,}<br><br>
-    <div>CSHB 2: Teacher Retention Allotment</div>
-    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
-      <tr>
-        <th style="border:1px solid black; white-space:normal;">Years Experience</th>
-        <th style="border:1px solid black; white-space:normal;">Teacher<br>Retention Allotment</th>
-      </tr>
-      <tr>
-        <td style="border:1px solid black;">3–4 years experience</td>
-        <td style="border:1px solid black;">${allot_short:,}</td>
-      </tr>
-      <tr>
-        <td style="border:1px solid black;">5+ years experience</td>
-        <td style="border:1px solid black;">${allot_long:,}</td>
-      </tr>
-    </table>
-    <br>
-    <div>2023-2024 Campus Staff</div>
-    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
-      <tr>
-        <th style="border:1px solid black; white-space:normal;">Years<br>Experience</th>
-        <th style="border:1px solid black; white-space:normal;">Count (% of Total)</th>
-        <th style="border:1px solid black; white-space:normal;">Base<br>Salary Avg.</th>
-      </tr>
-      <tr>
-        <td style="border:1px solid black;">Beginning teachers</td>
-        <td style="border:1px solid black;">{beg_count_display}</td>
-        <td style="border:1px solid black;">{beg_base_fmt if beg_base_fmt=='MASKED' else f"${beg_base_fmt}"}</td>
-      </tr>
-      <tr>
-        <td style="border:1px solid black;">1-5 years experience</td>
-        <td style="border:1px solid black;">{mid_count_display}</td>
-        <td style="border:1px solid black;">{mid_base_fmt if mid_base_fmt=='MASKED' else f"${mid_base_fmt}"}</td>
-      </tr>
-    <tr>
-        <td style="border:1px solid black;">5+ years experience</td>
-        <td style="border:1px solid black;">{sen_count_display}</td>
-        <td style="border:1px solid black;">{sen_base_fmt if sen_base_fmt=='MASKED' else f"${sen_base_fmt}"}</td>
-      </tr>
-    </table>
+    </script>
     """
-    popup_district = folium.Popup(popup_html, max_width=300, sticky=True)
-    marker_district.add_child(popup_district)
-    # add hover tooltip so popup shows temporarily on hover
-    tooltip = folium.Tooltip(popup_html, sticky=False)
-    marker_district.add_child(tooltip)
-    # add to district groups
-    dname = r.get('district_name')
-    if pd.notnull(dname) and dname in district_groups:
-        district_groups[dname].add_child(marker_district)
-
-# === LAYER CONTROL ===
-folium.LayerControl().add_to(m)
-
-
-
-# === ADD LEGEND ===
-legend_html = """
-<div style="
-    position: fixed;
-    bottom: 10px;
-    right: 10px;
-    background: white;
-    padding: 10px;
-    border: 1px solid gray;
-    z-index: 9999;
-    font-size: 12px;
-">
-    <div>
-        <svg width="12" height="12">
-            <circle cx="6" cy="6" r="5" fill="#0D92F4" stroke="black" stroke-width="1"></circle>
-        </svg>
-        Enrollment ≤ 5,000 (Public School)
-    </div>
-    <div>
-        <svg width="12" height="12">
-            <circle cx="6" cy="6" r="5" fill="#F95454" stroke="black" stroke-width="1"></circle>
-        </svg>
-        Enrollment > 5,000 (Public School)
-    </div>
-    <div>
-        <svg width="12" height="12">
-            <rect x="1" y="1" width="10" height="10" fill="#0D92F4" stroke="black" stroke-width="1"></rect>
-        </svg>
-        Enrollment ≤ 5,000 (Charter)
-    </div>
-    <div>
-        <svg width="12" height="12">
-            <rect x="1" y="1" width="10" height="10" fill="#F95454" stroke="black" stroke-width="1"></rect>
-        </svg>
-        Enrollment > 5,000 (Charter)
-    </div>
-</div>
-"""
-m.get_root().html.add_child(Element(legend_html))
+        m.get_root().html.add_child(Element(lazy_popup_script))
 
-# === ADD FOOTER ===
-footer_html = '''
-<div class="map-footer">
-    <div style="max-width: 85%; margin: auto;">
-        A visualization of data relevant to the Teacher Retention Allotment (Sec. 48.158) provision in CSHB 2. Click on a campus to see the pay raises that teachers at the campus would receive based on their years of experience and the district's/charter's student enrollment. This analysis was completed on May 15, 2025 using the <a href='https://tealprod.tea.state.tx.us/Tea.AskTed.Web/Forms/ArchivedSchoolAndDistrictDataFiles.aspx' target="blank">Spring 2024 AskTED school data</a> and <a href='https://rptsvr1.tea.texas.gov/perfreport/tapr/2024/index.html' target="blank">2023-2024 TAPR staff profile.</a>
-    </div>
-</div>
-'''
-m.get_root().html.add_child(Element(footer_html))
+
+def main():
+    campuses = load_campuses()
+    senate = load_plan(os.path.join(SHP_DIR, SHP_NAME))
+    build_map(campuses, senate, "Senate", OUTPUT_MAP, cache_name=SHP_NAME)
+    profile.write_report("gen_tra_map_senate", [OUTPUT_MAP])
 
 
-# === SAVE MAP ===
-m.save(OUTPUT_MAP)
-print("Map saved →", OUTPUT_MAP)
+if __name__ == "__main__":
+    main()
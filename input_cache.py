@@ -0,0 +1,129 @@
+"""Content-hashed Parquet cache for the Excel inputs.
+
+The first read of a workbook/sheet parses it with ``pd.read_excel`` and stores
+the result as Parquet under ``CACHE_DIR``; later reads of the same bytes are
+served from that file.  Entries are named
+
+    <stem>-<source id>-<variant id>-<content digest>.parquet
+
+so a changed source file evicts its own stale entries and no shared manifest
+is needed (several builds can read through the cache at once).
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+# === CONFIGURATION ===
+CACHE_DIR = os.environ.get("TRA_CACHE_DIR", ".input_cache")
+CACHE_MAX_BYTES = int(os.environ.get("TRA_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+CHUNK_SIZE = 1024 * 1024
+# bumped when the entry layout changes, so older entries are never read back
+ENTRY_FORMAT = 2
+
+
+def file_digest(path):
+    """sha256 of the file contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _short_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+
+
+def _entry_prefix(path, sheet_name, read_kwargs):
+    stem = re.sub(r"[^A-Za-z0-9]+", "_", os.path.splitext(os.path.basename(path))[0]).strip("_")
+    source_id = _short_hash(os.path.abspath(path))
+    variant = json.dumps({"format": ENTRY_FORMAT, "sheet": sheet_name, **read_kwargs}, sort_keys=True, default=str)
+    return os.path.join(CACHE_DIR, f"{stem}-{source_id}-{_short_hash(variant)}-")
+
+
+def _write_entry(df, prefix, digest):
+    # mixed-type object columns (e.g. numbers next to "." or "MASKED") and
+    # non-string headers cannot go through Arrow; keep those as pickles
+    tmp = f"{prefix}{digest[:16]}.tmp{os.getpid()}"
+    try:
+        # the index is kept, so an ``index_col`` read comes back the same
+        df.to_parquet(tmp)
+        target = f"{prefix}{digest[:16]}.parquet"
+    except (ImportError, ValueError, TypeError, NotImplementedError):
+        df.to_pickle(tmp)
+        target = f"{prefix}{digest[:16]}.pkl"
+    os.replace(tmp, target)
+    return target
+
+
+def _read_entry(entry):
+    os.utime(entry)  # mark as recently used for the size cap
+    if entry.endswith(".parquet"):
+        return pd.read_parquet(entry)
+    return pd.read_pickle(entry)
+
+
+def remove_entry(entry):
+    # another build sharing the cache may have removed it already
+    try:
+        os.remove(entry)
+    except FileNotFoundError:
+        pass
+
+
+def _drop_stale(prefix, keep):
+    for entry in glob.glob(glob.escape(prefix) + "*"):
+        if entry != keep and ".tmp" not in entry:
+            remove_entry(entry)
+
+
+def enforce_size_cap(max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for entry in glob.glob(os.path.join(CACHE_DIR, "*")):
+        if ".tmp" in entry:
+            continue
+        try:
+            st = os.stat(entry)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove_entry(entry)
+        total -= size
+
+
+def clear_cache():
+    for entry in glob.glob(os.path.join(CACHE_DIR, "*")):
+        remove_entry(entry)
+
+
+def read_excel_cached(path, sheet_name=0, **read_kwargs):
+    """Drop-in for ``pd.read_excel(path, sheet_name=..., **read_kwargs)`` reading a single sheet.
+
+    ``sheet_name`` names or numbers one sheet; None or a list (a dict of
+    frames from ``pd.read_excel``) is refused.
+    """
+    if sheet_name is None or isinstance(sheet_name, (list, tuple)):
+        raise ValueError(f"read_excel_cached reads one sheet at a time, got sheet_name={sheet_name!r}")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = file_digest(path)
+    prefix = _entry_prefix(path, sheet_name, read_kwargs)
+    for ext in (".parquet", ".pkl"):
+        entry = f"{prefix}{digest[:16]}{ext}"
+        if os.path.exists(entry):
+            return _read_entry(entry)
+
+    df = pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+    entry = _write_entry(df, prefix, digest)
+    _drop_stale(prefix, keep=entry)
+    enforce_size_cap()
+    return df
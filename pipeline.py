@@ -0,0 +1,244 @@
+"""Incremental build: rerun only the stages whose inputs, code or settings changed.
+
+    python pipeline.py              # bring everything up to date
+    python pipeline.py --dry-run    # only report what would run and why
+    python pipeline.py --force render
+
+Stages run in order:
+
+    district_profile   District STAFF Profile.xlsx -> District Teacher Profile.xlsx
+    campus_profile     CSTAF.xlsx + label mapping   -> Campus Teacher Profile.parquet
+    coordinates        AskTED + campus profile      -> .pipeline/campuses.pkl + missing coordinates report
+    spatial_join       campuses + plan shapefile    -> .pipeline/campus_districts.pkl
+    render             joined campuses + plan       -> index.html
+
+Each stage is fingerprinted by the content hash of its input files, the
+source of the functions/modules that implement it and the configuration
+values it reads.  Fingerprints of the last successful run are kept in
+``.pipeline/state.json``; a stage is skipped when its fingerprint is unchanged
+and its outputs still exist.  ``--dry-run`` also reports a stage as one that
+would run when an earlier stage it reads from would.
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import time
+
+import pandas as pd
+
+import allotment
+import build_profile as profile
+import campus_clusters
+import campus_data
+import campus_layer
+import district_assign
+import district_geometry
+import district_shards
+import gen_tra_map_senate as gen
+import popups
+import search_index
+import staff_schema
+import tapr_processing as tapr
+import tea_reader
+from input_cache import file_digest
+
+# === CONFIGURATION ===
+PIPELINE_DIR = ".pipeline"
+STATE_PATH = os.path.join(PIPELINE_DIR, "state.json")
+CAMPUSES_PATH = os.path.join(PIPELINE_DIR, "campuses.pkl")
+JOINED_PATH = os.path.join(PIPELINE_DIR, "campus_districts.pkl")
+PLAN_PATH = os.path.join(gen.SHP_DIR, gen.SHP_NAME)
+
+
+class Stage:
+    """One pipeline step: ``func()`` turns ``inputs`` into ``outputs``.
+
+    ``code`` lists the functions/modules whose source is the stage's code;
+    ``params`` maps names to the configuration values the stage depends on.
+    """
+
+    def __init__(self, name, func, inputs, outputs, code=(), params=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = [func, *code]
+        self.params = params or {}
+
+    def fingerprint(self):
+        code = hashlib.sha256()
+        for obj in self.code:
+            code.update(inspect.getsource(obj).encode("utf-8"))
+        return {
+            "inputs": {p: file_digest(p) if os.path.exists(p) else None for p in self.inputs},
+            "code": code.hexdigest(),
+            "params": {k: repr(v) for k, v in self.params.items()},
+        }
+
+    def why_run(self, fingerprint, previous):
+        """Reason this stage must run, or None when it is up to date."""
+        if previous is None:
+            return "no previous run"
+        missing = [p for p in self.outputs if not os.path.exists(p)]
+        if missing:
+            return "output missing: " + ", ".join(missing)
+        changed = [p for p, d in fingerprint["inputs"].items() if previous["inputs"].get(p) != d]
+        if changed:
+            return "input changed: " + ", ".join(changed)
+        if fingerprint["code"] != previous["code"]:
+            return "code changed"
+        changed = [k for k, v in fingerprint["params"].items() if previous["params"].get(k) != v]
+        if changed:
+            return "setting changed: " + ", ".join(changed)
+        return None
+
+
+def _plan_files():
+    return sorted(glob.glob(os.path.splitext(PLAN_PATH)[0] + ".*"))
+
+
+def _coordinates():
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    gen.load_campuses().to_pickle(CAMPUSES_PATH)
+
+
+def _spatial_join():
+    campuses = pd.read_pickle(CAMPUSES_PATH)
+    joined = gen.assign_plan_districts(campuses, gen.load_plan(PLAN_PATH), cache_name=gen.SHP_NAME)
+    joined.to_pickle(JOINED_PATH)
+
+
+def _render():
+    gen.render_map(pd.read_pickle(JOINED_PATH), gen.load_plan(PLAN_PATH), "Senate", gen.OUTPUT_MAP)
+
+
+def build_stages():
+    return [
+        Stage(
+            "district_profile", tapr.process_district_profile,
+            inputs=[tapr.DISTRICT_STAFF_PATH],
+            outputs=[tapr.DISTRICT_PROFILE_PATH],
+            code=[tapr, staff_schema, tea_reader],
+        ),
+        Stage(
+            "campus_profile", tapr.process_campus_profile,
+            inputs=[tapr.CAMPUS_STAFF_PATH, tapr.CAMPUS_LABELS_PATH],
+            outputs=[tapr.CAMPUS_PROFILE_PATH, tapr.MISSING_SALARY_REPORT]
+            + ([tapr.CAMPUS_PROFILE_REPORT] if tapr.CAMPUS_PROFILE_REPORT else []),
+            code=[tapr, staff_schema, tea_reader],
+        ),
+        Stage(
+            "coordinates", _coordinates,
+            inputs=[gen.EXCEL_PATH, gen.TEACHER_PROFILE_PATH],
+            outputs=[CAMPUSES_PATH, gen.MISSING_COORDS_REPORT],
+            code=[gen.load_campuses, campus_data, tea_reader, tapr.read_campus_profile],
+            params={name: getattr(gen, name) for name in ("ASKTED_COLUMNS", "PROFILE_COLUMNS", "CATEGORY_COLUMNS")},
+        ),
+        Stage(
+            "spatial_join", _spatial_join,
+            inputs=[CAMPUSES_PATH, *_plan_files()],
+            outputs=[JOINED_PATH],
+            code=[gen.load_plan, gen.assign_plan_districts, district_assign],
+            params={"NEAREST_DISTRICT_MAX_DEGREES": gen.NEAREST_DISTRICT_MAX_DEGREES},
+        ),
+        Stage(
+            "render", _render,
+            # the link-preview tags follow the statewide image appearing or going away
+            inputs=[JOINED_PATH, *_plan_files()]
+            + ([gen.social_image(gen.OUTPUT_MAP, "Senate")] if gen.SOCIAL_IMAGE_DIR else []),
+            outputs=[gen.OUTPUT_MAP]
+            + ([gen.BOUNDARY_TOPOJSON] if gen.BOUNDARY_TOPOJSON else [])
+            + ([os.path.splitext(gen.OUTPUT_MAP)[0] + "_districts"] if gen.OUTPUT_MODE == "sharded" else []),
+            # the whole generator: the page also reads its module-level HTML/JS snippets
+            code=[gen, popups, campus_layer, campus_clusters, allotment, district_geometry, district_shards, search_index],
+            params={
+                name: getattr(gen, name)
+                for name in ("POPUP_MODE", "MARKER_MODE", "BOUNDARY_ZOOM", "BOUNDARY_TOPOJSON",
+                             "OUTPUT_MODE", "SUMMARY_ZOOM", "SEARCH_INDEX", "CLUSTER_ZOOM", "SITE_URL",
+                             "CHAMBERS", "SOCIAL_IMAGE_DIR")
+            },
+        ),
+    ]
+
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def _save_state(state):
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_PATH)
+
+
+def run(stages=None, force=(), dry_run=False):
+    """Run out-of-date stages in order; returns [(stage, status, reason, seconds)]."""
+    stages = build_stages() if stages is None else stages
+    state = _load_state()
+    report = []
+    # outputs a dry run would rewrite -> the stage writing them
+    pending = {}
+    for stage in stages:
+        fingerprint = stage.fingerprint()
+        reason = "forced" if stage.name in force else stage.why_run(fingerprint, state.get(stage.name))
+        if reason is None and dry_run:
+            upstream = sorted({pending[p] for p in stage.inputs if p in pending})
+            if upstream:
+                reason = "upstream would run: " + ", ".join(upstream)
+        if reason is None:
+            report.append((stage.name, "skipped", "up to date", None))
+            continue
+        if dry_run:
+            pending.update({p: stage.name for p in stage.outputs})
+            report.append((stage.name, "would run", reason, None))
+            continue
+        start = time.perf_counter()
+        stage.func()
+        # inputs are re-hashed after the run in case the stage rewrote one
+        state[stage.name] = stage.fingerprint()
+        _save_state(state)
+        report.append((stage.name, "ran", reason, time.perf_counter() - start))
+    return report
+
+
+def format_report(report):
+    width = max(len(name) for name, _, _, _ in report)
+    lines = [f"{'stage':<{width}}  {'status':<9}  {'time':>7}  reason"]
+    for name, status, reason, seconds in report:
+        took = f"{seconds:.1f}s" if seconds is not None else "-"
+        lines.append(f"{name:<{width}}  {status:<9}  {took:>7}  {reason}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", nargs="*", default=None, metavar="STAGE",
+                        help="rerun these stages (no names: every stage)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run without running it")
+    args = parser.parse_args()
+
+    stages = build_stages()
+    names = [s.name for s in stages]
+    if args.force is None:
+        force = []
+    elif not args.force:
+        force = names
+    else:
+        unknown = sorted(set(args.force) - set(names))
+        if unknown:
+            parser.error(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(names)}")
+        force = args.force
+    print(format_report(run(stages, force=force, dry_run=args.dry_run)))
+    profile.write_report("pipeline", [gen.OUTPUT_MAP])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Batch rendering of the campus popup/tooltip HTML.
+
+Every display column is formatted for all campuses at once (masking comes
+from the profile's masked-row flag, numbers are formatted with array
+operations on the typed columns) and the
+popup HTML comes from one compiled template applied column-wise.  The output
+is byte-for-byte what the old per-row ``gdf.iterrows()`` loop produced
+(tests/test_popups.py holds that loop and compares the two).
+
+For the lazy popup mode the same formatted fields are embedded once as a
+dictionary-encoded columnar table and the template is evaluated in the
+browser only when a marker is hovered or clicked.
+"""
+import functools
+import json
+import string
+
+import numpy as np
+import pandas as pd
+
+from allotment import allotment_amounts
+from tapr_processing import MASKED, MASKED_COLUMN
+
+POPUP_TEMPLATE = """
+    {chamber} District {district_name}<br>
+    <b>{school_name} – {district_name_full}</b><br>
+    <i>{district_type}</i><br>
+    School Enrollment (Oct 2023): {school_enrollment}<br>
+    District Enrollment (Oct 2023): {district_enrollment}<br><br>
+    <div>CSHB 2: Teacher Retention Allotment</div>
+    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
+      <tr>
+        <th style="border:1px solid black; white-space:normal;">Years Experience</th>
+        <th style="border:1px solid black; white-space:normal;">Teacher<br>Retention Allotment</th>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">3–4 years experience</td>
+        <td style="border:1px solid black;">{allot_short}</td>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">5+ years experience</td>
+        <td style="border:1px solid black;">{allot_long}</td>
+      </tr>
+    </table>
+    <br>
+    <div>2023-2024 Campus Staff</div>
+    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
+      <tr>
+        <th style="border:1px solid black; white-space:normal;">Years<br>Experience</th>
+        <th style="border:1px solid black; white-space:normal;">Count (% of Total)</th>
+        <th style="border:1px solid black; white-space:normal;">Base<br>Salary Avg.</th>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">Beginning teachers</td>
+        <td style="border:1px solid black;">{beg_count}</td>
+        <td style="border:1px solid black;">{beg_base}</td>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">1-5 years experience</td>
+        <td style="border:1px solid black;">{mid_count}</td>
+        <td style="border:1px solid black;">{mid_base}</td>
+      </tr>
+    <tr>
+        <td style="border:1px solid black;">5+ years experience</td>
+        <td style="border:1px solid black;">{sen_count}</td>
+        <td style="border:1px solid black;">{sen_base}</td>
+      </tr>
+    </table>
+    """
+
+_THOUSANDS = r"(\d)(?=(?:\d{3})+$)"
+
+
+class PopupTemplate:
+    """A ``{field}`` template compiled once into literal pieces and field slots.
+
+    Fields given as keyword ``constants`` are folded into the literals.
+    """
+
+    def __init__(self, template, **constants):
+        self.literals = [""]
+        self.fields = []
+        for literal, field, _, _ in string.Formatter().parse(template):
+            self.literals[-1] += literal
+            if field is None:
+                continue
+            if field in constants:
+                self.literals[-1] += str(constants[field])
+            else:
+                self.fields.append(field)
+                self.literals.append("")
+        self._format = "%s".join(piece.replace("%", "%%") for piece in self.literals)
+
+    def render(self, columns):
+        """Render one string per row from a frame holding every field as text."""
+        values = [columns[f].to_numpy(dtype=object) for f in self.fields]
+        return pd.Series(list(map(self._format.__mod__, zip(*values))), index=columns.index, dtype=object)
+
+
+@functools.lru_cache(maxsize=None)
+def popup_template_for(chamber):
+    return PopupTemplate(POPUP_TEMPLATE, chamber=chamber)
+
+
+popup_template = popup_template_for("Senate")
+
+
+def _text(values):
+    return values.astype(str).to_numpy(dtype=object)
+
+
+def _thousands(values):
+    """Vectorized ``f"{x:,}"`` for a numeric column."""
+    parts = pd.Series(values).astype(str).str.partition(".")
+    head = parts[0].str.replace(_THOUSANDS, r"\1,", regex=True)
+    return (head + parts[1] + parts[2]).to_numpy(dtype=object)
+
+
+def _numbers(values):
+    return pd.to_numeric(values).to_numpy(dtype=float, na_value=np.nan)
+
+
+def _plain(num, masked):
+    # the number as it reads in the campus profile: "12", "12.5"; missing -> "nan"
+    out = pd.Series(num).astype(str).str.replace(r"\.0$", "", regex=True).to_numpy(dtype=object)
+    out[masked] = MASKED
+    return out
+
+
+def _salary(num, masked, rounding):
+    # "$12,345"; a masked cell reads "MASKED", a missing one renders as "$nan"
+    null = np.isnan(num) & ~masked
+    ok = ~(masked | null)
+    whole = np.zeros(len(num), dtype=np.int64)
+    whole[ok] = rounding(num[ok])
+    out = "$" + _thousands(whole)
+    out[null] = "$nan"
+    out[masked] = MASKED
+    return out
+
+
+def _one_decimal(num, masked):
+    # f"{x:.1f}" with a trailing ".0" dropped
+    out = np.full(len(num), "nan", dtype=object)
+    ok = ~(np.isnan(num) | masked)
+    if ok.any():
+        fixed = pd.Series(np.char.mod("%.1f", num[ok]))
+        # "%.1f" has one decimal, so this is the old replace(".0", "")
+        out[ok] = fixed.str.replace(r"\.0$", "", regex=True).to_numpy(dtype=object)
+    out[masked] = MASKED
+    return out
+
+
+def _count_display(count_text, percent_text, masked):
+    out = count_text + " (" + percent_text + "%)"
+    out[masked] = MASKED
+    return out
+
+
+def format_popup_fields(gdf):
+    """Every popup field, formatted as text for all campuses at once."""
+    enroll = gdf["District Enrollment as of Oct 2023"]
+    allot_short, allot_long = allotment_amounts(enroll)
+    masked = gdf[MASKED_COLUMN].fillna(False).to_numpy(dtype=bool)
+    fields = pd.DataFrame(index=gdf.index)
+    fields["district_name"] = _text(gdf["district_name"])
+    fields["school_name"] = _text(gdf["School Name"])
+    fields["district_name_full"] = _text(gdf["District Name"])
+    fields["district_type"] = _text(gdf["District Type"])
+    fields["school_enrollment"] = _thousands(gdf["School Enrollment as of Oct 2023"])
+    fields["district_enrollment"] = _thousands(enroll)
+    fields["allot_short"] = "$" + _thousands(allot_short)
+    fields["allot_long"] = "$" + _thousands(allot_long)
+    fields["beg_count"] = _count_display(
+        _plain(_numbers(gdf["Teacher Beginning Full Time Equiv Count"]), masked),
+        _plain(_numbers(gdf["Teacher Beginning Full Time Equiv Percent"]), masked),
+        masked,
+    )
+    fields["beg_base"] = _salary(_numbers(gdf["Teacher Beginning Base Salary Average"]), masked, np.trunc)
+    fields["mid_count"] = _count_display(
+        _plain(_numbers(gdf["Teacher 1-5 Years Full Time Equiv Count"]), masked),
+        _plain(_numbers(gdf["Teacher 1-5 Years Full Time Equiv Percent"]), masked),
+        masked,
+    )
+    fields["mid_base"] = _salary(_numbers(gdf["Teacher 1-5 Years Base Salary Average"]), masked, np.trunc)
+    fields["sen_count"] = _count_display(
+        _one_decimal(_numbers(gdf["Teacher 5+ Years Full Time Equiv Count"]), masked),
+        _one_decimal(_numbers(gdf["Teacher 5+ Years Full Time Equiv Percent"]), masked),
+        masked,
+    )
+    fields["sen_base"] = _salary(_numbers(gdf["Teacher 5+ Years Base Salary Average"]), masked, np.round)
+    return fields
+
+
+def render_popups(gdf, template=popup_template):
+    """Popup HTML for every campus, aligned with ``gdf.index``."""
+    return template.render(format_popup_fields(gdf))
+
+
+def popup_table(fields, template=popup_template):
+    """Dictionary-encoded columnar table: per field, distinct values plus row codes."""
+    table = {}
+    for name in dict.fromkeys(template.fields):
+        codes, uniques = pd.factorize(fields[name].to_numpy(dtype=object))
+        table[name] = {"values": list(uniques), "codes": codes.tolist()}
+    return table
+
+
+def _script_json(obj):
+    # keep "</script>" (and friends) inside embedded strings from closing the tag
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def popup_table_script(fields, var_name="campusPopupHtml", template=popup_template):
+    """<script> defining ``var_name(i)``, which builds row i's popup HTML on demand."""
+    return f"""
+<script>
+var {var_name} = (function() {{
+    var table = {_script_json(popup_table(fields, template))};
+    var literals = {_script_json(template.literals)};
+    var fields = {_script_json(template.fields)};
+    return function(i) {{
+        var html = literals[0];
+        for (var k = 0; k < fields.length; k++) {{
+            var col = table[fields[k]];
+            html += col.values[col.codes[i]] + literals[k + 1];
+        }}
+        return html;
+    }};
+}})();
+</script>
+"""
+
+
+def popup_html_script(htmls, var_name="campusPopupHtml"):
+    """Same interface as ``popup_table_script`` for already rendered HTML (one copy per row)."""
+    return f"""
+<script>
+var {var_name} = (function() {{
+    var html = {_script_json(list(htmls))};
+    return function(i) {{
+        return html[i];
+    }};
+}})();
+</script>
+"""
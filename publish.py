@@ -0,0 +1,242 @@
+"""Publish step: a minified, precompressed copy of the generated maps for static hosting.
+
+    python publish.py                          # index.html (+ index_districts/) -> dist/
+    python publish.py index.html house.html --out site
+
+For every page (and the district shards of a sharded page):
+
+- a tooltip that repeats its marker's popup HTML reuses the popup element,
+- inline styles used at least MIN_STYLE_REPEATS times become shared CSS classes,
+- coordinates are rounded to COORD_PRECISION decimals (~1 m),
+- indentation, blank lines and whitespace runs inside HTML strings are dropped,
+
+and ``.gz`` and ``.br`` siblings are written next to each output file (the
+``.br`` ones need the ``brotli`` package; without it a warning is printed).
+The district images next to the pages (SOCIAL_IMAGE_DIR, see
+district_images.py) are copied as they are.  A table of the sizes before and
+after is printed.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+from collections import Counter
+
+import gen_tra_map_senate as gen
+
+# === CONFIGURATION ===
+PUBLISH_DIR = "dist"
+PAGES = ["index.html"]
+COORD_PRECISION = 5
+MIN_STYLE_REPEATS = 3
+STYLE_CLASS_PREFIX = "ps"
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# a decimal with more places than any value the page shows; identifiers such as
+# html_01a8116 are skipped because of the word character before the digits
+_LONG_DECIMAL = r"(?<![\w.])(-?\d+\.\d{%d,})(?![\d.])"
+# folium's popup element and the tooltip bound right after it on the same marker
+_POPUP_TOOLTIP = re.compile(
+    r'(var (html_\w+) = \$\(`<div id="\2" style="width: 100\.0%; height: 100\.0%;">(.*?)</div>`\)\[0\];'
+    r"(?:(?!var html_).)*?\.bindTooltip\(\s*)`<div>(.*?)</div>`",
+    re.S,
+)
+# a tag's style attribute, plain or inside a JSON string
+_STYLED_TAG = re.compile(r'<(\w+)([^<>]*?) style=(\\?")([^"\\]*)\3([^<>]*)>')
+_BLOCK = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2>)", re.S | re.I)
+_TEMPLATE_LITERAL = re.compile(r"`[^`]*<[^`]*`")
+
+
+def _squeeze(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def dedupe_tooltips(text):
+    """Point tooltips that repeat their marker's popup HTML at the popup element."""
+    def replace(m):
+        if _squeeze(m.group(3)) != _squeeze(m.group(4)):
+            return m.group(0)
+        return f"{m.group(1)}{m.group(2)}.innerHTML"
+    return _POPUP_TOOLTIP.sub(replace, text)
+
+
+def extract_styles(text, min_repeats=MIN_STYLE_REPEATS, prefix=STYLE_CLASS_PREFIX):
+    """(text, css): repeated inline styles replaced by classes defined in ``css``."""
+    def has_class(m):
+        return re.search(r"\sclass=", m.group(2) + m.group(5)) is not None
+
+    counts = Counter(m.group(4) for m in _STYLED_TAG.finditer(text) if not has_class(m))
+    classes = {}
+    for style, count in counts.most_common():
+        if count < min_repeats:
+            break
+        classes[style] = f"{prefix}{len(classes)}"
+
+    def replace(m):
+        name = classes.get(m.group(4))
+        if name is None or has_class(m):
+            return m.group(0)
+        return f"<{m.group(1)}{m.group(2)} class={m.group(3)}{name}{m.group(3)}{m.group(5)}>"
+
+    css = "".join(f".{name}{{{style}}}" for style, name in classes.items())
+    return _STYLED_TAG.sub(replace, text), css
+
+
+def round_coordinates(text, precision=COORD_PRECISION):
+    """Every decimal with more than ``precision`` places rounded to ``precision``."""
+    def replace(m):
+        value = f"{float(m.group(1)):.{precision}f}".rstrip("0").rstrip(".")
+        return "0" if value == "-0" else value
+    return re.sub(_LONG_DECIMAL % (precision + 1), replace, text)
+
+
+def _strip_lines(text):
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def minify_html(text):
+    """Drop indentation and blank lines; squeeze whitespace inside HTML template literals."""
+    out, pos = [], 0
+    for m in _BLOCK.finditer(text):
+        out.append(_strip_lines(text[pos:m.start()]))
+        opening, tag, body, closing = m.group(1), m.group(2).lower(), m.group(3), m.group(4)
+        if tag == "script":
+            body = _strip_lines(_TEMPLATE_LITERAL.sub(lambda t: _squeeze(t.group(0)), body))
+        elif tag == "style":
+            body = _strip_lines(body)
+        out.append(f"{opening}{body}{closing}" if tag in ("pre", "textarea") else f"{opening}\n{body}\n{closing}")
+        pos = m.end()
+    out.append(_strip_lines(text[pos:]))
+    return "\n".join(part for part in out if part)
+
+
+def minify_page(text, precision=COORD_PRECISION):
+    text = dedupe_tooltips(text)
+    text, css = extract_styles(text)
+    if css:
+        text = text.replace("</head>", f"<style>{css}</style>\n</head>", 1)
+    return minify_html(round_coordinates(text, precision))
+
+
+def minify_json(text, precision=COORD_PRECISION):
+    return json.dumps(json.loads(round_coordinates(text, precision)), ensure_ascii=False, separators=(",", ":"))
+
+
+def _brotli_available():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compress(path):
+    """Write ``path``.gz (and ``path``.br when brotli is installed); returns their sizes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    sizes = {}
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, GZIP_LEVEL, mtime=0))
+    sizes["gzip"] = os.path.getsize(path + ".gz")
+    try:
+        import brotli
+    except ImportError:
+        sizes["brotli"] = None
+    else:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=BROTLI_QUALITY))
+        sizes["brotli"] = os.path.getsize(path + ".br")
+    return sizes
+
+
+def _outputs(page):
+    """(source, relative output path) of a page and its district shards."""
+    yield page, os.path.basename(page)
+    shard_dir = os.path.splitext(page)[0] + "_districts"
+    if os.path.isdir(shard_dir):
+        for name in sorted(os.listdir(shard_dir)):
+            if name.endswith(".json"):
+                yield os.path.join(shard_dir, name), os.path.join(os.path.basename(shard_dir), name)
+
+
+def copy_images(pages, out_dir, image_dir=gen.SOCIAL_IMAGE_DIR):
+    """Copy the district PNGs next to ``pages`` into ``out_dir``; returns how many."""
+    if not image_dir:
+        return 0
+    copied = 0
+    for source in sorted({os.path.join(os.path.dirname(page), image_dir) for page in pages}):
+        if not os.path.isdir(source):
+            continue
+        target = os.path.join(out_dir, image_dir)
+        os.makedirs(target, exist_ok=True)
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".png"):
+                shutil.copy2(os.path.join(source, name), os.path.join(target, name))
+                copied += 1
+    return copied
+
+
+def publish(pages=PAGES, out_dir=PUBLISH_DIR, precision=COORD_PRECISION):
+    """Minify and precompress ``pages`` into ``out_dir``; returns one size row per file."""
+    if not _brotli_available():
+        print("Warning: brotli is not installed, no .br files are written (pip install brotli)")
+    rows = []
+    for page in pages:
+        for source, relative in _outputs(page):
+            with open(source, encoding="utf-8") as f:
+                text = f.read()
+            minified = minify_json(text, precision) if source.endswith(".json") else minify_page(text, precision)
+            target = os.path.join(out_dir, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(minified)
+            rows.append({
+                "file": relative,
+                "original": os.path.getsize(source),
+                "minified": os.path.getsize(target),
+                **compress(target),
+            })
+    images = copy_images(pages, out_dir)
+    if images:
+        print(f"Copied {images} district images → {os.path.join(out_dir, gen.SOCIAL_IMAGE_DIR)}")
+    return rows
+
+
+def _sum(rows):
+    return {k: None if any(r[k] is None for r in rows) else sum(r[k] for r in rows)
+            for k in ("original", "minified", "gzip", "brotli")}
+
+
+def format_report(rows):
+    """Size table: one line per page, one for all its shards together, and the total."""
+    def line(label, sizes):
+        cells = (f"{sizes[k]:>12,}" if sizes[k] is not None else f"{'-':>12}"
+                 for k in ("original", "minified", "gzip", "brotli"))
+        return f"{label:<{width}} " + " ".join(cells)
+
+    pages = [r for r in rows if os.path.dirname(r["file"]) == ""]
+    shards = [r for r in rows if os.path.dirname(r["file"]) != ""]
+    width = max([len(r["file"]) for r in pages] + [len(f"{len(shards)} shards"), 5])
+    lines = [f"{'file':<{width}} {'original':>12} {'minified':>12} {'gzip':>12} {'brotli':>12}"]
+    lines += [line(r["file"], r) for r in pages]
+    if shards:
+        lines.append(line(f"{len(shards)} shards", _sum(shards)))
+    lines.append(line("total", _sum(rows)))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--out", default=PUBLISH_DIR)
+    parser.add_argument("--precision", type=int, default=COORD_PRECISION)
+    args = parser.parse_args()
+    print(format_report(publish(args.pages, args.out, args.precision)))
+    print("Published →", args.out)
+
+
+if __name__ == "__main__":
+    main()
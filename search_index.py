@@ -0,0 +1,275 @@
+"""Prebuilt search box for jumping to a campus, a district/charter or a plan district.
+
+The generator tokenizes every school name, district/charter name and school
+number once and embeds a word-prefix index: the sorted distinct tokens with,
+for each, the delta-encoded list of entries containing it.  A query looks up
+its longest word by binary search over the tokens, so only the entries under
+that prefix are ever touched; its other words are checked against those few
+entries.  Nothing walks the map layers when searching.
+
+Picking a result calls two hooks the district layers define on the map
+object: ``map.showDistrict(d)`` and ``map.showCampus(d, row)``, which makes
+the campus's marker visible and resolves to it.  ``row`` is the campus's
+position in the page's campus data (``per_district=False``) or within its
+district's shard (``per_district=True``).
+"""
+import re
+import unicodedata
+
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+MAX_RESULTS = 8
+CAMPUS_ZOOM = 15
+
+# entry kinds, in result order
+PLAN_DISTRICT = 0
+LEA = 1
+CAMPUS = 2
+
+
+def normalize(text):
+    """Lowercase ASCII words: accents dropped, everything else a separator.
+
+    Must agree with ``normalize`` in the search box script.
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def _bounds(lat, lon):
+    return [[round(float(lat.min()), 5), round(float(lon.min()), 5)],
+            [round(float(lat.max()), 5), round(float(lon.max()), 5)]]
+
+
+def build_search_index(gdf, plan, label="Senate", abbrev="SD", per_district=False):
+    """The search index of the campuses in ``gdf`` and the districts of ``plan``."""
+    kinds, names, targets, texts = [], [], [], []
+
+    def add(kind, name, target, text):
+        kinds.append(kind)
+        names.append(name)
+        targets.append(target)
+        texts.append(text)
+
+    for d in sorted(plan["district_name"].unique(), key=lambda x: int(x)):
+        add(PLAN_DISTRICT, f"{label} District {d}", d, f"{label} District {d} {abbrev}{d}")
+
+    # only campuses that are drawn, i.e. inside a plan district
+    drawn = gdf["district_name"].notnull().to_numpy()
+    if per_district:
+        rows = gdf.groupby("district_name").cumcount().to_numpy()
+    else:
+        rows = np.arange(len(gdf))
+    rows = rows[drawn]
+    lat = gdf.geometry.y.to_numpy()[drawn]
+    lon = gdf.geometry.x.to_numpy()[drawn]
+    districts = gdf["district_name"].astype(str).to_numpy()[drawn]
+    schools = gdf["School Name"].astype(str).to_numpy()[drawn]
+    leas = gdf["District Name"].astype(str).to_numpy()[drawn]
+    numbers = gdf["School Number"].astype(str).to_numpy()[drawn]
+
+    lea_entry = {}
+    for lea in sorted(set(leas), key=normalize):
+        on = leas == lea
+        lea_entry[lea] = len(names)
+        add(LEA, lea, [_bounds(lat[on], lon[on]), int(on.sum())], lea)
+
+    for k in sorted(range(len(schools)), key=lambda k: normalize(schools[k])):
+        name, lea, number = schools[k], leas[k], numbers[k]
+        add(CAMPUS, name, [districts[k], int(rows[k]), lea_entry[lea], number], f"{name} {lea} {number}")
+
+    postings = {}
+    for entry, text in enumerate(texts):
+        for token in set(normalize(text).split()):
+            postings.setdefault(token, []).append(entry)
+    tokens = sorted(postings)
+    offsets, flat = [0], []
+    for token in tokens:
+        ids = postings[token]
+        flat.extend(np.diff(ids, prepend=0).tolist())
+        offsets.append(len(flat))
+    return {
+        "tokens": " ".join(tokens),
+        "offsets": offsets,
+        "postings": flat,
+        "kind": kinds,
+        "name": names,
+        "target": targets,
+        "abbrev": abbrev,
+    }
+
+
+class CampusSearch(MacroElement):
+    """Search box (top left) over a prebuilt index, see ``build_search_index``."""
+
+    _template = Template(
+        """
+        {% macro header(this, kwargs) %}
+        <style>
+        .campus-search { background: white; padding: 6px; border: 1px solid gray; font-size: 12px; width: 240px; }
+        .campus-search input { width: 100%; box-sizing: border-box; font-size: 12px; }
+        .campus-search ul { list-style: none; margin: 4px 0 0; padding: 0; }
+        .campus-search li { padding: 3px 4px; cursor: pointer; }
+        .campus-search li.active, .campus-search li:hover { background: #e8f1fb; }
+        .campus-search li small { display: block; color: #666; }
+        </style>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var index = {{ this.index|tojson }};
+            var tokens = index.tokens.split(' ');
+            var texts = [];
+            var maxResults = {{ this.max_results }};
+            var campusZoom = {{ this.campus_zoom }};
+
+            // keep in step with normalize() in search_index.py
+            function normalize(s) {
+                return s.normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase()
+                    .replace(/[^a-z0-9]+/g, ' ').trim();
+            }
+            function detail(id) {
+                var t = index.target[id];
+                if (index.kind[id] === {{ this.PLAN_DISTRICT }}) { return index.abbrev + t; }
+                if (index.kind[id] === {{ this.LEA }}) { return t[1] + ' campuses'; }
+                return index.name[t[2]] + ' \\u00b7 ' + t[3];
+            }
+            // the words indexed for an entry, as build_search_index() chose them
+            function text(id) {
+                if (texts[id] === undefined) {
+                    var t = index.target[id], extra = '';
+                    if (index.kind[id] === {{ this.PLAN_DISTRICT }}) { extra = index.abbrev + t; }
+                    if (index.kind[id] === {{ this.CAMPUS }}) { extra = index.name[t[2]] + ' ' + t[3]; }
+                    texts[id] = ' ' + normalize(index.name[id] + ' ' + extra);
+                }
+                return texts[id];
+            }
+            function lowerBound(word) {
+                var lo = 0, hi = tokens.length;
+                while (lo < hi) {
+                    var mid = (lo + hi) >> 1;
+                    if (tokens[mid] < word) { lo = mid + 1; } else { hi = mid; }
+                }
+                return lo;
+            }
+            function search(query) {
+                var words = normalize(query).split(' ').filter(Boolean);
+                if (!words.length) { return []; }
+                var key = words.reduce(function(a, b) { return b.length > a.length ? b : a; });
+                var hits = [], seen = {};
+                for (var k = lowerBound(key); k < tokens.length && tokens[k].lastIndexOf(key, 0) === 0; k++) {
+                    for (var p = index.offsets[k], id = 0; p < index.offsets[k + 1]; p++) {
+                        id += index.postings[p];
+                        if (!seen[id]) { seen[id] = true; hits.push(id); }
+                    }
+                }
+                var phrase = ' ' + words.join(' ');
+                hits = hits.filter(function(id) {
+                    return words.every(function(w) { return text(id).indexOf(' ' + w) !== -1; });
+                });
+                // name starting with the query first, then kind and name order
+                function rank(id) { return text(id).lastIndexOf(phrase, 0) === 0 ? 0 : 1; }
+                hits.sort(function(a, b) { return rank(a) - rank(b) || a - b; });
+                return hits.slice(0, maxResults);
+            }
+
+            function go(id) {
+                var t = index.target[id];
+                if (index.kind[id] === {{ this.PLAN_DISTRICT }}) {
+                    map.showDistrict(t);
+                } else if (index.kind[id] === {{ this.LEA }}) {
+                    map.showDistrict('');
+                    map.fitBounds(t[0], { maxZoom: campusZoom });
+                } else {
+                    map.showCampus(t[0], t[1]).then(function(marker) {
+                        if (!marker) { return; }
+                        map.setView(marker.getLatLng(), Math.max(map.getZoom(), campusZoom));
+                        marker.openPopup();
+                    });
+                }
+            }
+
+            var container = L.DomUtil.create('div', 'campus-search');
+            container.innerHTML = '<input type="search" placeholder="Find a campus or district" '
+                + 'aria-label="Find a campus or district"><ul></ul>';
+            L.DomEvent.disableClickPropagation(container);
+            L.DomEvent.disableScrollPropagation(container);
+            var SearchControl = L.Control.extend({
+                options: { position: 'topleft' },
+                onAdd: function(map) {
+                    return container;
+                }
+            });
+            map.addControl(new SearchControl());
+            var input = container.querySelector('input');
+            var list = container.querySelector('ul');
+            var results = [], active = 0;
+
+            function show() {
+                list.innerHTML = '';
+                results.forEach(function(id, k) {
+                    var item = document.createElement('li');
+                    item.textContent = index.name[id];
+                    var small = document.createElement('small');
+                    small.textContent = detail(id);
+                    item.appendChild(small);
+                    if (k === active) { item.className = 'active'; }
+                    item.addEventListener('mousedown', function(e) {
+                        e.preventDefault();
+                        pick(k);
+                    });
+                    list.appendChild(item);
+                });
+            }
+            function pick(k) {
+                if (!results.length) { return; }
+                var id = results[k];
+                input.value = index.name[id];
+                results = [];
+                show();
+                input.blur();
+                go(id);
+            }
+            input.addEventListener('input', function() {
+                results = search(input.value);
+                active = 0;
+                show();
+            });
+            input.addEventListener('keydown', function(e) {
+                if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                    e.preventDefault();
+                    if (results.length) {
+                        active = (active + (e.key === 'ArrowDown' ? 1 : results.length - 1)) % results.length;
+                        show();
+                    }
+                } else if (e.key === 'Enter') {
+                    pick(active);
+                } else if (e.key === 'Escape') {
+                    results = [];
+                    show();
+                }
+            });
+            input.addEventListener('blur', function() {
+                results = [];
+                show();
+            });
+        })();
+        {% endmacro %}
+        """
+    )
+
+    PLAN_DISTRICT = PLAN_DISTRICT
+    LEA = LEA
+    CAMPUS = CAMPUS
+
+    def __init__(self, gdf, plan, label="Senate", abbrev="SD", per_district=False,
+                 max_results=MAX_RESULTS, campus_zoom=CAMPUS_ZOOM):
+        super().__init__()
+        self._name = "CampusSearch"
+        self.index = build_search_index(gdf, plan, label, abbrev, per_district)
+        self.max_results = max_results
+        self.campus_zoom = campus_zoom
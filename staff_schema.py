@@ -0,0 +1,119 @@
+"""Declarative cleaning of TEA staff tables.
+
+A ``Schema`` lists every output column once: its kind, the rounding it gets,
+the FTE count that zeroes it, or how it is derived from other columns.
+``Schema.apply`` runs the whole list in one pass over NumPy arrays, in the
+order TEA's numbers need:
+
+    parse      "." (withheld) and unparseable cells become NaN
+    zero       a salary whose FTE count is 0 becomes 0 (count as reported)
+    round      to ``decimals`` places
+    derive     sums and FTE-weighted averages of the rounded columns
+    mask       a row with every ``mask_if_all_null`` column null is withheld:
+               its ``withheld`` columns are null and its flag is set
+
+Numeric columns come back as nullable Float64; identifier columns and
+numbers declared ``clean=False`` pass through untouched.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+# === CONFIGURATION ===
+# what TEA writes into a withheld cell
+WITHHELD = "."
+
+ID = "id"
+NUMBER = "number"
+
+
+class Column:
+    """One output column of a schema.
+
+    ``zero_if_zero`` names the FTE count column whose 0 zeroes this one;
+    ``sum`` lists columns to add up; ``weighted_by`` pairs (count, value)
+    columns for an FTE-weighted average, left as ``fill`` where undefined.
+    ``clean=False`` keeps the column as read, "." included.
+    """
+
+    def __init__(self, name, kind=NUMBER, decimals=None, zero_if_zero=None, sum=None,
+                 weighted_by=None, fill=None, withheld=True, clean=True):
+        self.name = name
+        self.kind = kind
+        self.decimals = decimals
+        self.zero_if_zero = zero_if_zero
+        self.sum = sum
+        self.weighted_by = weighted_by
+        self.fill = fill
+        self.clean = clean and kind == NUMBER
+        self.withheld = withheld and self.clean
+
+    @property
+    def derived(self):
+        return self.sum is not None or self.weighted_by is not None
+
+    @property
+    def as_read(self):
+        return not self.clean and not self.derived
+
+
+def _parse(values):
+    """float64 array of a raw staff column; withheld and non-numeric cells are NaN."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    return pd.to_numeric(values.mask(values.eq(WITHHELD)), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _add(arrays):
+    # left to right, as a written-out sum would
+    return functools.reduce(np.add, arrays)
+
+
+class Schema:
+    """Ordered ``Column`` specs plus the columns whose all-null rows are withheld."""
+
+    def __init__(self, columns, mask_if_all_null=()):
+        self.columns = list(columns)
+        self.mask_if_all_null = list(mask_if_all_null)
+
+    @property
+    def sources(self):
+        """The columns read from the source table, in schema order."""
+        return [c.name for c in self.columns if not c.derived]
+
+    def apply(self, df):
+        """(cleaned frame, withheld-row flag) of ``df``, which holds ``sources``."""
+        kept = {c.name: df[c.name] for c in self.columns if c.as_read}
+        values = {c.name: _parse(df[c.name]) for c in self.columns if c.clean and not c.derived}
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            raw = {c.zero_if_zero: values[c.zero_if_zero] for c in self.columns if c.zero_if_zero}
+            for c in self.columns:
+                if c.zero_if_zero and c.name in values:
+                    values[c.name] = np.where(raw[c.zero_if_zero] == 0, 0.0, values[c.name])
+            for c in self.columns:
+                if c.decimals is not None and c.name in values:
+                    values[c.name] = np.round(values[c.name], c.decimals)
+            for c in self.columns:
+                if c.sum is not None:
+                    values[c.name] = _add([values[s] for s in c.sum])
+                elif c.weighted_by is not None:
+                    total = _add([values[n] * values[v] for n, v in c.weighted_by])
+                    values[c.name] = total / _add([values[n] for n, _ in c.weighted_by])
+                if c.fill is not None:
+                    values[c.name] = np.where(np.isnan(values[c.name]), c.fill, values[c.name])
+
+        if self.mask_if_all_null:
+            masked = np.logical_and.reduce([np.isnan(values[name]) for name in self.mask_if_all_null])
+        else:
+            masked = np.zeros(len(df), dtype=bool)
+        out = {}
+        for c in self.columns:
+            if c.as_read:
+                out[c.name] = kept[c.name].to_numpy()
+                continue
+            data = values[c.name]
+            null = np.isnan(data) | masked if c.withheld else np.isnan(data)
+            out[c.name] = pd.arrays.FloatingArray(np.where(null, 0.0, data), null)
+        return pd.DataFrame(out, index=df.index), masked
@@ -0,0 +1,197 @@
+"""Synthetic TEA inputs for exercising the TAPR -> map pipeline at any scale.
+
+    python synthetic_data.py bench_data --campuses 100000 --districts 31
+
+writes, under the real file names and column labels,
+
+    CSTAF.xlsx                                  campus staff profile (CPST codes)
+    Campus_Staff_Information_<year>_State.xlsx  code -> label mapping
+    District STAFF Profile.xlsx                 district staff profile
+    AskTED Geocoded_Spring 2024.xlsx            "School Data" sheet with coordinates
+    PLANS2168/PLANS2168.shp                     district polygons covering Texas
+
+Salary/count cells are masked with "." the way TEA publishes them, some
+campuses are masked entirely, some lack census coordinates and AskTED lists
+extra campuses (a few with missing or out-of-range coordinates) that have no
+staff profile.  Everything is drawn from one seeded generator, so a size and
+seed always give the same files.  Excel caps a sheet at 1,048,575 rows;
+writing the largest sizes takes a long time (openpyxl), so generate them once
+and reuse the directory.
+"""
+import argparse
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# rough Texas extent
+TEXAS_BOUNDS = (-106.6, 25.9, -93.5, 36.5)
+
+BANDS = ["Beginning", "1-5 Years", "6-10 Years", "11-20 Years", "21-30 Years", "> 30 Years"]
+CAMPUS_LABELS = (
+    ["Teacher Total Full Time Equiv Count"]
+    + [f"Teacher {b} Full Time Equiv Count" for b in BANDS]
+    + ["Teacher Total Base Salary Average"]
+    + [f"Teacher {b} Base Salary Average" for b in BANDS]
+    + [f"Teacher {b} Full Time Equiv Percent" for b in BANDS]
+    + ["Teacher Tenure Average", "Teacher Experience Average", "Teacher Student Ratio"]
+)
+DISTRICT_LABELS = (
+    ["Teacher Total Full Time Equiv Count"]
+    + [f"Teacher {b} Full Time Equiv Count" for b in BANDS]
+    + ["Teacher Turnover Ratio", "Average Years Experience of Teachers with District",
+       "Teacher Experience Average", "Teacher Student Ratio"]
+    + [f"Teacher {b} Base Salary Average" for b in BANDS]
+    + ["Teacher Total Base Salary Average"]
+)
+# columns of the real workbooks the pipeline does not use
+EXTRA_CAMPUS_COLUMNS = 40
+
+# share of cells/rows given the irregularities of the real files
+MASKED_CELL_RATE = 0.05
+MASKED_CAMPUS_RATE = 0.08
+NO_CENSUS_COORDS_RATE = 0.2
+CHARTER_RATE = 0.2
+ASKTED_ONLY_RATE = 0.03
+
+
+def _measure(label, rng, n):
+    if "Count" in label:
+        return rng.integers(0, 30, n) + rng.choice([0.0, 0.5], n)
+    if "Salary" in label:
+        return np.round(rng.normal(58000, 8000, n), 2)
+    if "Percent" in label:
+        return np.round(rng.random(n) * 40, 1)
+    return np.round(rng.random(n) * 20, 1)
+
+
+def district_polygons(n_districts, rng, bounds=TEXAS_BOUNDS, vertex_spacing=0.01):
+    """``n_districts`` polygons tiling ``bounds`` (Voronoi cells, densified to real-plan vertex counts)."""
+    minx, miny, maxx, maxy = bounds
+    seeds = shapely.multipoints(np.column_stack([
+        rng.uniform(minx, maxx, n_districts), rng.uniform(miny, maxy, n_districts),
+    ]))
+    extent = shapely.box(*bounds)
+    cells = shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=extent))
+    cells = shapely.segmentize(shapely.intersection(cells, extent), vertex_spacing)
+    return gpd.GeoDataFrame({"District": np.arange(1, len(cells) + 1)}, geometry=cells, crs="EPSG:4326")
+
+
+def make_dataset(campuses=1000, districts=31, seed=0, year=2024):
+    """{file name: DataFrame/GeoDataFrame} of one synthetic dataset."""
+    rng = np.random.default_rng(seed)
+    n = campuses
+    n_lea = max(n // 8, 1)
+
+    campus = np.arange(n) + 1001001
+    lea = 1001 + rng.integers(0, n_lea, n)
+    cstaf = pd.DataFrame({
+        "CAMPUS": campus,
+        "DISTRICT": lea,
+        "CAMPNAME": [f"Campus {c}" for c in campus],
+        "DISTNAME": [f"District {d} ISD" for d in lea],
+    })
+    codes = [f"CPST{i:04d}" for i in range(len(CAMPUS_LABELS))]
+    masked_campus = rng.random(n) < MASKED_CAMPUS_RATE
+    for code, label in zip(codes, CAMPUS_LABELS):
+        values = _measure(label, rng, n).astype(object)
+        values[rng.random(n) < MASKED_CELL_RATE] = "."
+        if "Salary" in label or "Count" in label:
+            values[masked_campus] = "."
+        cstaf[code] = values
+    for i in range(EXTRA_CAMPUS_COLUMNS):
+        cstaf[f"CPXX{i:04d}"] = rng.random(n)
+
+    labels = pd.DataFrame({
+        "Name": ["CAMPUS", "DISTRICT"] + codes,
+        "Label": ["CAMPUS", "DISTRICT"] + [f"Campus {year} Staff: {label}" for label in CAMPUS_LABELS],
+    })
+
+    leas = np.unique(lea)
+    district_staff = pd.DataFrame({"DISTRICT": leas, "DISTNAME": [f"District {d} ISD" for d in leas]})
+    for label in DISTRICT_LABELS:
+        district_staff[f"District {year} Staff: {label}"] = _measure(label, rng, len(leas))
+
+    plan = district_polygons(districts, rng)
+
+    # AskTED: every profiled campus plus campuses without a staff profile
+    n_extra = int(n * ASKTED_ONLY_RATE)
+    school = np.concatenate([campus, np.arange(n_extra) + campus[-1] + 1])
+    school_lea = np.concatenate([lea, 1001 + rng.integers(0, n_lea, n_extra)])
+    total = len(school)
+    # the Voronoi cells tile the whole extent, so every point has a district
+    minx, miny, maxx, maxy = plan.total_bounds
+    lon = rng.uniform(minx, maxx, total)
+    lat = rng.uniform(miny, maxy, total)
+    census_lat, census_lon = lat.copy(), lon.copy()
+    no_census = rng.random(total) < NO_CENSUS_COORDS_RATE
+    census_lat[no_census] = np.nan
+    census_lon[no_census] = np.nan
+    # broken coordinates only on campuses the map never shows
+    extra = np.arange(total) >= n
+    broken = extra & (rng.random(total) < 0.3)
+    lat[broken] = np.where(rng.random(broken.sum()) < 0.5, np.nan, 999.0)
+    census_lat[broken] = np.nan
+    census_lon[broken] = np.nan
+
+    lea_enrollment = dict(zip(leas, rng.integers(100, 20000, len(leas))))
+    askted = pd.DataFrame({
+        "School Number": school,
+        "School Name": [f"Campus {c}" for c in school],
+        "District Name": [f"District {d} ISD" for d in school_lea],
+        "District Type": np.where(rng.random(total) < CHARTER_RATE, "CHARTER", "INDEPENDENT"),
+        "Full_Site_Address": "1 Main St, Austin, TX 78701",
+        "Latitude": lat,
+        "Longitude": lon,
+        "Census_Latitude": census_lat,
+        "Census_Longitude": census_lon,
+        "School Enrollment as of Oct 2023": rng.integers(50, 3000, total),
+        "District Enrollment as of Oct 2023": [lea_enrollment.get(d, 500) for d in school_lea],
+    })
+    askted.loc[extra & (rng.random(total) < 0.1), "Full_Site_Address"] = "TX,  "
+
+    return {
+        "CSTAF.xlsx": cstaf,
+        f"Campus_Staff_Information_{year}_State.xlsx": labels,
+        "District STAFF Profile.xlsx": district_staff,
+        "AskTED Geocoded_Spring 2024.xlsx": askted,
+        os.path.join("PLANS2168", "PLANS2168.shp"): plan,
+    }
+
+
+def write_dataset(out_dir, campuses=1000, districts=31, seed=0, year=2024):
+    """Write one synthetic dataset into ``out_dir`` (created if needed)."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, frame in make_dataset(campuses, districts, seed, year).items():
+        path = os.path.join(out_dir, name)
+        if name.endswith(".shp"):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            frame.to_file(path)
+        elif name.startswith("Campus_Staff_Information"):
+            # the real mapping sheet has a four-row preamble above the header
+            with pd.ExcelWriter(path) as writer:
+                pd.DataFrame([["TAPR 2023-24 Campus Staff Information"]]).to_excel(writer, index=False, header=False)
+                frame.to_excel(writer, index=False, startrow=4)
+        elif name.startswith("AskTED"):
+            with pd.ExcelWriter(path) as writer:
+                frame.to_excel(writer, sheet_name="School Data", index=False)
+        else:
+            frame.to_excel(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--campuses", type=int, default=1000)
+    parser.add_argument("--districts", type=int, default=31)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--year", type=int, default=2024, help="TAPR year in the staff column labels")
+    args = parser.parse_args()
+    write_dataset(args.out_dir, args.campuses, args.districts, args.seed, args.year)
+    print(f"Wrote {args.campuses:,} campuses / {args.districts} districts to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,157 +1,315 @@
-import pandas as pd
-
-df = pd.read_excel("District STAFF Profile.xlsx")
-
-columns_to_keep = [
-    'DISTRICT',
-    'DISTNAME',
-    'District 2024 Staff: Teacher Total Full Time Equiv Count',
-    'District 2024 Staff: Teacher Beginning Full Time Equiv Count',
-    'District 2024 Staff: Teacher 1-5 Years Full Time Equiv Count',
-    'District 2024 Staff: Teacher 6-10 Years Full Time Equiv Count',
-    'District 2024 Staff: Teacher 11-20 Years Full Time Equiv Count',
-    'District 2024 Staff: Teacher 21-30 Years Full Time Equiv Count',
-    'District 2024 Staff: Teacher > 30 Years Full Time Equiv Count',
-       'District 2024 Staff: Teacher Turnover Ratio',
-       'District 2024 Staff: Average Years Experience of Teachers with District',
-       'District 2024 Staff: Teacher Experience Average',
-
-       'District 2024 Staff: Teacher Student Ratio',
-       'District 2024 Staff: Teacher Beginning Base Salary Average',
-       'District 2024 Staff: Teacher 1-5 Years Base Salary Average',
-       'District 2024 Staff: Teacher 6-10 Years Base Salary Average',
-       'District 2024 Staff: Teacher 11-20 Years Base Salary Average',
-       'District 2024 Staff: Teacher 21-30 Years Base Salary Average',
-       'District 2024 Staff: Teacher > 30 Years Base Salary Average',
-       'District 2024 Staff: Teacher Total Base Salary Average',
-]
-
-df = df[columns_to_keep]
-
-df.to_excel("District Teacher Profile.xlsx", index=False)
-
-df = pd.read_excel("CSTAF.xlsx")
-
-# Rename columns in df using mapping from Campus_Staff_Information_2024_State.xlsx
-mapping_df = pd.read_excel("Campus_Staff_Information_2024_State.xlsx", skiprows=4)
-rename_mapping = mapping_df[['Name', 'Label']].dropna()
-rename_dict = dict(zip(rename_mapping['Name'], rename_mapping['Label']))
-df = df.rename(columns=rename_dict)
-
-columns_to_keep = [
-    'CAMPUS', 'DISTRICT', 'CAMPNAME', 'DISTNAME',
-       'Campus 2024 Staff: Teacher Total Full Time Equiv Count',
-
-       'Campus 2024 Staff: Teacher Beginning Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 1-5 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 6-10 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 11-20 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 21-30 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher > 30 Years Full Time Equiv Count',
-
-       'Campus 2024 Staff: Teacher Total Base Salary Average',
-       'Campus 2024 Staff: Teacher Beginning Base Salary Average',
-       'Campus 2024 Staff: Teacher 1-5 Years Base Salary Average',
-       'Campus 2024 Staff: Teacher 6-10 Years Base Salary Average',
-       'Campus 2024 Staff: Teacher 11-20 Years Base Salary Average',
-       'Campus 2024 Staff: Teacher 21-30 Years Base Salary Average',
-       'Campus 2024 Staff: Teacher > 30 Years Base Salary Average',
-
-       'Campus 2024 Staff: Teacher Beginning Full Time Equiv Percent',
-       'Campus 2024 Staff: Teacher 1-5 Years Full Time Equiv Percent',
-       'Campus 2024 Staff: Teacher 6-10 Years Full Time Equiv Percent',
-       'Campus 2024 Staff: Teacher 11-20 Years Full Time Equiv Percent',
-       'Campus 2024 Staff: Teacher 21-30 Years Full Time Equiv Percent',
-       'Campus 2024 Staff: Teacher > 30 Years Full Time Equiv Percent',
-        'Campus 2024 Staff: Teacher Tenure Average',
-        'Campus 2024 Staff: Teacher Experience Average',
-       'Campus 2024 Staff: Teacher Student Ratio'
-]
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-df = df[columns_to_keep]
-
-
-
-# Define salary columns to clean (for use in missing data report and cleaning) - use original column names with prefix
-salary_columns_to_clean = [
-'Campus 2024 Staff: Teacher Beginning Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 1-5 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 6-10 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 11-20 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher 21-30 Years Full Time Equiv Count',
-       'Campus 2024 Staff: Teacher > 30 Years Full Time Equiv Count',
-    'Campus 2024 Staff: Teacher Beginning Base Salary Average',
-    'Campus 2024 Staff: Teacher 1-5 Years Base Salary Average',
-    'Campus 2024 Staff: Teacher 6-10 Years Base Salary Average',
-    'Campus 2024 Staff: Teacher 11-20 Years Base Salary Average',
-    'Campus 2024 Staff: Teacher 21-30 Years Base Salary Average',
-    'Campus 2024 Staff: Teacher > 30 Years Base Salary Average',
-    'Campus 2024 Staff: Teacher Total Base Salary Average',
-]
+import pandas as pd
 
-# Report rows with missing salary data
-missing_salary_rows = df[df[salary_columns_to_clean].isna().any(axis=1)]
-missing_salary_rows.to_excel("Missing Teacher Salary Data.xlsx", index=False)
+import build_profile as profile
+from staff_schema import ID, Column, Schema
+from tea_reader import CAMPUS_ID_WIDTH, DISTRICT_ID_WIDTH, read_header, read_table
 
-df.columns = df.columns.str.replace("Campus 2024 Staff: ", "", regex=False)
+# === CONFIGURATION ===
+DISTRICT_STAFF_PATH = "District STAFF Profile.xlsx"
+DISTRICT_PROFILE_PATH = "District Teacher Profile.xlsx"
+CAMPUS_STAFF_PATH = "CSTAF.xlsx"
+# TAPR release processed by a plain run; columns are found by their label without
+# the "<District|Campus> <year> Staff: " prefix, so any year's files work
+TAPR_YEAR = 2024
+CAMPUS_LABELS_PATTERN = "Campus_Staff_Information_{year}_State.xlsx"
+CAMPUS_LABELS_PATH = CAMPUS_LABELS_PATTERN.format(year=TAPR_YEAR)
+# typed campus profile read by the map scripts: nullable numeric columns, masked
+# rows flagged in MASKED_COLUMN (their teacher values are null)
+CAMPUS_PROFILE_PATH = "Campus Teacher Profile.parquet"
+# human-readable copy with "MASKED" written into the cells (None to skip)
+CAMPUS_PROFILE_REPORT = "Campus Teacher Profile.xlsx"
+MISSING_SALARY_REPORT = "Missing Teacher Salary Data.xlsx"
 
+# multi-year runs (--years): each year's TEA files sit in their own directory,
+# and the campus profiles are stacked into one campus-by-year table
+YEAR_DIR = "TAPR {year}"
+LONGITUDINAL_PROFILE_PATH = "Campus Teacher Profile by Year.parquet"
+YEAR_COLUMN = "Year"
 
-df = df.rename(columns={"CAMPUS": "School Number", "DISTRICT": "District Number"})
+MASKED = "MASKED"
+MASKED_COLUMN = "Teacher Data Masked"
 
+# read-time schema of the identifier columns; staff measures are read as they
+# are, since TEA writes "." into masked cells.  Campus and district numbers are
+# zero-padded text, as AskTED's "School Number" (see tea_reader.tea_ids)
+DISTRICT_ID_DTYPES = {"DISTRICT": str, "DISTNAME": str}
+CAMPUS_ID_DTYPES = {"CAMPUS": str, "DISTRICT": str, "CAMPNAME": str, "DISTNAME": str}
+DISTRICT_ID_WIDTHS = {"DISTRICT": DISTRICT_ID_WIDTH}
+CAMPUS_ID_WIDTHS = {"CAMPUS": CAMPUS_ID_WIDTH, "DISTRICT": DISTRICT_ID_WIDTH}
 
-# Clean and convert ALL columns with "." to NaN where appropriate
-df = df.replace('.', pd.NA)
-df = df.apply(pd.to_numeric, errors='ignore')
+STAFF_LABEL = re.compile(r"^(District|Campus) (\d{4}) Staff: ")
 
+DISTRICT_COLUMNS = [
+    'Teacher Total Full Time Equiv Count',
+    'Teacher Beginning Full Time Equiv Count',
+    'Teacher 1-5 Years Full Time Equiv Count',
+    'Teacher 6-10 Years Full Time Equiv Count',
+    'Teacher 11-20 Years Full Time Equiv Count',
+    'Teacher 21-30 Years Full Time Equiv Count',
+    'Teacher > 30 Years Full Time Equiv Count',
+    'Teacher Turnover Ratio',
+    'Average Years Experience of Teachers with District',
+    'Teacher Experience Average',
+    'Teacher Student Ratio',
+    'Teacher Beginning Base Salary Average',
+    'Teacher 1-5 Years Base Salary Average',
+    'Teacher 6-10 Years Base Salary Average',
+    'Teacher 11-20 Years Base Salary Average',
+    'Teacher 21-30 Years Base Salary Average',
+    'Teacher > 30 Years Base Salary Average',
+    'Teacher Total Base Salary Average',
+]
 
-# Set salary value to 0 if the corresponding Count is 0
-for col in df.columns:
-    if "Full Time Equiv Count" in col:
-        salary_col = col.replace("Full Time Equiv Count", "Base Salary Average")
-        if salary_col in df.columns:
-            df.loc[df[col] == 0, salary_col] = 0
+CAMPUS_COLUMNS = [
+    'Teacher Total Full Time Equiv Count',
 
-# Round relevant inputs to 1 decimal before further calculations
-round_cols = [
+    'Teacher Beginning Full Time Equiv Count',
+    'Teacher 1-5 Years Full Time Equiv Count',
     'Teacher 6-10 Years Full Time Equiv Count',
     'Teacher 11-20 Years Full Time Equiv Count',
     'Teacher 21-30 Years Full Time Equiv Count',
     'Teacher > 30 Years Full Time Equiv Count',
+
+    'Teacher Total Base Salary Average',
+    'Teacher Beginning Base Salary Average',
+    'Teacher 1-5 Years Base Salary Average',
+    'Teacher 6-10 Years Base Salary Average',
+    'Teacher 11-20 Years Base Salary Average',
+    'Teacher 21-30 Years Base Salary Average',
+    'Teacher > 30 Years Base Salary Average',
+
+    'Teacher Beginning Full Time Equiv Percent',
+    'Teacher 1-5 Years Full Time Equiv Percent',
     'Teacher 6-10 Years Full Time Equiv Percent',
     'Teacher 11-20 Years Full Time Equiv Percent',
     'Teacher 21-30 Years Full Time Equiv Percent',
     'Teacher > 30 Years Full Time Equiv Percent',
+    'Teacher Tenure Average',
+    'Teacher Experience Average',
+    'Teacher Student Ratio',
+]
+
+# salary columns to clean (for use in missing data report and cleaning); a campus
+# with none of them reported is masked
+SALARY_COLUMNS = [
+    'Teacher Beginning Full Time Equiv Count',
+    'Teacher 1-5 Years Full Time Equiv Count',
+    'Teacher 6-10 Years Full Time Equiv Count',
+    'Teacher 11-20 Years Full Time Equiv Count',
+    'Teacher 21-30 Years Full Time Equiv Count',
+    'Teacher > 30 Years Full Time Equiv Count',
+    'Teacher Beginning Base Salary Average',
+    'Teacher 1-5 Years Base Salary Average',
     'Teacher 6-10 Years Base Salary Average',
     'Teacher 11-20 Years Base Salary Average',
     'Teacher 21-30 Years Base Salary Average',
     'Teacher > 30 Years Base Salary Average',
+    'Teacher Total Base Salary Average',
 ]
-df[round_cols] = df[round_cols].round(1)
 
-df["Teacher 5+ Years Full Time Equiv Count"] = (
-    df['Teacher 6-10 Years Full Time Equiv Count'] +
-    df['Teacher 11-20 Years Full Time Equiv Count'] +
-    df['Teacher 21-30 Years Full Time Equiv Count'] +
-    df['Teacher > 30 Years Full Time Equiv Count']
+# experience bands summed into the derived 5+ years columns; they are rounded to
+# 1 decimal first
+FIVE_PLUS_BANDS = ['6-10 Years', '11-20 Years', '21-30 Years', '> 30 Years']
+
+
+def _count_column(name, names):
+    # the FTE count whose 0 zeroes salary column ``name``, if it is one of ``names``
+    count = name.replace("Base Salary Average", "Full Time Equiv Count")
+    return count if count != name and count in names else None
+
+
+def _in_five_plus_band(name):
+    return any(name.startswith(f"Teacher {band} ") for band in FIVE_PLUS_BANDS)
+
+
+# the district report keeps TEA's values as published ("." and salaries of 0 FTE included)
+DISTRICT_SCHEMA = Schema(
+    [Column(name, kind=ID) for name in DISTRICT_ID_DTYPES]
+    + [Column(name, clean=False) for name in DISTRICT_COLUMNS]
+)
+
+CAMPUS_SCHEMA = Schema(
+    [Column(name, kind=ID) for name in ("School Number", "District Number", "CAMPNAME", "DISTNAME")]
+    + [
+        Column(name, decimals=1 if _in_five_plus_band(name) else None,
+               zero_if_zero=_count_column(name, CAMPUS_COLUMNS))
+        for name in CAMPUS_COLUMNS
+    ]
+    + [
+        Column("Teacher 5+ Years Full Time Equiv Count",
+               sum=[f"Teacher {band} Full Time Equiv Count" for band in FIVE_PLUS_BANDS]),
+        Column("Teacher 5+ Years Full Time Equiv Percent",
+               sum=[f"Teacher {band} Full Time Equiv Percent" for band in FIVE_PLUS_BANDS]),
+        Column("Teacher 5+ Years Base Salary Average", fill=0, weighted_by=[
+            (f"Teacher {band} Full Time Equiv Count", f"Teacher {band} Base Salary Average")
+            for band in FIVE_PLUS_BANDS
+        ]),
+    ],
+    # a campus with no salary data at all is withheld
+    mask_if_all_null=SALARY_COLUMNS,
 )
 
-df["Teacher 5+ Years Full Time Equiv Percent"] = df['Teacher 6-10 Years Full Time Equiv Percent'] + df['Teacher 11-20 Years Full Time Equiv Percent'] + df['Teacher 21-30 Years Full Time Equiv Percent'] + df['Teacher > 30 Years Full Time Equiv Percent']
 
-df["Teacher 5+ Years Base Salary Average"] = (
-    (df['Teacher 6-10 Years Full Time Equiv Count'] * df['Teacher 6-10 Years Base Salary Average']) +
-    (df['Teacher 11-20 Years Full Time Equiv Count'] * df['Teacher 11-20 Years Base Salary Average']) +
-    (df['Teacher 21-30 Years Full Time Equiv Count'] * df['Teacher 21-30 Years Base Salary Average']) +
-    (df['Teacher > 30 Years Full Time Equiv Count'] * df['Teacher > 30 Years Base Salary Average'])
-) / df["Teacher 5+ Years Full Time Equiv Count"]
+def staff_columns(columns, level, names, year=None):
+    """The ``<level> <year> Staff: <name>`` column of ``columns`` for each of ``names``.
+
+    With ``year`` None the year is read from the columns themselves, which
+    must all come from one TAPR release.
+    """
+    years = {m.group(2) for m in map(STAFF_LABEL.match, columns) if m and m.group(1) == level}
+    if year is not None and str(year) in years:
+        years = {str(year)}
+    if len(years) != 1 or (year is not None and years != {str(year)}):
+        expected = f"TAPR {year}" if year is not None else "one TAPR year"
+        raise ValueError(f"expected {level} staff columns of {expected}, found years {sorted(years) or 'none'}")
+    prefix = f"{level} {years.pop()} Staff: "
+    missing = [name for name in names if prefix + name not in columns]
+    if missing:
+        raise KeyError(f"{prefix!r} columns missing: {missing}")
+    return [prefix + name for name in names]
+
+
+@profile.stage("district_profile")
+def process_district_profile(source=DISTRICT_STAFF_PATH, output=DISTRICT_PROFILE_PATH, year=None):
+    labels = staff_columns(read_header(source), "District", DISTRICT_COLUMNS, year)
+    df = read_table(source, columns=list(DISTRICT_ID_DTYPES) + labels, dtype=DISTRICT_ID_DTYPES,
+                    ids=DISTRICT_ID_WIDTHS)
+
+    # cleaned under the plain names, written under TEA's labels
+    df, _ = DISTRICT_SCHEMA.apply(df.rename(columns=dict(zip(labels, DISTRICT_COLUMNS))))
+    df = df.rename(columns=dict(zip(DISTRICT_COLUMNS, labels)))
+
+    df.to_excel(output, index=False)
+
+
+@profile.stage("campus_profile")
+def process_campus_profile(source=CAMPUS_STAFF_PATH, label_mapping=CAMPUS_LABELS_PATH,
+                           output=CAMPUS_PROFILE_PATH, missing_report=MISSING_SALARY_REPORT,
+                           excel_report=CAMPUS_PROFILE_REPORT, year=None):
+    """Write the typed campus profile of one TAPR release and return it."""
+    with profile.stage("excel_load"):
+        # Rename columns in df using mapping from Campus_Staff_Information_<year>_State.xlsx;
+        # only the source columns behind the labels we keep are read
+        mapping_df = read_table(label_mapping, columns=['Name', 'Label'], skiprows=4)
+        rename_mapping = mapping_df.dropna()
+        rename_dict = dict(zip(rename_mapping['Name'], rename_mapping['Label']))
+        code_for_label = dict(zip(rename_mapping['Label'], rename_mapping['Name']))
+        columns_to_keep = list(CAMPUS_ID_DTYPES) + staff_columns(list(code_for_label), "Campus", CAMPUS_COLUMNS, year)
+
+        df = read_table(
+            source, columns=[code_for_label.get(col, col) for col in columns_to_keep], dtype=CAMPUS_ID_DTYPES,
+            ids=CAMPUS_ID_WIDTHS,
+        )
+
+    with profile.stage("rename_cleanup"):
+        df = df.rename(columns=rename_dict)
+
+        df = df[columns_to_keep]
+
+        # Report rows with missing salary data
+        missing_salary_rows = df[df[staff_columns(df.columns, "Campus", SALARY_COLUMNS, year)].isna().any(axis=1)]
+        missing_salary_rows.to_excel(missing_report, index=False)
+
+        df.columns = df.columns.str.replace(STAFF_LABEL, "", regex=True)
+        df = df.rename(columns={"CAMPUS": "School Number", "DISTRICT": "District Number"})
+
+    # "." -> null, salaries of 0 FTE -> 0, band rounding, the 5+ years columns
+    # and withheld campuses, all in one pass (see CAMPUS_SCHEMA)
+    with profile.stage("clean"):
+        df, masked = CAMPUS_SCHEMA.apply(df)
+
+    with profile.stage("masking_write"):
+        teacher_columns = [col for col in df.columns if "Teacher" in col]
+        if excel_report:
+            report = df.astype({col: object for col in teacher_columns})
+            report.loc[masked, teacher_columns] = MASKED
+            report.to_excel(excel_report, index=False)
+
+        df[MASKED_COLUMN] = masked
+        df.to_parquet(output, index=False)
+    return df
+
+
+def read_campus_profile(path=CAMPUS_PROFILE_PATH, columns=None):
+    """Campus teacher profile in the typed form written by ``process_campus_profile``.
+
+    Only ``columns`` (all when None) are returned.  A legacy Excel profile
+    (with "MASKED" in the cells) is converted on load.
+    """
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    usecols = None
+    if columns is not None:
+        # every teacher column is needed for the masked flag
+        usecols = [col for col in read_header(path) if col in columns or "Teacher" in col]
+    df = read_table(path, columns=usecols)
+    teacher_columns = [col for col in df.columns if "Teacher" in col]
+    masked = df[teacher_columns].eq(MASKED).any(axis=1)
+    df[teacher_columns] = df[teacher_columns].mask(df[teacher_columns].eq(MASKED)).apply(pd.to_numeric).astype("Float64")
+    df[MASKED_COLUMN] = masked.to_numpy()
+    return df if columns is None else df[list(columns)]
+
+
+def _process_year(year, year_dir):
+    def path(name):
+        return os.path.join(year_dir, name)
+
+    process_district_profile(path(DISTRICT_STAFF_PATH), path(DISTRICT_PROFILE_PATH), year)
+    df = process_campus_profile(
+        path(CAMPUS_STAFF_PATH),
+        path(CAMPUS_LABELS_PATTERN.format(year=year)),
+        path(CAMPUS_PROFILE_PATH), path(MISSING_SALARY_REPORT),
+        path(CAMPUS_PROFILE_REPORT) if CAMPUS_PROFILE_REPORT else None,
+        year,
+    )
+    return year, df
+
+
+def process_years(years, year_dir=YEAR_DIR, output=LONGITUDINAL_PROFILE_PATH, workers=None):
+    """Process several TAPR years in a pool and stack their campus profiles.
+
+    Every year's own outputs are written inside ``year_dir`` (formatted with
+    the year); the combined campus-by-year table goes to ``output``.
+    """
+    workers = workers or min(len(years), os.cpu_count() or 1)
+    frames = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_process_year, year, year_dir.format(year=year)) for year in years]
+        for future in as_completed(futures):
+            year, df = future.result()
+            frames[year] = df
+
+    combined = pd.concat(
+        [frames[year].assign(**{YEAR_COLUMN: year}) for year in sorted(frames)], ignore_index=True
+    )
+    combined.insert(1, YEAR_COLUMN, combined.pop(YEAR_COLUMN))
+    combined = combined.sort_values(["School Number", YEAR_COLUMN], kind="stable", ignore_index=True)
+    combined.to_parquet(output, index=False)
+    return combined
+
 
-df["Teacher 5+ Years Base Salary Average"] = df["Teacher 5+ Years Base Salary Average"].fillna(0)
+def main():
+    parser = argparse.ArgumentParser(description="Clean the TAPR district and campus staff profiles.")
+    parser.add_argument("--years", type=int, nargs="+",
+                        help=f"process these TAPR years from {YEAR_DIR!r} directories in parallel")
+    parser.add_argument("--year-dir", default=YEAR_DIR)
+    parser.add_argument("--output", default=LONGITUDINAL_PROFILE_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
 
-salary_columns_to_clean = [x.replace("Campus 2024 Staff: ", "") for x in salary_columns_to_clean]
+    if args.years:
+        combined = process_years(args.years, args.year_dir, args.output, args.workers)
+        print(f"Wrote {combined['School Number'].nunique():,} campuses x {len(args.years)} years to {args.output}")
+    else:
+        process_district_profile()
+        process_campus_profile()
+    profile.write_report("tapr_processing")
 
-# Replace salary values with "MASKED" if all are NaN in a row
-mask_all_nan = df[salary_columns_to_clean].isna().all(axis=1)
-# Set all columns containing "Teacher" in their name to "MASKED" for those rows
-teacher_columns = [col for col in df.columns if "Teacher" in col]
-df.loc[mask_all_nan, teacher_columns] = "MASKED"
 
-df.to_excel("Campus Teacher Profile.xlsx", index=False)
+if __name__ == "__main__":
+    main()
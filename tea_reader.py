@@ -0,0 +1,97 @@
+"""Column-projected reads of the raw TEA files, from Excel, CSV or Parquet.
+
+The campus staff file is several hundred columns wide and the profile keeps
+about thirty, so callers name the columns they need and only those are
+parsed and kept (and cached, for Excel).  The source format follows the file
+extension, so a CSV or Parquet export can replace a workbook without code
+changes:
+
+    read_table("CSTAF.xlsx", columns=["CAMPUS", "CPST0001"], ids={"CAMPUS": CAMPUS_ID_WIDTH})
+    read_table("CSTAF.csv", columns=["CAMPUS", "CPST0001"], ids={"CAMPUS": CAMPUS_ID_WIDTH})
+
+``dtype`` is a schema applied while reading; the frame comes back with its
+columns in the order given.  Identifier columns named in ``ids`` are read as
+text and zero-padded to their full width ("001902001"), so AskTED and TAPR
+keys match whether a file stores them as numbers or as text.
+"""
+import os
+
+import pandas as pd
+
+from input_cache import read_excel_cached
+
+# === CONFIGURATION ===
+# Excel parser: "calamine" (python-calamine, several times faster than openpyxl)
+# or "openpyxl"; unset uses calamine when it is installed
+EXCEL_ENGINE = os.environ.get("TRA_EXCEL_ENGINE") or None
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+# digits of TEA's county-district(-campus) numbers
+CAMPUS_ID_WIDTH = 9
+DISTRICT_ID_WIDTH = 6
+
+
+def excel_engine(engine=None):
+    """The Excel engine to read with: ``engine``, EXCEL_ENGINE or the fastest installed."""
+    engine = engine or EXCEL_ENGINE
+    if engine:
+        return engine
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return "openpyxl"
+    return "calamine"
+
+
+def _format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        return "excel"
+    if ext in (".csv", ".txt", ".dat"):
+        return "csv"
+    if ext == ".parquet":
+        return "parquet"
+    raise ValueError(f"unsupported TEA file type {ext!r}: {path}")
+
+
+def read_header(path, sheet_name=0, engine=None, **read_kwargs):
+    """Column names of a TEA file without reading its rows."""
+    fmt = _format(path)
+    if fmt == "excel":
+        return list(read_excel_cached(path, sheet_name=sheet_name, nrows=0,
+                                      engine=excel_engine(engine), **read_kwargs).columns)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0, **read_kwargs).columns)
+    import pyarrow.parquet as pq
+    return list(pq.read_schema(path).names)
+
+
+def tea_ids(values, width):
+    """TEA identifiers as zero-padded text: 1902001, "1902001.0" and "'001902001" alike."""
+    text = pd.Series(values).astype("string").str.strip().str.lstrip("'")
+    text = text.str.replace(r"\.0+$", "", regex=True).str.zfill(width)
+    return text.astype(object)
+
+
+def read_table(path, columns=None, dtype=None, sheet_name=0, engine=None, ids=None, **read_kwargs):
+    """Only ``columns`` (all when None) of a TEA file, typed by the ``dtype`` schema.
+
+    ``ids`` maps identifier columns to their width (see tea_ids).
+    """
+    ids = ids or {}
+    if ids:
+        dtype = {**(dtype or {}), **{name: str for name in ids}}
+    fmt = _format(path)
+    if fmt == "excel":
+        df = read_excel_cached(path, sheet_name=sheet_name, usecols=columns, dtype=dtype,
+                               engine=excel_engine(engine), **read_kwargs)
+    elif fmt == "csv":
+        df = pd.read_csv(path, usecols=columns, dtype=dtype, **read_kwargs)
+    else:
+        df = pd.read_parquet(path, columns=columns, **read_kwargs)
+        if dtype:
+            df = df.astype(dtype)
+    for name, width in ids.items():
+        df[name] = tea_ids(df[name], width)
+    return df if columns is None else df[list(columns)]
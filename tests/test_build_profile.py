@@ -0,0 +1,32 @@
+import pytest
+
+import build_profile as profile
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile, "PROFILE_DIR", str(tmp_path))
+    profile.reset()
+    yield tmp_path
+    profile.reset()
+
+
+def test_failed_stage_is_closed(profiling):
+    with pytest.raises(ValueError):
+        with profile.stage("render"):
+            with profile.stage("markers"):
+                raise ValueError("bad campus")
+    assert profile._open == []
+
+    with profile.stage("render"):
+        pass
+    assert [r["stage"] for r in profile._records] == ["render", "render/markers", "render"]
+
+
+def test_write_report_starts_the_next_one_empty(profiling, capsys):
+    for build in range(2):
+        with profile.stage("render"):
+            pass
+        profile.write_report("watch")
+        assert profile._records == []
+    assert "render" in capsys.readouterr().out
@@ -0,0 +1,51 @@
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import district_assign
+import input_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(input_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(district_assign, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _plan():
+    return gpd.GeoDataFrame({"district_name": ["1", "2"]}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)])
+
+
+def _points():
+    # inside 1, inside 2, 0.01 degrees outside 2
+    return gpd.GeoSeries(gpd.points_from_xy([0.5, 1.5, 2.01], [0.5, 0.5, 0.5]))
+
+
+def _assign(max_nearest):
+    return district_assign.assign_districts(
+        _points(), _plan(), keys=["a", "b", "c"], cache_name="plan.shp", max_nearest=max_nearest)
+
+
+def test_cached_nearest_rows_follow_max_nearest(cache_dir):
+    district, summary = _assign(0.02)
+    assert district.tolist() == ["1", "2", "2"]
+    assert summary["nearest"] == 1
+
+    # 0 disables the fallback even when the last build cached a nearest match
+    district, summary = _assign(0)
+    assert district.tolist() == ["1", "2", None]
+    assert summary["nearest"] == 0
+    assert summary["unassigned"] == 1
+
+    # and raising the limit again re-tests the point left without a district
+    district, summary = _assign(0.02)
+    assert district.tolist() == ["1", "2", "2"]
+    assert summary["nearest"] == 1
+
+
+def test_unchanged_limit_reuses_the_cache(cache_dir):
+    _assign(0.02)
+    _, summary = _assign(0.02)
+    assert summary["reused"] == 3
+    assert summary["retested"] == 0
@@ -0,0 +1,70 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+import input_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(input_cache, "CACHE_DIR", str(cache))
+    return cache
+
+
+@pytest.fixture
+def excel_reads(monkeypatch):
+    # counts the workbook parses the cache could not spare
+    reads = []
+    read_excel = pd.read_excel
+
+    def counting(path, *args, **kwargs):
+        reads.append(os.path.basename(path))
+        return read_excel(path, *args, **kwargs)
+
+    monkeypatch.setattr(input_cache.pd, "read_excel", counting)
+    return reads
+
+
+def _workbook(path, values):
+    pd.DataFrame({"CAMPUS": ["001902001", "001902041"], "CPST0001": values}).to_excel(path, index=False)
+    return str(path)
+
+
+def _entries(cache_dir):
+    return sorted(os.path.basename(p) for p in glob.glob(str(cache_dir / "*")))
+
+
+def test_edited_source_misses_and_drops_its_stale_entry(tmp_path, cache_dir, excel_reads):
+    path = _workbook(tmp_path / "CSTAF.xlsx", [1.5, 2.5])
+    first = input_cache.read_excel_cached(path, dtype={"CAMPUS": str})
+    again = input_cache.read_excel_cached(path, dtype={"CAMPUS": str})
+    assert excel_reads == ["CSTAF.xlsx"]
+    pd.testing.assert_frame_equal(first, again)
+    stale = _entries(cache_dir)
+
+    _workbook(path, [1.5, 9.0])
+    edited = input_cache.read_excel_cached(path, dtype={"CAMPUS": str})
+    assert excel_reads == ["CSTAF.xlsx", "CSTAF.xlsx"]
+    assert edited["CPST0001"].tolist() == [1.5, 9.0]
+    assert len(_entries(cache_dir)) == 1 and _entries(cache_dir) != stale
+
+
+def test_size_cap_evicts_the_least_recently_used_entry(tmp_path, cache_dir, excel_reads, monkeypatch):
+    paths = [_workbook(tmp_path / f"{name}.xlsx", [1.0, 2.0]) for name in ("a", "b", "c", "d")]
+    for path in paths[:3]:
+        input_cache.read_excel_cached(path)
+    entry = {os.path.basename(p)[0]: str(cache_dir / p) for p in _entries(cache_dir)}
+    # a, b, c written in that order; a is then read again, so b is the oldest
+    for age, name in enumerate("cba"):
+        os.utime(entry[name], (1_000_000 - age * 100, 1_000_000 - age * 100))
+    input_cache.read_excel_cached(paths[0])
+    assert excel_reads == ["a.xlsx", "b.xlsx", "c.xlsx"]
+
+    # room for three entries: the fourth pushes out b
+    sizes = [os.path.getsize(p) for p in entry.values()]
+    monkeypatch.setattr(input_cache, "CACHE_MAX_BYTES", 3 * max(sizes) + min(sizes) // 2)
+    input_cache.read_excel_cached(paths[3])
+    assert sorted(p[0] for p in _entries(cache_dir)) == ["a", "c", "d"]
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from popups import render_popups
+from tapr_processing import MASKED, MASKED_COLUMN
+
+TEACHER_COLUMNS = {
+    "Teacher Beginning Full Time Equiv Count": [12.0, 3.5, np.nan, None, 0.0, 1.25],
+    "Teacher Beginning Full Time Equiv Percent": [20.0, 7.9, np.nan, None, 0.0, 14.3],
+    "Teacher Beginning Base Salary Average": [52345.6, 1000.0, np.nan, None, 0.0, 999.99],
+    "Teacher 1-5 Years Full Time Equiv Count": [30.0, 10.5, 4.0, None, 2.0, 0.5],
+    "Teacher 1-5 Years Full Time Equiv Percent": [50.0, 23.6, 100.0, None, 40.0, 5.7],
+    "Teacher 1-5 Years Base Salary Average": [58999.99, 61234.0, 1234567.8, None, np.nan, 48000.5],
+    "Teacher 5+ Years Full Time Equiv Count": [18.0, 10.0, 0.0, None, 7.25, 100.05],
+    "Teacher 5+ Years Full Time Equiv Percent": [30.0, 68.55, 0.0, None, 60.0, 80.0],
+    "Teacher 5+ Years Base Salary Average": [61234.5, 61235.5, 0.0, None, 70000.49, 1500.5],
+}
+
+
+def _campuses():
+    df = pd.DataFrame({
+        "district_name": ["1", "12", "31", "4", "7", "9"],
+        "School Name": ["Alpha El", "Béxar High", "Cove MS", "Dell Charter", "Eagle Academy", "Fort HS"],
+        "District Name": ["ALPHA ISD", "BEXAR ISD", "COVE ISD", "DELL SCHOOLS", "EAGLE CHARTER", "FORT ISD"],
+        "District Type": ["INDEPENDENT", "INDEPENDENT", "INDEPENDENT", "CHARTER", "CHARTER", "INDEPENDENT"],
+        "School Enrollment as of Oct 2023": [412, 2875, 1000, 96, 15003, 0],
+        "District Enrollment as of Oct 2023": [4999, 5000, 5001, 1203, 250114, 87],
+        MASKED_COLUMN: [False, False, False, True, False, False],
+    })
+    for name, values in TEACHER_COLUMNS.items():
+        df[name] = pd.array(values, dtype="Float64")
+    return df
+
+
+def _legacy_cell(value, masked):
+    # the cell as the Excel profile read back: "MASKED", NaN, a whole number as int
+    if masked:
+        return MASKED
+    if pd.isna(value):
+        return np.nan
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def _old_popup(r):
+    # the per-row f-string formatting the batch renderer replaced
+    enroll = r["District Enrollment as of Oct 2023"]
+
+    def base(value, rounding):
+        if value == 'MASKED' or value is None or pd.isnull(value):
+            fmt = value
+        else:
+            fmt = f"{int(rounding(value)):,}"
+        return fmt if fmt == 'MASKED' else f"${fmt}"
+
+    def one_decimal(value):
+        if value == 'MASKED' or value is None or pd.isnull(value):
+            return value
+        fmt = f"{value:.1f}"
+        if ".0" in fmt:
+            fmt = fmt.replace(".0", "")
+        return fmt
+
+    def count(cnt, perc):
+        if cnt == 'MASKED' or perc == 'MASKED':
+            return 'MASKED'
+        return f"{cnt} ({perc}%)"
+
+    allot_short = 5000 if enroll <= 5000 else 2500
+    allot_long = 10000 if enroll <= 5000 else 5500
+    beg_count_display = count(r["Teacher Beginning Full Time Equiv Count"],
+                              r["Teacher Beginning Full Time Equiv Percent"])
+    mid_count_display = count(r["Teacher 1-5 Years Full Time Equiv Count"],
+                              r["Teacher 1-5 Years Full Time Equiv Percent"])
+    sen_count_display = count(one_decimal(r["Teacher 5+ Years Full Time Equiv Count"]),
+                              one_decimal(r["Teacher 5+ Years Full Time Equiv Percent"]))
+    beg_base = base(r["Teacher Beginning Base Salary Average"], lambda v: v)
+    mid_base = base(r["Teacher 1-5 Years Base Salary Average"], lambda v: v)
+    sen_base = base(r["Teacher 5+ Years Base Salary Average"], round)
+    return f"""
+    Senate District {r['district_name']}<br>
+    <b>{r['School Name']} – {r['District Name']}</b><br>
+    <i>{r['District Type']}</i><br>
+    School Enrollment (Oct 2023): {r['School Enrollment as of Oct 2023']:,}<br>
+    District Enrollment (Oct 2023): {enroll:,}<br><br>
+    <div>CSHB 2: Teacher Retention Allotment</div>
+    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
+      <tr>
+        <th style="border:1px solid black; white-space:normal;">Years Experience</th>
+        <th style="border:1px solid black; white-space:normal;">Teacher<br>Retention Allotment</th>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">3–4 years experience</td>
+        <td style="border:1px solid black;">${allot_short:,}</td>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">5+ years experience</td>
+        <td style="border:1px solid black;">${allot_long:,}</td>
+      </tr>
+    </table>
+    <br>
+    <div>2023-2024 Campus Staff</div>
+    <table style="width:100%; text-align:center; border:1px solid black; border-collapse:collapse;">
+      <tr>
+        <th style="border:1px solid black; white-space:normal;">Years<br>Experience</th>
+        <th style="border:1px solid black; white-space:normal;">Count (% of Total)</th>
+        <th style="border:1px solid black; white-space:normal;">Base<br>Salary Avg.</th>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">Beginning teachers</td>
+        <td style="border:1px solid black;">{beg_count_display}</td>
+        <td style="border:1px solid black;">{beg_base}</td>
+      </tr>
+      <tr>
+        <td style="border:1px solid black;">1-5 years experience</td>
+        <td style="border:1px solid black;">{mid_count_display}</td>
+        <td style="border:1px solid black;">{mid_base}</td>
+      </tr>
+    <tr>
+        <td style="border:1px solid black;">5+ years experience</td>
+        <td style="border:1px solid black;">{sen_count_display}</td>
+        <td style="border:1px solid black;">{sen_base}</td>
+      </tr>
+    </table>
+    """
+
+
+def test_batch_popups_match_the_row_loop():
+    campuses = _campuses()
+    legacy = campuses.astype({name: object for name in TEACHER_COLUMNS})
+    for name in TEACHER_COLUMNS:
+        legacy[name] = [_legacy_cell(v, m) for v, m in zip(campuses[name], campuses[MASKED_COLUMN])]
+
+    expected = [_old_popup(r) for _, r in legacy.iterrows()]
+    assert list(render_popups(campuses)) == expected
+
+
+def test_formatting_edge_cases():
+    html = list(render_popups(_campuses()))
+    # truncated beginning salary, rounded 5+ salary (half to even, as round())
+    assert "$52,345" in html[0] and "$61,234<" in html[0]
+    assert "$61,236<" in html[1]
+    # missing values print as Python did; a masked campus reads MASKED
+    assert "$nan" in html[2] and "nan (nan%)" in html[2]
+    assert html[3].count("MASKED") == 6
+    # whole counts lose ".0", fractional ones keep their digits
+    assert ">12 (20%)<" in html[0] and ">3.5 (7.9%)<" in html[1]
+    assert ">10 (68.5%)<" in html[1] and ">100 (80%)<" in html[5]
+    assert ">1.25 (14.3%)<" in html[5] and "$1,500<" in html[5]
@@ -0,0 +1,96 @@
+import json
+import re
+import shutil
+import subprocess
+
+import folium
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from search_index import CAMPUS, LEA, PLAN_DISTRICT, CampusSearch, build_search_index, normalize
+
+SCHOOL_NAMES = ["Béxar Élementary", "Alamo High", "Nuñez Middle", "Outside Academy", "Alamo Élementary"]
+
+
+def _campuses():
+    return gpd.GeoDataFrame({
+        "district_name": ["2", "1", "2", None, "1"],
+        "School Name": SCHOOL_NAMES,
+        "District Name": ["SAN ANTONIO ISD", "ALAMO ISD", "SAN ANTONIO ISD", "LONE ISD", "ALAMO ISD"],
+        "School Number": ["015907101", "015901001", "015907041", "227901001", "015901002"],
+    }, geometry=gpd.points_from_xy([1.5, 0.5, 1.6, 5.0, 0.6], [0.5, 0.5, 0.6, 5.0, 0.4]))
+
+
+def _plan():
+    return gpd.GeoDataFrame({"district_name": ["1", "2"]}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)])
+
+
+def _decode(index):
+    # token -> entry ids, undoing the delta encoding as the page script does
+    tokens = index["tokens"].split(" ")
+    out = {}
+    for k, token in enumerate(tokens):
+        deltas = index["postings"][index["offsets"][k]:index["offsets"][k + 1]]
+        out[token] = np.cumsum(deltas).tolist()
+    return out
+
+
+def _indexed_text(index, entry):
+    # the words build_search_index indexed for ``entry``
+    kind, name, target = index["kind"][entry], index["name"][entry], index["target"][entry]
+    if kind == PLAN_DISTRICT:
+        return f"{name} {index['abbrev']}{target}"
+    if kind == CAMPUS:
+        return f"{name} {index['name'][target[2]]} {target[3]}"
+    return name
+
+
+def test_postings_decode_to_the_entries_holding_each_token():
+    index = build_search_index(_campuses(), _plan())
+    postings = _decode(index)
+    assert len(index["offsets"]) == len(postings) + 1
+
+    expected = {}
+    for entry in range(len(index["name"])):
+        for token in set(normalize(_indexed_text(index, entry)).split()):
+            expected.setdefault(token, []).append(entry)
+    assert postings == expected
+
+    # accents are folded into the ASCII token; undrawn campuses are not indexed
+    assert "bexar" in postings and "elementary" in postings
+    assert not any(re.search(r"[^a-z0-9]", token) for token in postings)
+    assert "outside" not in postings and "lone" not in postings
+    campus = {index["name"][e] for e in postings["elementary"]}
+    assert campus == {"Béxar Élementary", "Alamo Élementary"}
+    assert index["kind"][:2] == [PLAN_DISTRICT, PLAN_DISTRICT] and LEA in index["kind"]
+
+
+@pytest.mark.parametrize("per_district", [False, True])
+def test_campus_rows_point_into_the_page_or_shard_data(per_district):
+    gdf = _campuses()
+    index = build_search_index(gdf, _plan(), per_district=per_district)
+    names = gdf["district_name"].to_numpy(dtype=object)
+    numbers = gdf["School Number"].tolist()
+    campuses = [t for k, t in zip(index["kind"], index["target"]) if k == CAMPUS]
+    assert len(campuses) == 4
+    for district, row, _, number in campuses:
+        position = numbers.index(number)
+        if per_district:
+            # the order write_district_shards lays a district's campuses out in
+            assert row == np.flatnonzero(names == district).tolist().index(position)
+        else:
+            assert row == position
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_page_normalize_agrees_with_python():
+    m = folium.Map()
+    CampusSearch(_campuses(), _plan()).add_to(m)
+    html = m.get_root().render()
+    script = re.search(r"function normalize\(s\) \{.*?\n\s*\}", html, re.S).group(0)
+    samples = SCHOOL_NAMES + ["O'Donnell  Jr./Sr. HIGH", "Ñandú—Año 2024", "  École\tSaint-Exupéry  "]
+    program = f"{script}\nconsole.log(JSON.stringify({json.dumps(samples)}.map(normalize)));"
+    out = subprocess.run(["node", "-e", program], capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == [normalize(s) for s in samples]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from tapr_processing import (
+    CAMPUS_COLUMNS, CAMPUS_SCHEMA, DISTRICT_COLUMNS, DISTRICT_ID_DTYPES, DISTRICT_SCHEMA, SALARY_COLUMNS,
+)
+
+FIVE_PLUS_BANDS = ["6-10 Years", "11-20 Years", "21-30 Years", "> 30 Years"]
+
+
+def _staff_frame(ids, columns):
+    # as TEA ships it: numbers, "." in withheld cells, a salary next to a 0 FTE count
+    rng = np.random.default_rng(7)
+    rows = []
+    for row in range(4):
+        values = {}
+        for name in columns:
+            if "Salary" in name:
+                values[name] = float(rng.integers(45000, 75000)) + 0.37
+            else:
+                values[name] = round(float(rng.uniform(0, 30)), 2)
+        rows.append(values)
+    rows[1]["Teacher Beginning Full Time Equiv Count"] = 0
+    rows[1]["Teacher 6-10 Years Full Time Equiv Count"] = 0
+    rows[2].update({name: "." for name in SALARY_COLUMNS if name in columns})
+    rows[3]["Teacher 1-5 Years Base Salary Average"] = "."
+    df = pd.DataFrame(rows, dtype=object)
+    for name, value in reversed(list(ids.items())):
+        df.insert(0, name, value)
+    return df
+
+
+def _old_campus_cleaning(df):
+    # tapr_processing before the schema engine, on the renamed columns
+    with pd.option_context("future.no_silent_downcasting", True):
+        df = df.replace(".", pd.NA)
+    for col in CAMPUS_COLUMNS:
+        df[col] = pd.to_numeric(df[col])
+    for col in df.columns:
+        if "Full Time Equiv Count" in col:
+            salary_col = col.replace("Full Time Equiv Count", "Base Salary Average")
+            if salary_col in df.columns:
+                df.loc[df[col] == 0, salary_col] = 0
+    round_cols = [f"Teacher {band} {kind}" for kind in ("Full Time Equiv Count", "Full Time Equiv Percent",
+                                                         "Base Salary Average") for band in FIVE_PLUS_BANDS]
+    df[round_cols] = df[round_cols].round(1)
+    count = [f"Teacher {band} Full Time Equiv Count" for band in FIVE_PLUS_BANDS]
+    df["Teacher 5+ Years Full Time Equiv Count"] = df[count[0]] + df[count[1]] + df[count[2]] + df[count[3]]
+    percent = [f"Teacher {band} Full Time Equiv Percent" for band in FIVE_PLUS_BANDS]
+    df["Teacher 5+ Years Full Time Equiv Percent"] = df[percent[0]] + df[percent[1]] + df[percent[2]] + df[percent[3]]
+    salary = [f"Teacher {band} Base Salary Average" for band in FIVE_PLUS_BANDS]
+    df["Teacher 5+ Years Base Salary Average"] = (
+        (df[count[0]] * df[salary[0]]) + (df[count[1]] * df[salary[1]])
+        + (df[count[2]] * df[salary[2]]) + (df[count[3]] * df[salary[3]])
+    ) / df["Teacher 5+ Years Full Time Equiv Count"]
+    df["Teacher 5+ Years Base Salary Average"] = df["Teacher 5+ Years Base Salary Average"].fillna(0)
+    mask_all_nan = df[SALARY_COLUMNS].isna().all(axis=1)
+    teacher_columns = [col for col in df.columns if "Teacher" in col]
+    df[teacher_columns] = df[teacher_columns].astype("Float64")
+    df.loc[mask_all_nan, teacher_columns] = pd.NA
+    return df, mask_all_nan.to_numpy()
+
+
+def test_campus_schema_matches_the_old_cleaning():
+    ids = {"School Number": ["001902001", "001902041", "001903001", "001904001"],
+           "District Number": ["001902", "001902", "001903", "001904"],
+           "CAMPNAME": list("ABCD"), "DISTNAME": list("WXYZ")}
+    df = _staff_frame(ids, CAMPUS_COLUMNS)
+    cleaned, masked = CAMPUS_SCHEMA.apply(df)
+    expected, expected_masked = _old_campus_cleaning(df)
+
+    assert list(masked) == list(expected_masked) == [False, False, True, False]
+    teacher = [c for c in expected.columns if "Teacher" in c]
+    assert list(cleaned.columns) == list(ids) + teacher
+    pd.testing.assert_frame_equal(cleaned[teacher], expected[teacher])
+    assert cleaned.loc[1, "Teacher Beginning Base Salary Average"] == 0
+
+
+def test_district_schema_keeps_the_report_as_read():
+    ids = {"DISTRICT": ["001902", "001903", "001904", "001905"], "DISTNAME": list("WXYZ")}
+    df = _staff_frame(ids, DISTRICT_COLUMNS)
+    cleaned, masked = DISTRICT_SCHEMA.apply(df)
+
+    assert not masked.any()
+    assert list(cleaned.columns) == list(DISTRICT_ID_DTYPES) + DISTRICT_COLUMNS
+    # "." stays, and a salary next to a 0 FTE count is not zeroed
+    pd.testing.assert_frame_equal(cleaned, df)
+    assert cleaned.loc[2, "Teacher Total Base Salary Average"] == "."
+    assert cleaned.loc[1, "Teacher Beginning Base Salary Average"] != 0
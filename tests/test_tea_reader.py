@@ -0,0 +1,17 @@
+import pandas as pd
+
+from tea_reader import CAMPUS_ID_WIDTH, read_table
+
+
+def test_numeric_and_text_ids_read_to_the_same_key(tmp_path):
+    tapr = tmp_path / "CSTAF.csv"
+    tapr.write_text("CAMPUS,CPST0001\n1902001,12.5\n31901041,3\n")
+    askted = tmp_path / "askted.csv"
+    askted.write_text("School Number,School Name\n001902001,Alpha\n'031901041,Beta\n")
+
+    staff = read_table(str(tapr), columns=["CAMPUS", "CPST0001"], ids={"CAMPUS": CAMPUS_ID_WIDTH})
+    schools = read_table(str(askted), ids={"School Number": CAMPUS_ID_WIDTH})
+
+    assert list(staff["CAMPUS"]) == ["001902001", "031901041"]
+    merged = pd.merge(schools, staff.rename(columns={"CAMPUS": "School Number"}), on="School Number")
+    assert list(merged["School Name"]) == ["Alpha", "Beta"]
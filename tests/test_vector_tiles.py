@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import vector_tiles
+from vector_tiles import PMTILES_HEADER, PMTilesArchive, tile_id
+
+METADATA = {
+    "name": "test", "format": "pbf", "minzoom": "4", "maxzoom": "5",
+    "bounds": "-106.650000,25.840000,-93.510000,36.500000", "center": "-100.080000,31.170000,6",
+    "json": json.dumps({"vector_layers": [{"id": "districts"}]}),
+}
+
+
+def _varints(data):
+    out, n, shift = [], 0, 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            out.append(n)
+            n, shift = 0, 0
+    return out
+
+
+def _directory(data):
+    values = _varints(gzip.decompress(data))
+    n = values[0]
+    ids, runs, lengths, offsets = (values[1 + k * n:1 + (k + 1) * n] for k in range(4))
+    entries, last_id = [], 0
+    for k in range(n):
+        last_id += ids[k]
+        # 0: right after the previous tile, else offset + 1
+        offset = entries[-1][1] + entries[-1][2] if offsets[k] == 0 and k else offsets[k] - 1
+        entries.append((last_id, offset, lengths[k], runs[k]))
+    return entries
+
+
+def test_tile_id_follows_the_hilbert_curve():
+    assert [tile_id(*t) for t in [(0, 0, 0), (1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0), (2, 0, 0)]] == list(range(6))
+    assert tile_id(12, 3423, 1763) == 19078479
+    # every tile of a zoom maps into that zoom's ID range, each to its own ID
+    ids = {tile_id(3, x, y) for x in range(8) for y in range(8)}
+    assert ids == set(range(21, 85))
+
+
+def test_two_tile_archive_round_trips(tmp_path):
+    path = tmp_path / "tiles.pmtiles"
+    archive = PMTilesArchive(str(path), METADATA)
+    tiles = {(4, 3, 6): gzip.compress(b"first", mtime=0), (5, 7, 13): gzip.compress(b"second", mtime=0)}
+    archive.add([(z, x, y, data) for (z, x, y), data in tiles.items()])
+    archive.close()
+
+    data = path.read_bytes()
+    header = PMTILES_HEADER.unpack(data[:PMTILES_HEADER.size])
+    magic, version, root_offset, root_length, meta_offset, meta_length, leaf_offset, leaf_length, \
+        data_offset, data_length, addressed, entries, contents = header[:13]
+    assert (magic, version) == (b"PMTiles", 3)
+    assert root_offset == PMTILES_HEADER.size and leaf_length == 0
+    assert data_offset + data_length == len(data)
+    assert (addressed, entries, contents) == (2, 2, 2)
+    assert header[13:19] == (1, vector_tiles.PMTILES_GZIP, vector_tiles.PMTILES_GZIP, vector_tiles.PMTILES_MVT, 4, 5)
+    assert header[19:23] == (-1066500000, 258400000, -935100000, 365000000)
+
+    meta = json.loads(gzip.decompress(data[meta_offset:meta_offset + meta_length]))
+    assert meta["name"] == "test" and meta["vector_layers"] == [{"id": "districts"}]
+
+    root = _directory(data[root_offset:root_offset + root_length])
+    assert [e[0] for e in root] == sorted(tile_id(*key) for key in tiles)
+    for (z, x, y), tile in tiles.items():
+        tid, offset, length, run = next(e for e in root if e[0] == tile_id(z, x, y))
+        assert run == 1
+        assert data[data_offset + offset:data_offset + offset + length] == tile
+
+
+def test_repeated_tiles_share_one_run(tmp_path):
+    path = tmp_path / "tiles.pmtiles"
+    archive = PMTilesArchive(str(path), METADATA)
+    tile = gzip.compress(b"inside one district", mtime=0)
+    archive.add([(1, 0, 0, tile), (1, 0, 1, tile)])
+    archive.close()
+
+    data = path.read_bytes()
+    header = PMTILES_HEADER.unpack(data[:PMTILES_HEADER.size])
+    assert header[10:13] == (2, 1, 1)
+    assert _directory(data[header[2]:header[2] + header[3]]) == [(1, 0, len(tile), 2)]
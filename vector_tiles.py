@@ -0,0 +1,534 @@
+"""Vector tile export: district polygons and campuses in one PMTiles or MBTiles archive.
+
+    python vector_tiles.py                              # Senate plan -> senate.pmtiles, zooms 4-12
+    python vector_tiles.py --plan PLANH2316/PLANH2316.shp House --out house.pmtiles
+    python vector_tiles.py --out senate.mbtiles         # SQLite archive for a tile server
+    python vector_tiles.py --min-zoom 4 --max-zoom 13 --workers 4
+
+Instead of embedding every polygon and marker in the page, the map can be
+drawn from tiles, so a view transfers only the tiles it shows however many
+campuses the state has.  The archive format follows the output's extension:
+
+    .pmtiles    PMTiles v3, one file a static host serves as it is; the
+                browser reads its tiles with HTTP range requests
+    .mbtiles    MBTiles (SQLite), for a tile server
+
+Tiles are gzipped Mapbox Vector Tile 2.1 blobs with three layers:
+
+    districts   the plan's districts, simplified per zoom over a shared-border
+                topology (see district_geometry), with ``district_name`` and
+                ``campuses``
+    clusters    below CLUSTER_ZOOM of the generator, the precomputed campus
+                clusters of campus_clusters: ``count``/``fte`` in total and per
+                kind code (``count_0`` ... ``fte_3``), ``split`` and
+                ``district_name``
+    campuses    from CLUSTER_ZOOM on, one point per campus with its ``kind``
+                code (what the isolate filter and the marker style read) and
+                every popup field as text
+
+The popup template (``literals``/``fields``, as in popups.PopupTemplate) and
+the kind code bits are in the metadata next to the layer list (the ``json``
+row of MBTiles, top-level keys of the PMTiles metadata).  PMTiles stores each
+distinct tile once, so the identical tiles inside a large district share
+their bytes.
+
+Tiles are encoded in a process pool, a chunk of one zoom's tiles per task;
+tiles with no feature are left out.
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import shapely
+
+import gen_tra_map_senate as gen
+from campus_clusters import campus_ftes, cluster_levels
+from campus_layer import CHARTER, KIND_COUNT, LARGE, campus_kinds
+from district_geometry import district_levels
+from popups import format_popup_fields, popup_template_for
+
+# === CONFIGURATION ===
+MIN_ZOOM = 4
+MAX_ZOOM = 12
+# tile coordinate grid, and the margin (same units) kept around each tile so
+# symbols and outlines crossing a tile edge are drawn whole
+EXTENT = 4096
+BUFFER = 64
+# tiles per pool task
+CHUNK_SIZE = 256
+ARCHIVE_FORMAT = ".pmtiles"
+GZIP_LEVEL = 6
+DISTRICT_LAYER = "districts"
+CLUSTER_LAYER = "clusters"
+CAMPUS_LAYER = "campuses"
+
+# MVT geometry types and commands
+POINT = 1
+POLYGON = 3
+MOVE_TO = 1
+LINE_TO = 2
+CLOSE_PATH = 7
+
+# PMTiles v3 header: magic, offsets/lengths of the root directory, metadata,
+# leaf directories and tile data, tile counts, then the format, zoom and bounds fields
+PMTILES_HEADER = struct.Struct("<7sB8Q3Q4B2B4iB2i")
+# header and root directory must fit the first request a client makes
+PMTILES_ROOT_BYTES = 16384
+PMTILES_GZIP = 2
+PMTILES_MVT = 1
+LEAF_SIZE = 4096
+
+# per-zoom districts and campus features shared by every tile a worker encodes
+_districts = None
+_campuses = None
+_clusters = None
+_projected = {}
+
+
+# === PROTOBUF ===
+def _varint(n):
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _bytes_field(number, data):
+    return _varint(number << 3 | 2) + _varint(len(data)) + data
+
+
+def _uint_field(number, value):
+    return _varint(number << 3) + _varint(value)
+
+
+def _value(v):
+    # the Value message: string, double, sint64 or bool
+    if isinstance(v, str):
+        return _bytes_field(1, v.encode("utf-8"))
+    if isinstance(v, (bool, np.bool_)):
+        return _uint_field(7, int(v))
+    if isinstance(v, (int, np.integer)):
+        return _uint_field(6, _zigzag(int(v)))
+    return _varint(3 << 3 | 1) + struct.pack("<d", float(v))
+
+
+def _layer(name, features):
+    """Layer message of ``features``: (geometry type, command integers, properties)."""
+    keys, values = {}, {}
+    encoded = []
+    for geom_type, geometry, properties in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value).__name__, value), len(values)))
+        feature = (_bytes_field(2, b"".join(map(_varint, tags)))
+                   + _uint_field(3, geom_type)
+                   + _bytes_field(4, b"".join(map(_varint, geometry))))
+        encoded.append(_bytes_field(2, feature))
+    return (_uint_field(15, 2) + _bytes_field(1, name.encode("utf-8")) + b"".join(encoded)
+            + b"".join(_bytes_field(3, k.encode("utf-8")) for k in keys)
+            + b"".join(_bytes_field(4, _value(v)) for _, v in values)
+            + _uint_field(5, EXTENT))
+
+
+# === GEOMETRY ===
+def _world(lon, lat, zoom):
+    # Web Mercator position in tile units at ``zoom``: tile (x, y) covers [x, x + 1) x [y, y + 1)
+    n = 2.0 ** zoom
+    lat = np.radians(lat)
+    return (np.asarray(lon) + 180.0) / 360.0 * n, (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * n
+
+
+def _project_geometry(geom, zoom):
+    return shapely.transform(geom, lambda c: np.column_stack(_world(c[:, 0], c[:, 1], zoom)) * EXTENT)
+
+
+def _command(command, count):
+    return (command & 7) | (count << 3)
+
+
+def _point_commands(x, y):
+    return [_command(MOVE_TO, 1), _zigzag(int(x)), _zigzag(int(y))]
+
+
+def _ring_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+
+def _tile_ring(coords):
+    # integer ring without the closing vertex or repeated vertices
+    ring = np.round(coords[:-1]).astype(np.int64)
+    keep = np.any(ring != np.roll(ring, 1, axis=0), axis=1)
+    return ring[keep]
+
+
+def _polygon_commands(geom):
+    """Command integers of a (Multi)Polygon in tile coordinates; None when nothing is left.
+
+    Exterior rings have positive and holes negative area in tile coordinates
+    (y down), as the spec requires; rings that collapse on the grid are dropped.
+    """
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for poly in shapely.get_parts(shapely.orient_polygons(geom)):
+        if not isinstance(poly, shapely.Polygon):
+            continue
+        rings = [_tile_ring(np.asarray(poly.exterior.coords))]
+        if len(rings[0]) < 3 or _ring_area(rings[0]) <= 0:
+            continue
+        for hole in poly.interiors:
+            ring = _tile_ring(np.asarray(hole.coords))
+            if len(ring) >= 3 and _ring_area(ring) < 0:
+                rings.append(ring)
+        for ring in rings:
+            deltas = np.diff(np.vstack([cursor, ring]), axis=0)
+            zigzag = ((deltas << 1) ^ (deltas >> 63)).tolist()
+            commands.append(_command(MOVE_TO, 1))
+            commands.extend(zigzag[0])
+            commands.append(_command(LINE_TO, len(ring) - 1))
+            for pair in zigzag[1:]:
+                commands.extend(pair)
+            commands.append(_command(CLOSE_PATH, 1))
+            cursor = ring[-1]
+    return commands or None
+
+
+# === FEATURES ===
+def campus_features(gdf, label="Senate"):
+    """(lon, lat, properties per campus) of the campuses with a district."""
+    gdf = gdf[gdf["district_name"].notna()]
+    template = popup_template_for(label)
+    fields = format_popup_fields(gdf)
+    names = list(dict.fromkeys(template.fields))
+    columns = [fields[name].to_numpy(dtype=object) for name in names]
+    kinds = campus_kinds(gdf).tolist()
+    properties = [{"kind": kind, **dict(zip(names, row))} for kind, *row in zip(kinds, *columns)]
+    return gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(), properties
+
+
+def cluster_features(gdf, min_zoom, max_zoom):
+    """{zoom: (lon, lat, properties per cluster)} of the campus clusters below ``max_zoom``."""
+    names = sorted(gdf["district_name"].dropna().unique(), key=lambda d: int(d))
+    position = {d: k for k, d in enumerate(names)}
+    group = gdf["district_name"].map(position).fillna(-1).astype(int).to_numpy()
+    levels = cluster_levels(gdf.geometry.y.to_numpy(), gdf.geometry.x.to_numpy(), group,
+                            campus_kinds(gdf), campus_ftes(gdf), max_zoom, min_zoom, precision=6)
+    out = {}
+    for level in levels:
+        properties = []
+        for g, count, fte, split in zip(level["group"], level["count"], level["fte"], level["split"]):
+            props = {"district_name": names[g], "count": sum(count), "fte": round(sum(fte), 1), "split": split}
+            props.update({f"count_{k}": count[k] for k in range(KIND_COUNT)})
+            props.update({f"fte_{k}": fte[k] for k in range(KIND_COUNT)})
+            properties.append(props)
+        out[level["zoom"]] = (np.array(level["lon"]), np.array(level["lat"]), properties)
+    return out
+
+
+def _zoom_data(zoom):
+    """Districts and points of ``zoom`` in world tile units, projected once per worker."""
+    if zoom not in _projected:
+        names, geoms, campuses = _districts[zoom]
+        world = np.array([_project_geometry(g, zoom) for g in geoms], dtype=object)
+        lon, lat, properties = _clusters.get(zoom, _campuses)
+        x, y = _world(lon, lat, zoom)
+        _projected[zoom] = (names, world, shapely.STRtree(world), campuses, x * EXTENT, y * EXTENT, properties)
+    return _projected[zoom]
+
+
+def encode_tile(zoom, x, y):
+    """Gzipped MVT bytes of tile ``zoom/x/y``; None when it holds no feature."""
+    names, world, tree, campus_counts, px, py, properties = _zoom_data(zoom)
+    x0, y0 = x * EXTENT - BUFFER, y * EXTENT - BUFFER
+    x1, y1 = (x + 1) * EXTENT + BUFFER, (y + 1) * EXTENT + BUFFER
+    layers = []
+
+    districts = []
+    for i in sorted(tree.query(shapely.box(x0, y0, x1, y1))):
+        clipped = shapely.clip_by_rect(world[i], x0, y0, x1, y1)
+        if clipped.is_empty:
+            continue
+        local = shapely.transform(clipped, lambda c: c - [x * EXTENT, y * EXTENT])
+        commands = _polygon_commands(local)
+        if commands:
+            districts.append((POLYGON, commands, {"district_name": names[i], "campuses": campus_counts[i]}))
+    if districts:
+        layers.append(_layer(DISTRICT_LAYER, districts))
+
+    inside = np.flatnonzero((px >= x0) & (px < x1) & (py >= y0) & (py < y1))
+    if len(inside):
+        points = [(POINT, _point_commands(round(px[i] - x * EXTENT), round(py[i] - y * EXTENT)), properties[i])
+                  for i in inside]
+        layers.append(_layer(CLUSTER_LAYER if zoom in _clusters else CAMPUS_LAYER, points))
+
+    if not layers:
+        return None
+    return gzip.compress(b"".join(_bytes_field(3, layer) for layer in layers), GZIP_LEVEL, mtime=0)
+
+
+# === PROCESS POOL ===
+def _init_worker(districts, campuses, clusters):
+    global _districts, _campuses, _clusters
+    _districts, _campuses, _clusters = districts, campuses, clusters
+    _projected.clear()
+
+
+def _encode_chunk(zoom, tiles):
+    out = []
+    for x, y in tiles:
+        data = encode_tile(zoom, x, y)
+        if data is not None:
+            out.append((zoom, x, y, data))
+    return out
+
+
+def _tile_range(bounds, zoom):
+    # tiles overlapping ``bounds`` (lon/lat) at ``zoom``
+    minx, miny, maxx, maxy = bounds
+    (left, right), (bottom, top) = _world([minx, maxx], [miny, maxy], zoom)
+    last = 2 ** zoom - 1
+    xs = range(max(int(left), 0), min(int(right), last) + 1)
+    ys = range(max(int(top), 0), min(int(bottom), last) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+
+def _metadata(plan, label, min_zoom, max_zoom, cluster_zoom):
+    minx, miny, maxx, maxy = plan.total_bounds
+    template = popup_template_for(label)
+    campus_fields = {"kind": "Number", **{name: "String" for name in dict.fromkeys(template.fields)}}
+    cluster_fields = {"district_name": "String", "count": "Number", "fte": "Number", "split": "Number"}
+    cluster_fields.update({f"{p}_{k}": "Number" for p in ("count", "fte") for k in range(KIND_COUNT)})
+    layers = [{"id": DISTRICT_LAYER, "minzoom": min_zoom, "maxzoom": max_zoom,
+               "fields": {"district_name": "String", "campuses": "Number"}}]
+    if cluster_zoom > min_zoom:
+        layers.append({"id": CLUSTER_LAYER, "minzoom": min_zoom, "maxzoom": cluster_zoom - 1, "fields": cluster_fields})
+    if cluster_zoom <= max_zoom:
+        layers.append({"id": CAMPUS_LAYER, "minzoom": cluster_zoom, "maxzoom": max_zoom, "fields": campus_fields})
+    return {
+        "name": f"CSHB 2: Teacher Retention Allotment Map - TX {label}",
+        "format": "pbf",
+        "type": "overlay",
+        "version": "1",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": f"{minx:.6f},{miny:.6f},{maxx:.6f},{maxy:.6f}",
+        "center": f"{(minx + maxx) / 2:.6f},{(miny + maxy) / 2:.6f},{max(min_zoom, 6)}",
+        "json": json.dumps({
+            "vector_layers": layers,
+            "popup": {"literals": template.literals, "fields": template.fields},
+            "kinds": {"charter": CHARTER, "large": LARGE},
+        }),
+    }
+
+
+# === ARCHIVES ===
+class MBTilesArchive:
+    """MBTiles file at ``path`` with the ``metadata`` rows; tiles are added as they arrive."""
+
+    def __init__(self, path, metadata):
+        if os.path.exists(path):
+            os.remove(path)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+        """)
+        self.db.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+    def add(self, rows):
+        # MBTiles rows count from the south (TMS)
+        self.db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                            [(z, x, 2 ** z - 1 - y, data) for z, x, y, data in rows])
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def tile_id(z, x, y):
+    """PMTiles tile ID: the tiles of lower zooms, then the Hilbert curve index of x/y."""
+    n = 2 ** z
+    d = 0
+    s = n // 2
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s //= 2
+    return (4 ** z - 1) // 3 + d
+
+
+def _directory(entries):
+    """Gzipped PMTiles directory of (tile_id, offset, length, run_length) entries."""
+    out = bytearray(_varint(len(entries)))
+    last = 0
+    for tid, _, _, _ in entries:
+        out += _varint(tid - last)
+        last = tid
+    for entry in entries:
+        out += _varint(entry[3])
+    for entry in entries:
+        out += _varint(entry[2])
+    for k, (_, offset, _, _) in enumerate(entries):
+        previous = entries[k - 1] if k else None
+        # 0: the tile follows the previous one; otherwise offset + 1
+        out += _varint(0 if previous and offset == previous[1] + previous[2] else offset + 1)
+    return gzip.compress(bytes(out), GZIP_LEVEL, mtime=0)
+
+
+def _directories(entries):
+    """(root directory, leaf directories): leaves only when the root alone is too big."""
+    root_limit = PMTILES_ROOT_BYTES - PMTILES_HEADER.size
+    root = _directory(entries)
+    leaf_size = LEAF_SIZE
+    leaves = b""
+    while len(root) > root_limit:
+        leaves, pointers = bytearray(), []
+        for i in range(0, len(entries), leaf_size):
+            leaf = _directory(entries[i:i + leaf_size])
+            # run length 0 points at a leaf directory
+            pointers.append((entries[i][0], len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = _directory(pointers)
+        leaf_size *= 2
+    return root, bytes(leaves)
+
+
+class PMTilesArchive:
+    """PMTiles v3 file at ``path``; tiles are kept in memory and written by ``close``."""
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.metadata = metadata
+        self.tiles = {}
+
+    def add(self, rows):
+        for z, x, y, data in rows:
+            self.tiles[tile_id(z, x, y)] = data
+
+    def close(self):
+        # tile data in tile ID order, each distinct tile once; consecutive
+        # IDs with the same bytes become one entry with a run length
+        entries, data, offsets = [], bytearray(), {}
+        for tid in sorted(self.tiles):
+            tile = self.tiles[tid]
+            if tile not in offsets:
+                offsets[tile] = len(data)
+                data += tile
+            offset = offsets[tile]
+            last = entries[-1] if entries else None
+            if last and last[1] == offset and last[0] + last[3] == tid:
+                entries[-1] = (last[0], last[1], last[2], last[3] + 1)
+            else:
+                entries.append((tid, offset, len(tile), 1))
+        root, leaves = _directories(entries)
+
+        meta = {k: v for k, v in self.metadata.items() if k != "json"}
+        meta.update(json.loads(self.metadata.get("json", "{}")))
+        meta = gzip.compress(json.dumps(meta, separators=(",", ":")).encode("utf-8"), GZIP_LEVEL, mtime=0)
+        minx, miny, maxx, maxy = (float(v) for v in self.metadata["bounds"].split(","))
+        lon, lat, zoom = self.metadata["center"].split(",")
+        root_offset = PMTILES_HEADER.size
+        meta_offset = root_offset + len(root)
+        leaf_offset = meta_offset + len(meta)
+        data_offset = leaf_offset + len(leaves)
+        header = PMTILES_HEADER.pack(
+            b"PMTiles", 3,
+            root_offset, len(root), meta_offset, len(meta), leaf_offset, len(leaves), data_offset, len(data),
+            len(self.tiles), len(entries), len(offsets),
+            1, PMTILES_GZIP, PMTILES_GZIP, PMTILES_MVT,
+            int(self.metadata["minzoom"]), int(self.metadata["maxzoom"]),
+            *(round(v * 1e7) for v in (minx, miny, maxx, maxy)),
+            int(zoom), round(float(lon) * 1e7), round(float(lat) * 1e7),
+        )
+        with open(self.path, "wb") as f:
+            for part in (header, root, meta, leaves, data):
+                f.write(part)
+
+
+ARCHIVES = {".mbtiles": MBTilesArchive, ".pmtiles": PMTilesArchive}
+
+
+def export_tiles(gdf, plan, label="Senate", output="senate.pmtiles", min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+                 workers=None, cluster_zoom=gen.CLUSTER_ZOOM):
+    """Write the tile archive of ``plan`` and the campuses of ``gdf``; returns {zoom: tiles}.
+
+    The archive format follows the extension of ``output`` (see ARCHIVES).
+    """
+    archive_type = ARCHIVES.get(os.path.splitext(output)[1].lower())
+    if archive_type is None:
+        raise ValueError(f"unknown tile archive {output!r}: expected one of {', '.join(ARCHIVES)}")
+    cluster_zoom = max_zoom + 1 if cluster_zoom is None else min(max(cluster_zoom, min_zoom), max_zoom + 1)
+    zooms = range(min_zoom, max_zoom + 1)
+    counts = gdf["district_name"].value_counts()
+    districts = {}
+    for z, level in district_levels(plan, zooms).items():
+        names = list(level["district_name"])
+        geoms = [g if g is not None else shapely.Polygon() for g in level.geometry]
+        districts[z] = (names, geoms, [int(counts.get(d, 0)) for d in names])
+    campuses = campus_features(gdf, label)
+    clusters = cluster_features(gdf, min_zoom, cluster_zoom) if cluster_zoom > min_zoom else {}
+
+    tasks = []
+    for z in zooms:
+        tiles = _tile_range(plan.total_bounds, z)
+        tasks += [(z, tiles[i:i + CHUNK_SIZE]) for i in range(0, len(tiles), CHUNK_SIZE)]
+    written = {z: 0 for z in zooms}
+    tmp = output + ".tmp"
+    archive = archive_type(tmp, _metadata(plan, label, min_zoom, max_zoom, cluster_zoom))
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(districts, campuses, clusters)) as pool:
+        futures = [pool.submit(_encode_chunk, z, tiles) for z, tiles in tasks]
+        for future in as_completed(futures):
+            rows = future.result()
+            archive.add(rows)
+            for z, _, _, _ in rows:
+                written[z] += 1
+    archive.close()
+    os.replace(tmp, output)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plan", nargs=2, metavar=("SHAPEFILE", "LABEL"),
+                        default=(os.path.join(gen.SHP_DIR, gen.SHP_NAME), "Senate"))
+    parser.add_argument("--out", default=None,
+                        help=f"archive path, .pmtiles or .mbtiles (default: <label>{ARCHIVE_FORMAT})")
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    shp_path, label = args.plan
+    output = args.out or f"{label.lower()}{ARCHIVE_FORMAT}"
+    plan = gen.load_plan(shp_path)
+    gdf = gen.assign_plan_districts(gen.load_campuses(), plan, cache_name=os.path.basename(shp_path))
+    written = export_tiles(gdf, plan, label, output, args.min_zoom, args.max_zoom, args.workers)
+    for z, n in written.items():
+        print(f"zoom {z}: {n:,} tiles")
+    print(f"Wrote {output} ({os.path.getsize(output) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
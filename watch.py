@@ -0,0 +1,354 @@
+"""Watch mode: keep the prepared campuses in memory and rebuild the map on every change.
+
+    python watch.py                 # build, serve on http://localhost:8000/ and rebuild on save
+    python watch.py --port 8080 --no-serve
+
+The pipeline stages (see pipeline.py) are followed, but the campuses, the plan
+and the joined GeoDataFrame stay in memory between builds.  On a change to a
+source module or an input file the changed modules are reloaded together with
+every module importing them, and each stage whose fingerprint moved reruns,
+along with the in-memory stages after it:
+
+    input or TAPR code        -> TAPR stage, coordinates, spatial join, render
+    AskTED / campus_data      -> coordinates, spatial join, render
+    plan / district_assign    -> spatial join, render
+    anything else             -> render
+
+Render itself reuses the district boundaries, campus markers and search box
+of the previous build while their code, settings and data are unchanged (see
+``LayerCache``), so an edit to the title, legend, footer or any other page
+chrome only re-renders the chrome.  The dropdown script of the embedded
+layouts is built with the layers and rebuilds them.
+
+Pages are served from the output directory with a small script added that
+reloads the browser tab after each successful build.
+"""
+import argparse
+import ast
+import functools
+import hashlib
+import http.server
+import importlib
+import inspect
+import os
+import sys
+import threading
+import time
+import traceback
+
+import pipeline
+
+# === CONFIGURATION ===
+PORT = 8000
+POLL_SECONDS = 0.3
+# modules of this repository are the .py files next to this one
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# layer settings: a change to any of them rebuilds the layers
+LAYER_SETTINGS = ("POPUP_MODE", "MARKER_MODE", "BOUNDARY_ZOOM", "BOUNDARY_TOPOJSON", "OUTPUT_MODE",
+                  "SUMMARY_ZOOM", "SEARCH_INDEX", "CLUSTER_ZOOM", "ISOLATE_TOGGLE_HTML", "SEARCH_HOOKS_JS")
+MEMORY_STAGES = ("coordinates", "spatial_join", "render")
+
+RELOAD_SCRIPT = """
+<script>
+(function() {
+    var build = null;
+    setInterval(function() {
+        fetch('/__build', { cache: 'no-store' }).then(function(r) { return r.text(); }).then(function(b) {
+            if (build !== null && b !== build) { location.reload(); }
+            build = b;
+        }).catch(function() {});
+    }, 1000);
+})();
+</script>
+"""
+
+# figure sections an element's render adds to
+_SECTIONS = ("header", "html", "script")
+
+
+# === LAYER CACHE ===
+def _freeze(element):
+    """Make ``element`` replay what its first render added to the page."""
+    render = element.render
+    fragments = None
+
+    def replay(**kwargs):
+        nonlocal fragments
+        figure = element.get_root()
+        if fragments is None:
+            before = {s: set(getattr(figure, s)._children) for s in _SECTIONS}
+            render(**kwargs)
+            fragments = [(s, name, child) for s in _SECTIONS
+                         for name, child in getattr(figure, s)._children.items() if name not in before[s]]
+        else:
+            for section, name, child in fragments:
+                getattr(figure, section).add_child(child, name=name)
+
+    element.render = replay
+
+
+class LayerCache:
+    """The map layers of the last render, replayed while ``key`` is unchanged.
+
+    The layers keep their element names and the map keeps its name between
+    builds (``pin``), so the replayed script still refers to the right map.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.map_id = None
+        self.hits = 0
+        self._root = None
+        self._children = None
+
+    def use(self, key):
+        if key != self.key:
+            self.key = key
+            self._root = self._children = None
+
+    def pin(self, m):
+        if self.map_id is None:
+            self.map_id = m._id
+        m._id = self.map_id
+
+    def add(self, m, build):
+        figure = m.get_root()
+        if self._children is not None:
+            self.hits += 1
+            for section, name, child in self._root:
+                getattr(figure, section).add_child(child, name=name)
+            for name, child in self._children:
+                m.add_child(child, name=name)
+            return
+        before = {s: set(getattr(figure, s)._children) for s in _SECTIONS}
+        children = set(m._children)
+        build()
+        self._root = [(s, name, child) for s in _SECTIONS
+                      for name, child in getattr(figure, s)._children.items() if name not in before[s]]
+        self._children = [(name, child) for name, child in m._children.items() if name not in children]
+        for _, child in self._children:
+            _freeze(child)
+
+
+def layer_key(gen, data_version):
+    """Everything the map layers depend on besides the campuses and plan."""
+    digest = hashlib.sha256(str(data_version).encode())
+    for obj in (gen._add_map_layers, gen._add_district_layers, gen._district_control_html,
+                *(sys.modules[name] for name in ("popups", "campus_layer", "campus_clusters", "allotment",
+                                                  "district_geometry", "district_shards", "search_index"))):
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    for name in LAYER_SETTINGS:
+        digest.update(repr(getattr(gen, name)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# === SOURCE RELOADING ===
+def _local_modules():
+    """{module name: file} of this repository's modules that are imported."""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        # the script itself runs as __main__ (and __mp_main__) and is never reloaded
+        if path and os.path.dirname(os.path.abspath(path)) == SOURCE_DIR and module.__name__ == name != "__main__":
+            modules[name] = os.path.abspath(path)
+    return modules
+
+
+def _imports(path, names):
+    """Modules out of ``names`` that ``path`` imports at the top level."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    found = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            found.add(node.module)
+    return found & names
+
+
+def reload_modules(changed):
+    """Reload the ``changed`` modules and every module importing them, dependencies first."""
+    modules = _local_modules()
+    imports = {name: _imports(path, set(modules)) for name, path in modules.items()}
+    stale = set(changed)
+    while True:
+        more = {name for name, deps in imports.items() if deps & stale} - stale
+        if not more:
+            break
+        stale |= more
+    done = set()
+
+    def visit(name):
+        if name in done:
+            return
+        done.add(name)
+        for dep in sorted(imports[name] & stale):
+            visit(dep)
+        importlib.reload(sys.modules[name])
+
+    for name in sorted(stale):
+        visit(name)
+    return sorted(stale)
+
+
+# === BUILD SESSION ===
+class Session:
+    """Pipeline stages with the map's data kept in memory between builds."""
+
+    def __init__(self):
+        # the TAPR stages start from the last pipeline run, the in-memory ones from nothing
+        self.fingerprints = {k: v for k, v in pipeline._load_state().items() if k not in MEMORY_STAGES}
+        self.campuses = self.plan = self.joined = None
+        self.data_version = 0
+        self.layers = LayerCache()
+        self.build = 0
+
+    def _run_memory_stage(self, name):
+        gen = pipeline.gen
+        if name == "coordinates":
+            self.campuses = gen.load_campuses()
+        elif name == "spatial_join":
+            self.plan = gen.load_plan(pipeline.PLAN_PATH)
+            self.joined = gen.assign_plan_districts(self.campuses, self.plan, cache_name=gen.SHP_NAME)
+            self.data_version += 1
+        else:
+            self.layers.use(layer_key(gen, self.data_version))
+            hits = self.layers.hits
+            gen.render_map(self.joined, self.plan, "Senate", gen.OUTPUT_MAP, layer_cache=self.layers)
+            if self.layers.hits > hits:
+                return "render (layers reused)"
+        return name
+
+    def run(self):
+        """Run every stage that is out of date; returns [(stage, seconds)]."""
+        ran = []
+        upstream = False
+        # stages a failed build left behind
+        pipeline.profile.reset()
+        for stage in pipeline.build_stages():
+            fingerprint = stage.fingerprint()
+            memory = stage.name in MEMORY_STAGES
+            # layers can move on something the stage fingerprint leaves out
+            layers_moved = stage.name == "render" and self.layers.key != layer_key(pipeline.gen, self.data_version)
+            if fingerprint == self.fingerprints.get(stage.name) and not (memory and upstream) and not layers_moved:
+                continue
+            start = time.perf_counter()
+            label = stage.name
+            if memory:
+                label = self._run_memory_stage(stage.name)
+                upstream = True
+            else:
+                stage.func()
+                # the files it wrote are the pipeline's too
+                fingerprint = stage.fingerprint()
+                state = pipeline._load_state()
+                state[stage.name] = fingerprint
+                pipeline._save_state(state)
+            self.fingerprints[stage.name] = fingerprint
+            ran.append((label, time.perf_counter() - start))
+        if ran:
+            pipeline.profile.write_report("watch", [pipeline.gen.OUTPUT_MAP])
+        self.build += 1
+        return ran
+
+    def watched_files(self):
+        files = set(_local_modules().values())
+        for stage in pipeline.build_stages():
+            files.update(stage.inputs)
+        return {p for p in files if p not in (pipeline.CAMPUSES_PATH, pipeline.JOINED_PATH)}
+
+
+def _mtimes(paths):
+    return {p: os.path.getmtime(p) if os.path.exists(p) else None for p in paths}
+
+
+# === DEV SERVER ===
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args, session, **kwargs):
+        self.session = session
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if path == "/__build":
+            return self._send(str(self.session.build).encode(), "text/plain")
+        if path.endswith("/"):
+            path += "index.html"
+        local = self.translate_path(path)
+        if local.endswith(".html") and os.path.isfile(local):
+            with open(local, encoding="utf-8") as f:
+                page = f.read()
+            page = page.replace("</body>", RELOAD_SCRIPT + "</body>", 1)
+            return self._send(page.encode("utf-8"), "text/html; charset=utf-8")
+        return super().do_GET()
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(session, port=PORT, directory="."):
+    handler = functools.partial(_Handler, session=session, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page = os.path.basename(pipeline.gen.OUTPUT_MAP)
+    print(f"Serving http://localhost:{port}/{'' if page == 'index.html' else page}")
+    return server
+
+
+def _report(ran, seconds):
+    stages = ", ".join(f"{name} {took:.2f}s" for name, took in ran) or "nothing to do"
+    print(f"Rebuilt in {seconds:.2f}s ({stages})")
+
+
+def watch(session, poll=POLL_SECONDS):
+    files = session.watched_files()
+    mtimes = _mtimes(files)
+    while True:
+        time.sleep(poll)
+        current = _mtimes(files)
+        changed = sorted(p for p in files if current[p] != mtimes[p])
+        if not changed:
+            continue
+        mtimes = current
+        print("Changed:", ", ".join(os.path.relpath(p) for p in changed))
+        start = time.perf_counter()
+        try:
+            modules = {name for name, path in _local_modules().items() if path in changed}
+            if modules:
+                reload_modules(modules)
+            _report(session.run(), time.perf_counter() - start)
+        except Exception:
+            # keep serving the last good page until the next save
+            traceback.print_exc()
+        files = session.watched_files()
+        mtimes.update({p: m for p, m in _mtimes(files).items() if p not in mtimes})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--no-serve", action="store_true", help="rebuild on change without the dev server")
+    args = parser.parse_args()
+
+    session = Session()
+    start = time.perf_counter()
+    _report(session.run(), time.perf_counter() - start)
+    if not args.no_serve:
+        serve(session, args.port, os.path.dirname(os.path.abspath(pipeline.gen.OUTPUT_MAP)))
+    try:
+        watch(session)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()